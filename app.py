@@ -10,17 +10,26 @@ Key Features:
 - User registration and authentication.
 - Image upload and unique filename generation using UUID.
 - Image processing pipeline including RGB to grayscale conversion, segmentation, and feature extraction.
+- Segmentation reproduces the original lossy JPEG round trips of the mask and segmented image,
+  which the model was trained on, until it is retrained (model/legacy_segmentation.py).
+- Optional resolution cap on uploads (CERVISCAN_MAX_LONG_SIDE); the applied scale is stored per record.
 - Prediction using a pre-trained model.
 - History management to view and delete previous uploads.
+- Optional background processing of records with status polling and server-sent events; event
+  streams need gunicorn's threaded workers, configured in gunicorn.conf.py.
+- Cache of features and predictions for repeated uploads of the same image (model/result_cache.py).
+- Prometheus metrics (per-stage latency, records created and failed) on /metrics.
+- Stored float32 feature vectors per record; `flask --app app rescore-records` re-scores them
+  with the current model in batches, without rerunning the image pipeline.
+- Opt-in per-request profiling (admin token header or sampling), listed on /api/profiles.
 
 Modules and Libraries Used:
 - Flask: Web framework.
 - Flask_SQLAlchemy: ORM for database operations.
 - Flask_Login: User session management.
 - Flask_Migrate: Database migration tool.
-- OpenCV (cv2): Image processing.
-- Matplotlib: Image saving for processed results.
-- Pickle: Loading pre-trained models.
+- OpenCV (cv2): Image decoding, processing and saving of processed results.
+- XGBoost: Pre-trained classifier, loaded once per worker (model/classifier.py).
 - Werkzeuge: Secure file handling.
 - UUID: Unique filename generation.
 - Datetime: Timestamp handling.
@@ -30,15 +39,28 @@ import os
 import uuid
 import pytz
 import base64
-import io
+import hmac
+import json
+import time
+import multiprocessing
+
+import click
+import numpy as np
+
+from contextlib import nullcontext
+
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
 
 from datetime import datetime
 from datetime import timedelta
 from datetime import timezone
 
 from flask import Flask
+from flask import Response
 from flask import jsonify
 from flask import request
+from flask import stream_with_context
 
 # from flask import render_template
 # from flask import redirect
@@ -54,6 +76,10 @@ from flask_migrate import Migrate
 
 from flask_sqlalchemy import SQLAlchemy
 
+from sqlalchemy import or_
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
+
 from flask_jwt_extended import JWTManager
 from flask_jwt_extended import create_access_token
 from flask_jwt_extended import jwt_required
@@ -66,15 +92,31 @@ from flask_jwt_extended import get_csrf_token
 from werkzeug.security import generate_password_hash
 from werkzeug.security import check_password_hash
 
-import cv2
-import matplotlib.pyplot as plt
-import pickle
-from PIL import Image
-
-from model.rgb_to_gray import rgb_to_gray_converter
-from model.multiotsu_segmentation import multiotsu_masking
-from model.bitwise_operation import get_segmented_image
-from model.cerviscan_feature_extraction import get_cerviscan_features
+from model.image_io import can_decode_image
+from model.image_io import decode_normalized_image
+from model.classifier import get_classifier
+from model.classifier import get_model_version
+from model.classifier import predict
+from model.classifier import get_used_features
+from model.cerviscan_feature_extraction import FEATURE_SCHEMA_VERSION
+from model.cerviscan_feature_extraction import decode_feature_vectors
+from model.cerviscan_feature_extraction import get_cerviscan_feature_names
+from model.feature_schema import to_model_input
+from model.legacy_segmentation import get_legacy_format
+from model.legacy_segmentation import resave_base64_upload
+from model.pipeline import analyze_image
+from model.pipeline import save_artifacts
+from model.pipeline import get_stored_features
+from model.pipeline import process_record
+from model.metrics import RECORDS_CREATED
+from model.metrics import RECORD_FAILURES
+from model.metrics import observe_timings
+from model.metrics import render_metrics
+from model.result_cache import hash_upload
+from model.profiling import ProfileCapture
+from model.profiling import should_profile
+from model.profiling import list_profiles
+from model.stage_graph import SEQUENTIAL
 
 app = Flask(__name__)
 CORS(
@@ -95,6 +137,24 @@ app.config["GRAY_FOLDER"] = "./static/process/gray"
 app.config["MASK_FOLDER"] = "./static/process/mask"
 app.config["SEGMENTED_FOLDER"] = "./static/process/segmented"
 app.config["FEATURE_FOLDER"] = "./static/process/feature"
+# Record processing: "sync" runs the pipeline inside the request, "thread" and
+# "process" return 202 and run it on a background thread or process pool
+app.config["RECORD_JOB_MODE"] = os.environ.get("RECORD_JOB_MODE", "sync")
+app.config["RECORD_JOB_WORKERS"] = int(os.environ.get("RECORD_JOB_WORKERS", "2"))
+# Jobs live in the worker's executor and are lost when it restarts; records still
+# pending after this many seconds are marked failed
+app.config["RECORD_JOB_TIMEOUT"] = int(os.environ.get("RECORD_JOB_TIMEOUT", "600"))
+# Each open event stream occupies one gunicorn thread (see gunicorn.conf.py) for
+# at most this many seconds
+app.config["RECORD_EVENTS_TIMEOUT"] = int(os.environ.get("RECORD_EVENTS_TIMEOUT", "120"))
+# Profiling: record requests sent with an "X-Profile-Token" header matching
+# PROFILE_TOKEN, plus a random PROFILE_SAMPLE_RATE fraction of all records,
+# are profiled into PROFILE_FOLDER; GET /api/profiles lists the slowest
+app.config["PROFILE_TOKEN"] = os.environ.get("CERVISCAN_PROFILE_TOKEN")
+app.config["PROFILE_SAMPLE_RATE"] = float(os.environ.get("CERVISCAN_PROFILE_SAMPLE_RATE", "0"))
+app.config["PROFILE_FOLDER"] = os.environ.get("CERVISCAN_PROFILE_FOLDER", "./profiles")
+# Records read, scored and committed per batch by `flask rescore-records`
+app.config["RESCORE_CHUNK_SIZE"] = int(os.environ.get("CERVISCAN_RESCORE_CHUNK_SIZE", "10000"))
 
 # Ensure directories exist for uploaded and processed files
 os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
@@ -126,8 +186,18 @@ class Records(db.Model):
     user_id = db.Column(db.String(), db.ForeignKey("users.id"), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     dob = db.Column(db.String(50), nullable=False)
-    prediction = db.Column(db.Boolean, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.now(tz=pytz.timezone("UTC")))
+    prediction = db.Column(db.Boolean, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="done")
+    error = db.Column(db.String(), nullable=True)
+    scale = db.Column(db.Float, nullable=True)
+    # Full feature vector as float32 (see encode_feature_vector), so records
+    # can be re-scored by a new model without rerunning the image pipeline;
+    # not stored for records scored with lazy extraction
+    features = db.Column(db.LargeBinary, nullable=True)
+    feature_schema = db.Column(db.String(20), nullable=True)
+    model_version = db.Column(db.String(32), nullable=True)
+    # Evaluated per row; pending rows are dated by it (see fail_stale_jobs)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(tz=pytz.timezone("UTC")))
 
     def __repr__(self):
         return f"<Record {self.name}>"
@@ -137,6 +207,132 @@ class Records(db.Model):
 with app.app_context():
     db.create_all()
 
+# Load and warm up the classifier once per worker instead of once per request
+get_classifier()
+
+# Background executor for record jobs
+if app.config["RECORD_JOB_MODE"] == "thread":
+    record_jobs = ThreadPoolExecutor(max_workers=app.config["RECORD_JOB_WORKERS"])
+elif app.config["RECORD_JOB_MODE"] == "process":
+    # Spawned workers only import model.pipeline, not the Flask app
+    record_jobs = ProcessPoolExecutor(
+        max_workers=app.config["RECORD_JOB_WORKERS"],
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+else:
+    record_jobs = None
+
+
+def artifact_folders():
+    return {
+        "gray": app.config["GRAY_FOLDER"],
+        "mask": app.config["MASK_FOLDER"],
+        "segmented": app.config["SEGMENTED_FOLDER"],
+    }
+
+
+def finish_record_job(record_id, future):
+    """Store the outcome of a background record job on its row."""
+    with app.app_context():
+        record = db.session.get(Records, record_id)
+        if record is None:
+            return
+
+        timings = {}
+        try:
+            outcome = future.result()
+            record.prediction = outcome["prediction"]
+            record.scale = outcome["scale"]
+            record.features = outcome["features"]
+            record.feature_schema = FEATURE_SCHEMA_VERSION if outcome["features"] else None
+            record.model_version = outcome["model_version"]
+            record.status = "done"
+            timings = outcome["timings"]
+        except Exception as e:
+            record.status = "failed"
+            record.error = str(e)
+
+        start = time.perf_counter()
+        db.session.commit()
+        timings["db_commit"] = time.perf_counter() - start
+
+        observe_timings(timings)
+        if record.status == "done":
+            RECORDS_CREATED.inc()
+        else:
+            RECORD_FAILURES.inc()
+
+
+def get_job_cutoff():
+    """
+    Get the creation time before which a pending record's job counts as lost.
+
+    Returns:
+        datetime: UTC without a time zone, as `created_at` is stored.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=app.config["RECORD_JOB_TIMEOUT"])
+    return cutoff.replace(tzinfo=None)
+
+
+def fail_stale_jobs(record_id=None):
+    """
+    Mark records whose background job is overdue as failed.
+
+    A job only lives in the executor of the worker that accepted it, so a
+    restart or redeploy loses it and its row would stay pending forever.
+    Runs on startup in every worker, which is safe since it is one
+    conditional update, and for a single record when its status is read
+    (see `check_stale_job`).
+
+    Parameters:
+        record_id (str, optional): Only check this record.
+
+    Returns:
+        int: Number of records marked failed.
+    """
+    query = update(Records).where(Records.status == "pending", Records.created_at < get_job_cutoff())
+    if record_id is not None:
+        query = query.where(Records.id == record_id)
+
+    result = db.session.execute(
+        query.values(status="failed", error="Processing was interrupted; upload the image again"),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.commit()
+    if result.rowcount:
+        RECORD_FAILURES.inc(result.rowcount)
+    return result.rowcount
+
+
+def check_stale_job(record):
+    """Fail a record read as pending if its job is overdue, and reload it."""
+    created_at = record.created_at
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    if record.status == "pending" and created_at < get_job_cutoff():
+        fail_stale_jobs(record.id)
+        db.session.refresh(record)
+    return record
+
+
+# Fail jobs lost by a previous run of the workers
+with app.app_context():
+    try:
+        fail_stale_jobs()
+    except OperationalError:
+        # The records table predates background jobs; `flask db upgrade` adds the columns
+        db.session.rollback()
+
+
+def record_status(record):
+    return {
+        "id": record.id,
+        "status": record.status,
+        "prediction": record.prediction,
+        "error": record.error,
+        "scale": record.scale,
+    }
+
 
 @app.after_request
 def refresh_expiring_jwts(response):
@@ -257,6 +453,8 @@ def list_records():
                     "name": record.name,
                     "dob": record.dob,
                     "prediction": record.prediction,
+                    "status": record.status,
+                    "scale": record.scale,
                     "created_at": record.created_at,
                 }
                 for record in Records.query.filter_by(user_id=user_id).all()
@@ -281,51 +479,133 @@ def create_record():
         while Records.query.filter_by(id=record_id).first():
             record_id = str(uuid.uuid4())
 
+        data = None
+
+        # The upload is decoded once and stored as-is only if it decodes; every
+        # stage works on in-memory arrays
         if "image" in request.files:
             file = request.files["image"]
             filename = record_id + os.path.splitext(file.filename)[1]
-            original_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-            file.save(original_path)
+            data = file.read()
         elif "image" in request.form:
-            file = base64.b64decode(request.form.get("image"))
-            image = Image.open(io.BytesIO(file))
+            # Stored as a PIL-written JPEG, as the original app did
+            data = resave_base64_upload(base64.b64decode(request.form.get("image")))
             filename = record_id + ".jpg"
-            original_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-            image.save(original_path)
-
-        if original_path:
-            gray_image = rgb_to_gray_converter(original_path)
-            gray_path = os.path.join(app.config["GRAY_FOLDER"], filename)
-            cv2.imwrite(gray_path, gray_image)
-
-            mask_image = multiotsu_masking(gray_path)
-            mask_path = os.path.join(app.config["MASK_FOLDER"], filename)
-            plt.imsave(mask_path, mask_image, cmap="gray")
+            if data is None:
+                RECORD_FAILURES.inc()
+                return jsonify(message="Uploaded image could not be decoded"), 400
+
+        if data:
+            profile = should_profile(
+                request.headers.get("X-Profile-Token"),
+                app.config["PROFILE_TOKEN"],
+                app.config["PROFILE_SAMPLE_RATE"],
+            )
 
-            original_image = cv2.imread(original_path)
-            segmented_image = get_segmented_image(original_image, mask_path)
-            segmented_path = os.path.join(app.config["SEGMENTED_FOLDER"], filename)
-            cv2.imwrite(segmented_path, segmented_image)
+            original_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
 
-            image_features = get_cerviscan_features(segmented_path)
-            model = pickle.load(open("./model/xgb_best", "rb"))
-            prediction = model.predict(image_features)
+            if record_jobs is not None:
+                if not can_decode_image(data):
+                    RECORD_FAILURES.inc()
+                    return jsonify(message="Uploaded image could not be decoded"), 400
+
+                with open(original_path, "wb") as f:
+                    f.write(data)
+
+                entry = Records(
+                    id=record_id,
+                    user_id=user_id,
+                    name=name,
+                    dob=dob,
+                    prediction=None,
+                    status="pending",
+                )
+
+                db.session.add(entry)
+                db.session.commit()
+
+                future = record_jobs.submit(
+                    process_record,
+                    original_path,
+                    filename,
+                    artifact_folders(),
+                    app.config["PROFILE_FOLDER"] if profile else None,
+                )
+                future.add_done_callback(
+                    lambda future: finish_record_job(record_id, future)
+                )
+
+                return (
+                    jsonify(
+                        message="Record accepted for processing",
+                        data={
+                            "id": record_id,
+                            "status": "pending",
+                            "status_url": f"/api/record/{record_id}/status",
+                            "events_url": f"/api/record/{record_id}/events",
+                        },
+                    ),
+                    202,
+                )
+
+            timings, cpu_timings = {}, {}
+            capture = None
+            if profile:
+                capture = ProfileCapture(
+                    record_id,
+                    app.config["PROFILE_FOLDER"],
+                    timings=timings,
+                    cpu_timings=cpu_timings,
+                )
+
+            with capture or nullcontext():
+                start = time.perf_counter()
+                original_image, scale = decode_normalized_image(data)
+                timings["decode"] = time.perf_counter() - start
+                if original_image is None:
+                    RECORD_FAILURES.inc()
+                    return jsonify(message="Uploaded image could not be decoded"), 400
+                if capture:
+                    capture.image = original_image
+
+                result, prediction, cached = analyze_image(
+                    original_image,
+                    hash_upload(data),
+                    timings,
+                    cpu_timings,
+                    SEQUENTIAL if capture else None,
+                    get_legacy_format(filename),
+                )
 
             entry = Records(
                 id=record_id,
                 user_id=user_id,
                 name=name,
                 dob=dob,
-                prediction=bool(prediction[0]),
+                prediction=prediction,
+                scale=scale,
+                features=get_stored_features(result),
+                feature_schema=FEATURE_SCHEMA_VERSION if result["complete"] else None,
+                model_version=get_model_version(),
             )
 
+            start = time.perf_counter()
             db.session.add(entry)
             db.session.commit()
+            timings["db_commit"] = time.perf_counter() - start
+
+            observe_timings(timings)
+            RECORDS_CREATED.inc()
+
+            # The upload and processed images are saved as side outputs only
+            with open(original_path, "wb") as f:
+                f.write(data)
+            save_artifacts(result, filename, artifact_folders())
 
             return (
                 jsonify(
                     message="Record created successfully",
-                    data={"id": record_id, "prediction": bool(prediction[0])},
+                    data={"id": record_id, "prediction": prediction, "cached": cached},
                 ),
                 201,
             )
@@ -335,6 +615,10 @@ def create_record():
     except AttributeError:
         return jsonify(message="Provide a name, dob, and image in form data"), 400
 
+    except Exception:
+        RECORD_FAILURES.inc()
+        raise
+
 
 @app.route("/api/record/delete", methods=["DELETE"])
 @jwt_required()
@@ -375,6 +659,8 @@ def get_record(record_id):
                     "name": record.name,
                     "dob": record.dob,
                     "prediction": record.prediction,
+                    "status": record.status,
+                    "scale": record.scale,
                     "created_at": record.created_at,
                 }
             ),
@@ -384,6 +670,165 @@ def get_record(record_id):
     return jsonify(message="Record not found"), 404
 
 
+@app.route("/api/record/<record_id>/status", methods=["GET"])
+@jwt_required()
+def get_record_status(record_id):
+    user_id = get_jwt_identity()
+
+    record = Records.query.filter_by(id=record_id, user_id=user_id).first()
+
+    if record:
+        return jsonify(data=record_status(check_stale_job(record))), 200
+
+    return jsonify(message="Record not found"), 404
+
+
+@app.route("/api/record/<record_id>/events", methods=["GET"])
+@jwt_required()
+def get_record_events(record_id):
+    user_id = get_jwt_identity()
+
+    if not Records.query.filter_by(id=record_id, user_id=user_id).first():
+        return jsonify(message="Record not found"), 404
+
+    def events():
+        # The job may run in another worker, so the row is the source of truth
+        deadline = time.monotonic() + app.config["RECORD_EVENTS_TIMEOUT"]
+        last = None
+        while True:
+            db.session.expire_all()
+            record = Records.query.filter_by(id=record_id, user_id=user_id).first()
+            if record is None:
+                yield "event: error\ndata: {\"message\": \"Record not found\"}\n\n"
+                return
+
+            status = record_status(check_stale_job(record))
+            if status != last:
+                yield f"event: status\ndata: {json.dumps(status)}\n\n"
+                last = status
+
+            if record.status != "pending":
+                return
+
+            if time.monotonic() > deadline:
+                yield "event: timeout\ndata: {}\n\n"
+                return
+
+            time.sleep(0.5)
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream")
+
+
+@app.route("/api/profiles", methods=["GET"])
+def get_profiles():
+    token = request.headers.get("X-Profile-Token")
+    admin_token = app.config["PROFILE_TOKEN"]
+    if not admin_token or not token or not hmac.compare_digest(token, admin_token):
+        return jsonify(message="Forbidden"), 403
+
+    limit = request.args.get("limit", 20, type=int)
+    profiles = list_profiles(app.config["PROFILE_FOLDER"], limit)
+
+    return jsonify(message="Profiles retrieved successfully", data=profiles), 200
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    # Prometheus scrape endpoint; merges all gunicorn workers in multiprocess mode
+    data, content_type = render_metrics()
+    return Response(data, content_type=content_type)
+
+
+# Admin commands
+@app.cli.command("rescore-records")
+@click.option(
+    "--chunk-size",
+    type=int,
+    default=app.config["RESCORE_CHUNK_SIZE"],
+    show_default=True,
+    help="Records scored and committed per batch.",
+)
+@click.option(
+    "--all",
+    "rescore_all",
+    is_flag=True,
+    help="Also re-score records already scored by the current model.",
+)
+def rescore_records(chunk_size, rescore_all):
+    """Re-score stored feature vectors with the current model."""
+    model_version = get_model_version()
+
+    # Vectors stored while lazy extraction defaulted to on lack the features
+    # their model did not use; rows missing one the current model needs are
+    # left alone
+    feature_names = get_cerviscan_feature_names()
+    required = [feature_names.index(name) for name in get_used_features()]
+
+    query = db.session.query(Records.id, Records.prediction, Records.features).filter(
+        Records.features.isnot(None),
+        Records.feature_schema == FEATURE_SCHEMA_VERSION,
+    )
+    if not rescore_all:
+        query = query.filter(
+            or_(Records.model_version.is_(None), Records.model_version != model_version)
+        )
+
+    start = time.perf_counter()
+    scored = changed = incomplete = 0
+    last_id = None
+
+    # Keyset pagination: every chunk starts after the last id of the previous
+    # one, so updated rows are never read twice and memory stays bounded
+    while True:
+        chunk_query = query if last_id is None else query.filter(Records.id > last_id)
+        rows = chunk_query.order_by(Records.id).limit(chunk_size).all()
+        if not rows:
+            break
+
+        last_id = rows[-1].id
+
+        matrix = decode_feature_vectors([row.features for row in rows])
+        complete = ~np.isnan(matrix[:, required]).any(axis=1)
+        incomplete += len(rows) - int(complete.sum())
+        rows = [row for row, ok in zip(rows, complete) if ok]
+        if not rows:
+            continue
+        predictions = predict(to_model_input(matrix[complete]))
+
+        db.session.execute(
+            update(Records),
+            [
+                {"id": row.id, "prediction": bool(prediction), "model_version": model_version}
+                for row, prediction in zip(rows, predictions)
+            ],
+        )
+        db.session.commit()
+
+        scored += len(rows)
+        changed += sum(row.prediction != bool(prediction) for row, prediction in zip(rows, predictions))
+        click.echo(f"{scored} records scored")
+
+    elapsed = time.perf_counter() - start
+    missing = Records.query.filter(
+        or_(Records.features.is_(None), Records.feature_schema != FEATURE_SCHEMA_VERSION)
+    ).count()
+
+    click.echo(
+        f"Re-scored {scored} records with model {model_version} in {elapsed:.1f} s; "
+        f"{changed} predictions changed"
+    )
+    if missing:
+        click.echo(
+            f"{missing} records have no stored features of schema {FEATURE_SCHEMA_VERSION} "
+            "and need the full image pipeline"
+        )
+    if incomplete:
+        click.echo(
+            f"{incomplete} records lack features the current model uses "
+            "(stored with lazy extraction) and need the full image pipeline"
+        )
+
+
 # Frontend routes
 # @app.route("/login", methods=["GET"])
 # def login_page():
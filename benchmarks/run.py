@@ -0,0 +1,265 @@
+"""
+Benchmark every pipeline stage and feature extractor on synthetic images.
+
+Usage:
+    python -m benchmarks.run [--sizes 0.5 2 8] [--repeat 3] [--output results.json]
+                             [--baseline benchmarks/baseline.json] [--threshold 0.25]
+                             [--save-baseline]
+
+For each image size (megapixels) every target is timed `--repeat` times
+(the median is reported) and run once more under tracemalloc to record
+its peak traced memory (NumPy and OpenCV arrays included). Everything
+runs offline on CPU; images come from `benchmarks.synthetic`.
+
+With `--baseline`, results are compared against a stored run and the
+exit code is 1 if any target got slower (or used more memory) than the
+baseline by more than `--threshold` (a fraction). `--save-baseline`
+writes the results to the baseline path instead.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+
+from datetime import datetime
+from datetime import timezone
+
+import numpy as np
+
+from benchmarks.synthetic import SIZES_MP
+from benchmarks.synthetic import make_cervix_image
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Timings below this are dominated by noise and never count as regressions
+MIN_SECONDS = 0.005
+
+
+def get_targets():
+    """
+    Get the benchmark targets, in pipeline order.
+
+    Returns:
+        list: (name, function) pairs. Each function takes the prepared inputs
+        (see `prepare_inputs`) and runs one target on them.
+    """
+    from model.rgb_to_gray import rgb_to_gray_converter
+    from model.multiotsu_segmentation import multiotsu_masking
+    from model.multiotsu_segmentation import _get_threshold_indices
+    from model.bitwise_operation import get_segmented_image
+    from model.yuv_color_moment import get_yuv_color_moment_features
+    from model.rgb_color_moment import get_rgb_color_moment_features
+    from model.lab_color_moment import get_lab_color_moment_features
+    from model.lbp_feature_extraction import get_lbp_features
+    from model.glrlm_feature_extraction import get_glrlm_features
+    from model.glcm_feature_extraction import get_glcm_features
+    from model.tamura_feature_extraction import get_tamura_features
+    from model.cerviscan_feature_extraction import get_cerviscan_features
+    from model.classifier import predict
+
+    def uncached_masking(gray):
+        # Repeated runs on one image would only hit the threshold cache
+        _get_threshold_indices.cache_clear()
+        return multiotsu_masking(gray)
+
+    return [
+        ("rgb_to_gray_converter", lambda inputs: rgb_to_gray_converter(inputs["bgr"])),
+        ("multiotsu_masking", lambda inputs: uncached_masking(inputs["gray"])),
+        ("get_segmented_image", lambda inputs: get_segmented_image(inputs["bgr"], inputs["mask"])),
+        ("get_yuv_color_moment_features", lambda inputs: get_yuv_color_moment_features(inputs["segmented"])),
+        ("get_rgb_color_moment_features", lambda inputs: get_rgb_color_moment_features(inputs["segmented"])),
+        ("get_lab_color_moment_features", lambda inputs: get_lab_color_moment_features(inputs["segmented"])),
+        ("get_lbp_features", lambda inputs: get_lbp_features(inputs["segmented"])),
+        ("get_glrlm_features", lambda inputs: get_glrlm_features(inputs["segmented"])),
+        ("get_glcm_features", lambda inputs: get_glcm_features(inputs["segmented"])),
+        ("get_tamura_features", lambda inputs: get_tamura_features(inputs["segmented"])),
+        (
+            "get_cerviscan_features",
+            lambda inputs: get_cerviscan_features(inputs["segmented"], use_cache=False),
+        ),
+        ("predict", lambda inputs: predict(inputs["features"])),
+    ]
+
+
+def prepare_inputs(megapixels):
+    """
+    Build the synthetic image and the intermediate inputs of later stages.
+
+    Parameters:
+        megapixels (float): Image size.
+
+    Returns:
+        dict: 'bgr', 'gray', 'mask', 'segmented' and 'features'.
+    """
+    from model.pipeline import run_pipeline
+
+    bgr = make_cervix_image(megapixels)
+    result = run_pipeline(bgr)
+    return {
+        "bgr": bgr,
+        "gray": result["gray"],
+        "mask": result["mask"],
+        "segmented": result["segmented"],
+        "features": result["features"],
+    }
+
+
+def measure(func, inputs, repeat):
+    """
+    Time a target and record its peak traced memory.
+
+    Parameters:
+        func (callable): Target from `get_targets`.
+        inputs (dict): Prepared inputs.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: Median, min and max 'seconds' and 'peak_bytes'.
+    """
+    # Warm-up run, also absorbs one-time imports and caches
+    func(inputs)
+
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(inputs)
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func(inputs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": float(np.median(seconds)),
+        "min_seconds": float(min(seconds)),
+        "max_seconds": float(max(seconds)),
+        "peak_bytes": int(peak),
+    }
+
+
+def run_benchmarks(sizes=SIZES_MP, repeat=3, only=None):
+    """
+    Run every target at every image size.
+
+    Parameters:
+        sizes (list of float): Image sizes in megapixels.
+        repeat (int): Timed runs per target.
+        only (list of str, optional): Restrict to these target names.
+
+    Returns:
+        dict: 'meta' about the machine and run, and 'results' by size label
+        and target name.
+    """
+    targets = [(name, func) for name, func in get_targets() if not only or name in only]
+
+    results = {}
+    for megapixels in sizes:
+        label = f"{megapixels:g}MP"
+        inputs = prepare_inputs(megapixels)
+        height, width = inputs["bgr"].shape[:2]
+        print(f"{label} ({width}x{height})")
+
+        results[label] = {}
+        for name, func in targets:
+            entry = measure(func, inputs, repeat)
+            results[label][name] = entry
+            print(f"  {name:<32} {entry['seconds'] * 1000:>10.1f} ms {entry['peak_bytes'] / 2 ** 20:>10.1f} MiB")
+
+    return {
+        "meta": {
+            "created_at": datetime.now(tz=timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results against a baseline run.
+
+    Times are compared on the fastest run, which is far less sensitive to
+    other load on the machine than the median.
+
+    Parameters:
+        results (dict): Output of `run_benchmarks`.
+        baseline (dict): A stored output of `run_benchmarks`.
+        threshold (float): Allowed relative increase, e.g. 0.25 for 25%.
+
+    Returns:
+        list: One message per regression; empty if there is none.
+    """
+    regressions = []
+    for label, targets in results["results"].items():
+        for name, entry in targets.items():
+            reference = baseline["results"].get(label, {}).get(name)
+            if reference is None:
+                continue
+
+            seconds, reference_seconds = entry["min_seconds"], reference["min_seconds"]
+            if seconds > MIN_SECONDS and seconds > reference_seconds * (1 + threshold):
+                regressions.append(
+                    f"{label} {name}: {seconds * 1000:.1f} ms "
+                    f"vs {reference_seconds * 1000:.1f} ms baseline (fastest run)"
+                )
+            if entry["peak_bytes"] > reference["peak_bytes"] * (1 + threshold):
+                regressions.append(
+                    f"{label} {name}: peak {entry['peak_bytes'] / 2 ** 20:.1f} MiB "
+                    f"vs {reference['peak_bytes'] / 2 ** 20:.1f} MiB baseline"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Benchmark the CerviScan pipeline on synthetic images.",
+    )
+    parser.add_argument("--sizes", type=float, nargs="+", default=SIZES_MP, help="image sizes in megapixels")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per target")
+    parser.add_argument("--only", nargs="+", help="only run these targets")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write the results to {BASELINE_PATH}")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.repeat, args.only)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {BASELINE_PATH}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions over {args.threshold:.0%}:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print(f"No regressions over {args.threshold:.0%} against {args.baseline}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Deterministic synthetic cervix-like images for benchmarking.
+
+The images are not meant to look clinical; they reproduce the structure
+the pipeline reacts to: a dark speculum background, a bright pink
+cervix disc with shading, a dark elliptical os, acetowhite patches,
+reddish vessels and sensor noise. Runtime of the texture extractors
+depends on that structure (run lengths, gray-level spread), so flat or
+pure-noise images would give misleading timings.
+"""
+
+import cv2
+import numpy as np
+
+# Megapixel sizes of the benchmark images (4:3)
+SIZES_MP = [0.5, 2, 8]
+
+
+def get_image_shape(megapixels):
+    """
+    Get a 4:3 image shape with about the given number of pixels.
+
+    Parameters:
+        megapixels (float): Target size in megapixels.
+
+    Returns:
+        tuple: (height, width).
+    """
+    height = int(round(np.sqrt(megapixels * 1e6 * 3 / 4)))
+    return height, int(round(height * 4 / 3))
+
+
+def make_cervix_image(megapixels, seed=0):
+    """
+    Generate a synthetic cervix-like BGR image.
+
+    Parameters:
+        megapixels (float): Target size in megapixels.
+        seed (int): Random seed; the same seed and size give the same image.
+
+    Returns:
+        numpy.ndarray: uint8 BGR image.
+    """
+    rng = np.random.default_rng(seed)
+    height, width = get_image_shape(megapixels)
+    scale = min(height, width)
+
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    cy, cx = height / 2, width / 2
+
+    # Dark background with a vignette
+    radius = np.hypot(yy - cy, xx - cx) / (0.5 * np.hypot(height, width))
+    image = np.empty((height, width, 3), np.float32)
+    image[:] = (20, 25, 45)
+    image *= (1.2 - 0.6 * radius)[..., None]
+
+    # Cervix disc, shaded from the center outwards
+    disc = np.hypot((yy - cy) / (0.42 * scale), (xx - cx) / (0.46 * scale))
+    inside = disc < 1
+    shading = np.clip(1.05 - 0.35 * disc ** 2, 0, None)
+    pink = np.array([150, 140, 215], np.float32)  # BGR
+    image[inside] = (pink * shading[inside, None])
+
+    # Acetowhite patches around the os
+    for _ in range(6):
+        angle = rng.uniform(0, 2 * np.pi)
+        distance = rng.uniform(0.08, 0.25) * scale
+        py, px = cy + distance * np.sin(angle), cx + distance * np.cos(angle)
+        size = rng.uniform(0.04, 0.09) * scale
+        patch = np.exp(-(((yy - py) ** 2 + (xx - px) ** 2) / (2 * size ** 2)))
+        image += (patch * inside)[..., None] * np.array([70, 75, 30], np.float32)
+
+    # Vessels: random walks drawn as thin reddish lines
+    vessels = np.zeros((height, width), np.uint8)
+    for _ in range(25):
+        points = [(cx + rng.uniform(-0.4, 0.4) * scale, cy + rng.uniform(-0.35, 0.35) * scale)]
+        heading = rng.uniform(0, 2 * np.pi)
+        for _ in range(30):
+            heading += rng.normal(0, 0.4)
+            step = 0.01 * scale
+            x, y = points[-1]
+            points.append((x + step * np.cos(heading), y + step * np.sin(heading)))
+        thickness = max(1, int(round(0.002 * scale)))
+        cv2.polylines(vessels, [np.int32(points)], False, 255, thickness)
+    vessels = (vessels > 0) & inside
+    image[vessels] = image[vessels] * np.array([0.55, 0.5, 0.9], np.float32)
+
+    # External os: a dark ellipse in the middle
+    os_mask = np.hypot((yy - cy) / (0.05 * scale), (xx - cx) / (0.11 * scale)) < 1
+    image[os_mask] = (40, 35, 90)
+
+    image = cv2.GaussianBlur(image, (0, 0), 0.002 * scale + 0.5)
+    image += rng.normal(0, 6, image.shape).astype(np.float32)
+
+    return np.clip(image, 0, 255).astype(np.uint8)
@@ -0,0 +1,30 @@
+import os
+import shutil
+import tempfile
+
+# Workers write their metrics here and /metrics merges them (see model/metrics.py).
+# Set before any worker imports prometheus_client.
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "cerviscan-metrics")
+)
+
+from prometheus_client import multiprocess  # noqa: E402
+
+# Record event streams (/api/record/<id>/events) keep their request open while
+# the job runs, for up to RECORD_EVENTS_TIMEOUT. Each worker therefore serves
+# requests on a pool of threads; with the default single sync worker one
+# watching client would block every other request.
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+
+
+def on_starting(server):
+    # Start every run with empty metrics
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,50 @@
+"""Add record job, scale and feature columns
+
+Records gained a job status and error for background processing, the
+decode scale, and the stored feature vector with its schema and model
+version; prediction is empty while a job is pending. Databases created
+by `db.create_all()` before these changes are missing the columns, newer
+ones already have them, so only missing columns are added.
+
+Revision ID: 5d2c8e4f1a73
+Revises:
+Create Date: 2026-10-17 03:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2c8e4f1a73'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = [
+    sa.Column('status', sa.String(length=20), nullable=False, server_default='done'),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('scale', sa.Float(), nullable=True),
+    sa.Column('features', sa.LargeBinary(), nullable=True),
+    sa.Column('feature_schema', sa.String(length=20), nullable=True),
+    sa.Column('model_version', sa.String(length=32), nullable=True),
+]
+
+
+def upgrade():
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('records')}
+
+    # SQLite cannot alter a column in place, so the table is rebuilt in batch mode
+    with op.batch_alter_table('records') as batch_op:
+        for column in COLUMNS:
+            if column.name not in existing:
+                batch_op.add_column(column)
+        batch_op.alter_column('prediction', existing_type=sa.Boolean(), nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('records') as batch_op:
+        batch_op.alter_column('prediction', existing_type=sa.Boolean(), nullable=False)
+        for column in reversed(COLUMNS):
+            batch_op.drop_column(column.name)
@@ -1,8 +1,211 @@
-import matplotlib.pyplot as plt 
-from PIL import Image 
 import numpy as np
 from itertools import groupby
 from model.lbp_feature_extraction import lbp_implementation
+from model.image_io import read_gray_pil
+
+GLRLM_ANGLES = ['deg0', 'deg45', 'deg90', 'deg135']
+
+
+def _skew(levels, fill):
+    """
+    Lay out the anti-diagonals of `levels` as columns of a new array.
+
+    The image is copied into a buffer that is one column wider than the
+    skewed layout; reading that buffer back with the narrower row stride
+    shifts row r by r cells, so pixel (r, c) lands in column r + c. All
+    cells that do not belong to the image, plus one extra trailing row that
+    separates the columns once they are flattened, hold `fill`.
+
+    Parameters:
+        levels (numpy.ndarray): 2D array of gray-level indices.
+        fill (int): Sentinel value for cells outside the image.
+
+    Returns:
+        numpy.ndarray: Array of shape (x + 1, x + y - 1).
+    """
+    x, y = levels.shape
+    buffer = np.full((x + 1, x + y), fill, dtype=levels.dtype)
+    buffer[:x, :y] = levels
+    return buffer.ravel()[:(x + 1) * (x + y - 1)].reshape(x + 1, x + y - 1)
+
+
+def _direction_sequence(levels, angle, fill):
+    """
+    Flatten all lines of one GLRLM direction into a single 1D sequence.
+
+    Consecutive lines are separated by at least one `fill` cell so that no
+    run can continue from one line into the next.
+
+    Parameters:
+        levels (numpy.ndarray): 2D array of gray-level indices.
+        angle (str): One of `GLRLM_ANGLES`.
+        fill (int): Sentinel value used as the line separator.
+
+    Returns:
+        numpy.ndarray: 1D sequence of gray-level indices and separators.
+    """
+    if angle in ('deg0', 'deg90'):
+        lines = levels if angle == 'deg0' else levels.T
+        padded = np.full((lines.shape[0], lines.shape[1] + 1), fill, dtype=levels.dtype)
+        padded[:, :-1] = lines
+        return padded.ravel()
+    if angle == 'deg45':
+        return _skew(levels, fill).T.ravel()
+    if angle == 'deg135':
+        return _skew(levels[:, ::-1], fill).T.ravel()
+    raise ValueError(f"Unsupported GLRLM angle: {angle}")
+
+
+def compute_glrlm(array, theta=GLRLM_ANGLES):
+    """
+    Compute the Gray-Level Run Length Matrix for several directions at once.
+
+    Runs are found with whole-array operations: every direction is
+    flattened into one sequence (rows, columns, anti-diagonals for 45
+    degrees and main diagonals for 135 degrees), run boundaries are located
+    with `np.diff`/`np.flatnonzero`, and the (gray level, run length) pairs
+    are accumulated with a single `np.bincount` per direction.
+
+    Parameters:
+        array (numpy.ndarray): 2D integer image.
+        theta (list of str): Angles to compute, any of `GLRLM_ANGLES`.
+
+    Returns:
+        numpy.ndarray: GLRLM of shape (num_level, max(x, y), len(theta)),
+        identical to `compute_glrlm_reference`.
+    """
+    P = np.asarray(array)
+    x, y = P.shape
+    min_pixels = np.min(P).astype(np.int32)
+    max_pixels = np.max(P).astype(np.int32)
+    run_length = max(x, y)
+    num_level = max_pixels - min_pixels + 1
+
+    dtype = np.int16 if num_level < np.iinfo(np.int16).max else np.int32
+    levels = (P.astype(np.int32) - min_pixels).astype(dtype)
+    fill = -1
+
+    glrlm = np.zeros((num_level, run_length, len(theta)))
+
+    for index, angle in enumerate(theta):
+        sequence = _direction_sequence(levels, angle, fill)
+        starts = np.flatnonzero(np.diff(sequence)) + 1
+        starts = np.concatenate(([0], starts))
+        lengths = np.diff(np.append(starts, sequence.size))
+        values = sequence[starts]
+
+        valid = values != fill
+        values = values[valid].astype(np.int64)
+        lengths = lengths[valid]
+
+        counts = np.bincount(values * run_length + (lengths - 1), minlength=num_level * run_length)
+        glrlm[:, :, index] = counts.reshape(num_level, run_length)
+
+    return glrlm
+
+
+def compute_glrlm_reference(array, theta=GLRLM_ANGLES):
+    """
+    Compute the GLRLM with the original per-run loops.
+
+    This is the reference implementation `compute_glrlm` is checked against.
+
+    Parameters:
+        array (numpy.ndarray): 2D integer image.
+        theta (list of str): Angles to compute, any of `GLRLM_ANGLES`.
+
+    Returns:
+        numpy.ndarray: GLRLM of shape (num_level, max(x, y), len(theta)).
+    """
+    P = np.asarray(array)
+    x, y = P.shape
+    min_pixels = np.min(P).astype(np.int32)
+    max_pixels = np.max(P).astype(np.int32)
+    run_length = max(x, y)
+    num_level = max_pixels - min_pixels + 1
+
+    # Pixel sequences for the different angles
+    Pt = np.rot90(P, 3)
+    sequences = {
+        'deg0': [val.tolist() for sublist in np.vsplit(P, x) for val in sublist],
+        'deg90': [val.tolist() for sublist in np.split(np.transpose(P), y) for val in sublist],
+        'deg45': [n.tolist() for n in (P[::-1, :].diagonal(i) for i in range(-P.shape[0] + 1, P.shape[1]))],
+        'deg135': [n.tolist() for n in (Pt[::-1, :].diagonal(i) for i in range(-Pt.shape[0] + 1, Pt.shape[1]))],
+    }
+
+    glrlm = np.zeros((num_level, run_length, len(theta)))
+    for index, angle in enumerate(theta):
+        for flattened in sequences[angle]:
+            for key, run in groupby(flattened):
+                glrlm[int(key - min_pixels), sum(1 for _ in run) - 1, index] += 1
+    return glrlm
+
+
+GLRLM_FEATURES = ['SRE', 'LRE', 'GLN', 'RLN', 'RP', 'LGLRE', 'HGL', 'SRLGLE', 'SRHGLE', 'LRLGLE', 'LRHGLE']
+
+
+def compute_glrlm_features(glrlm):
+    """
+    Computes all 11 GLRLM statistics for every angle in one pass.
+
+    The I^2 and J^2 weight vectors and the total S are built once for all
+    angles. Features whose terms are integers (LRE, GLN, RLN, RP, HGL,
+    LRLGLE, LRHGLE) are reduced from the gray-level and run-length
+    marginals. The four features that divide by I^2 or J^2 (SRE, LGLRE,
+    SRLGLE, SRHGLE) are accumulated one gray level at a time in the same
+    order as the `get*` methods sum their full-size temporaries, so every
+    value is bit-identical to the per-feature methods. Gray level 0 is
+    skipped for the 1/I^2 features, which is what the inf/NaN -> 0
+    replacement in `apply_over_degree` amounts to.
+
+    Parameters:
+    - glrlm (np.ndarray): GLRLM of shape (gray_level, run_length, angles).
+
+    Returns:
+    - np.ndarray: Array of shape (angles, 11), columns ordered as `GLRLM_FEATURES`.
+    """
+    gray_level, run_length, angles = glrlm.shape
+
+    I = np.arange(gray_level, dtype=np.float64)
+    J = np.arange(1, run_length + 1, dtype=np.float64)
+    I2 = I * I
+    J2 = J * J
+
+    G = glrlm.sum(axis=1)  # gray-level marginal, (gray_level, angles)
+    R = glrlm.sum(axis=0)  # run-length marginal, (run_length, angles)
+    S = G.sum(axis=0)
+    G_J2 = np.tensordot(glrlm, J2, axes=([1], [0]))  # (gray_level, angles)
+
+    # SRE, LGLRE, SRLGLE, SRHGLE column sums, (run_length, angles) each.
+    # The run lengths are then summed one after the other, like the
+    # methods' sum over axis 1 does; a pairwise sum along the run lengths
+    # changes the last bit.
+    SRE, LGLRE, SRLGLE, SRHGLE = range(4)
+    column_sums = np.zeros((4, run_length, angles))
+    J2_column = J2[:, None]
+    for i in range(gray_level):
+        P = glrlm[i]
+        column_sums[SRE] += P / J2_column
+        column_sums[SRHGLE] += (P * I2[i]) / J2_column
+        if i:
+            column_sums[LGLRE] += P / I2[i]
+            column_sums[SRLGLE] += P / (I2[i] * J2_column)
+    numerators = column_sums.sum(axis=1)
+
+    features = np.empty((angles, len(GLRLM_FEATURES)))
+    features[:, 0] = numerators[SRE] / S
+    features[:, 1] = J2 @ R / S
+    features[:, 2] = (G * G).sum(axis=0) / S
+    features[:, 3] = (R * R).sum(axis=0) / S
+    features[:, 4] = S / (gray_level * run_length)
+    features[:, 5] = numerators[LGLRE] / S
+    features[:, 6] = I2 @ G / S
+    features[:, 7] = numerators[SRLGLE] / S
+    features[:, 8] = numerators[SRHGLE] / S
+    features[:, 9] = S / S  # LRLGLE: (P * J^2) / J^2 == P exactly
+    features[:, 10] = I2 @ G_J2 / S
+    return features
+
 
 class getGrayRumatrix:
     def __init__(self):
@@ -14,10 +217,10 @@ class getGrayRumatrix:
     
     def read_img(self, path=" ", lbp="off"):
         """
-        Reads an image from the specified path and converts it to grayscale.
+        Reads an image from the specified path (or a decoded BGR array) and converts it to grayscale.
 
         Parameters:
-        - path (str): Path to the image file.
+        - path (str or np.ndarray): Path to the image file, or a decoded BGR array.
         - lbp (str): Option to use LBP preprocessing. Default is 'off'.
 
         Returns:
@@ -25,9 +228,7 @@ class getGrayRumatrix:
         """
         try:
             if lbp == 'off':
-                img = Image.open(path)
-                img = img.convert('L')  # Convert to grayscale
-                self.data = np.array(img)
+                self.data = read_gray_pil(path)  # Convert to grayscale
             else:
                 self.data = lbp_implementation(path)
             return self.data
@@ -47,41 +248,7 @@ class getGrayRumatrix:
         Returns:
         - np.ndarray: GLRLM as a 3D numpy array.
         """
-        P = array
-        x, y = P.shape
-        min_pixels = np.min(P).astype(np.int32)  # Minimum pixel value
-        max_pixels = np.max(P).astype(np.int32)  # Maximum pixel value
-        run_length = max(x, y)  # Maximum run length in pixels
-        num_level = max_pixels - min_pixels + 1
-        
-        # Define pixel sequences for different angles
-        deg0 = [val.tolist() for sublist in np.vsplit(P, x) for val in sublist]
-        deg90 = [val.tolist() for sublist in np.split(np.transpose(P), y) for val in sublist]
-        diags = [P[::-1, :].diagonal(i) for i in range(-P.shape[0]+1, P.shape[1])]
-        deg45 = [n.tolist() for n in diags]
-        Pt = np.rot90(P, 3)  # Rotate for 135 degrees
-        diags = [Pt[::-1, :].diagonal(i) for i in range(-Pt.shape[0]+1, Pt.shape[1])]
-        deg135 = [n.tolist() for n in diags]
-
-        def length(l):
-            """Computes the length of an iterable."""
-            if hasattr(l, '__len__'):
-                return np.size(l)
-            else:
-                return sum(1 for _ in l)
-
-        glrlm = np.zeros((num_level, run_length, len(theta)))
-        
-        for angle in theta:
-            for splitvec in range(0, len(eval(angle))):
-                flattened = eval(angle)[splitvec]
-                answer = []
-                for key, iter in groupby(flattened):
-                    answer.append((key, length(iter)))
-                for ansIndex in range(0, len(answer)):
-                    glrlm[int(answer[ansIndex][0]-min_pixels), int(answer[ansIndex][1]-1), theta.index(angle)] += 1
-        
-        return glrlm
+        return compute_glrlm(array, theta)
 
     def apply_over_degree(self, function, x1, x2):
         """
@@ -0,0 +1,319 @@
+"""
+Offline feature extraction and scoring over a directory of images.
+
+Usage:
+    python -m model.batch <input_dir> <output_dir> [--workers N] [--shard-size N]
+
+Every image under `input_dir` is run through the CerviScan pipeline on a
+process pool. Results are checkpointed to `output_dir` in shards, so an
+interrupted run picks up where it stopped when started again with the
+same arguments. When all images are done the shards are merged into one
+columnar file: `features.parquet` if pyarrow is installed, otherwise
+`features.npy` (a structured array). Both come with `schema.json`.
+Per-stage throughput is printed at the end. Images are decoded with the
+same resolution cap as the app (CERVISCAN_MAX_LONG_SIDE).
+
+Feature blocks are read from and stored in the shared feature cache (see
+`model.feature_cache`), so rerunning the batch into a new output directory
+after changing one extractor only recomputes that extractor's features.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+
+STAGES = ["decode", "gray", "mask", "segment", "features", "predict"]
+
+SCHEMA_VERSION = 2
+
+
+def find_images(input_dir):
+    """
+    List all images under a directory.
+
+    Parameters:
+        input_dir (str): Directory to walk recursively.
+
+    Returns:
+        list: Image paths relative to `input_dir`, sorted.
+    """
+    images = []
+    for root, _, files in os.walk(input_dir):
+        for name in files:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                images.append(os.path.relpath(os.path.join(root, name), input_dir))
+    return sorted(images)
+
+
+def _init_worker():
+    # Each worker already is one of many processes; run its stages inline.
+    import model.stage_graph
+
+    model.stage_graph.STAGE_WORKERS = 0
+
+
+def process_image(input_dir, relative_path):
+    """
+    Run the pipeline and the classifier on one image; runs in a worker process.
+
+    Parameters:
+        input_dir (str): Root directory of the batch.
+        relative_path (str): Image path relative to `input_dir`.
+
+    Returns:
+        dict: 'path', 'features', 'prediction', the decode 'scale' and
+        per-stage 'timings', or
+        'path' and 'error' if the image could not be processed.
+    """
+    from model.image_io import read_normalized_bgr
+    from model.pipeline import run_pipeline
+    from model.classifier import predict
+    from model.legacy_segmentation import get_legacy_format
+
+    timings = {}
+    try:
+        start = time.perf_counter()
+        image, scale = read_normalized_bgr(os.path.join(input_dir, relative_path))
+        timings["decode"] = time.perf_counter() - start
+        if image is None:
+            raise ValueError("image could not be decoded")
+
+        # The full vector is exported, not only the features the model uses
+        result = run_pipeline(
+            image, timings, lazy=False, legacy_format=get_legacy_format(relative_path), use_cache=True
+        )
+
+        start = time.perf_counter()
+        prediction = predict(result["features"])
+        timings["predict"] = time.perf_counter() - start
+    except Exception as e:
+        return {"path": relative_path, "error": str(e)}
+
+    return {
+        "path": relative_path,
+        "features": result["feature_vector"],
+        "prediction": int(prediction[0]),
+        "scale": scale,
+        "timings": timings,
+    }
+
+
+def _shard_paths(output_dir):
+    return sorted(
+        os.path.join(output_dir, name)
+        for name in os.listdir(output_dir)
+        if name.startswith("shard-") and name.endswith(".npz")
+    )
+
+
+def load_done(output_dir):
+    """
+    Get the images already stored in checkpoint shards.
+
+    Parameters:
+        output_dir (str): Output directory of the batch.
+
+    Returns:
+        set: Relative paths of the processed images.
+    """
+    done = set()
+    for path in _shard_paths(output_dir):
+        with np.load(path) as shard:
+            done.update(shard["paths"].tolist())
+    return done
+
+
+def write_shard(output_dir, results):
+    """
+    Atomically write a checkpoint shard.
+
+    Parameters:
+        output_dir (str): Output directory of the batch.
+        results (list of dict): Successful results of `process_image`.
+    """
+    index = len(_shard_paths(output_dir))
+    path = os.path.join(output_dir, f"shard-{index:05d}.npz")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            paths=np.array([r["path"] for r in results]),
+            features=np.array([r["features"] for r in results], dtype=np.float64),
+            predictions=np.array([r["prediction"] for r in results], dtype=np.int8),
+            scales=np.array([r["scale"] for r in results], dtype=np.float64),
+        )
+    os.replace(tmp_path, path)
+
+
+def merge_shards(output_dir, feature_names):
+    """
+    Merge all checkpoint shards into one columnar file plus `schema.json`.
+
+    Parameters:
+        output_dir (str): Output directory of the batch.
+        feature_names (list): Names of the feature columns.
+
+    Returns:
+        str: Path of the merged file.
+    """
+    paths, features, predictions, scales = [], [], [], []
+    for path in _shard_paths(output_dir):
+        with np.load(path) as shard:
+            paths.append(shard["paths"])
+            features.append(shard["features"])
+            predictions.append(shard["predictions"])
+            # Shards written before the resolution cap were full resolution
+            scales.append(shard["scales"] if "scales" in shard else np.ones(len(shard["paths"])))
+
+    paths = np.concatenate(paths) if paths else np.array([], dtype=str)
+    features = np.concatenate(features) if features else np.zeros((0, len(feature_names)))
+    predictions = np.concatenate(predictions) if predictions else np.array([], dtype=np.int8)
+    scales = np.concatenate(scales) if scales else np.array([], dtype=np.float64)
+
+    columns = [("path", "string"), ("prediction", "int8"), ("scale", "float64")]
+    columns += [(name, "float64") for name in feature_names]
+
+    try:
+        import pandas as pd
+        import pyarrow  # noqa: F401
+
+        frame = pd.DataFrame(features, columns=feature_names)
+        frame.insert(0, "scale", scales)
+        frame.insert(0, "prediction", predictions)
+        frame.insert(0, "path", paths)
+        merged_path = os.path.join(output_dir, "features.parquet")
+        frame.to_parquet(merged_path, index=False)
+    except ImportError:
+        dtype = [("path", f"U{max(1, max((len(p) for p in paths), default=1))}"), ("prediction", "i1"), ("scale", "f8")]
+        dtype += [(name, "f8") for name in feature_names]
+        table = np.zeros(len(paths), dtype=dtype)
+        table["path"] = paths
+        table["prediction"] = predictions
+        table["scale"] = scales
+        for i, name in enumerate(feature_names):
+            table[name] = features[:, i]
+        merged_path = os.path.join(output_dir, "features.npy")
+        np.save(merged_path, table)
+
+    with open(os.path.join(output_dir, "schema.json"), "w") as f:
+        json.dump(
+            {
+                "schema_version": SCHEMA_VERSION,
+                "file": os.path.basename(merged_path),
+                "rows": int(len(paths)),
+                "columns": [{"name": name, "type": kind} for name, kind in columns],
+            },
+            f,
+            indent=2,
+        )
+
+    return merged_path
+
+
+def report(stage_totals, processed, failed, wall_time):
+    """
+    Print per-stage time and throughput for the run.
+
+    Parameters:
+        stage_totals (dict): Summed seconds per stage over all images.
+        processed (int): Number of images processed in this run.
+        failed (int): Number of images that failed in this run.
+        wall_time (float): Wall time of the run in seconds.
+    """
+    print(f"Processed {processed} images ({failed} failed) in {wall_time:.1f}s", end="")
+    if wall_time > 0:
+        print(f" ({processed / wall_time:.2f} images/s)")
+    else:
+        print()
+
+    print(f"{'stage':<10} {'total s':>10} {'ms/image':>10} {'images/s':>10}")
+    for stage in STAGES:
+        total = stage_totals.get(stage, 0.0)
+        per_image = total / processed * 1000 if processed else 0.0
+        rate = processed / total if total else 0.0
+        print(f"{stage:<10} {total:>10.2f} {per_image:>10.1f} {rate:>10.2f}")
+
+
+def run_batch(input_dir, output_dir, workers=None, shard_size=100):
+    """
+    Extract features and predictions for every image in a directory.
+
+    Parameters:
+        input_dir (str): Directory with the images.
+        output_dir (str): Directory for the checkpoint shards and the merged output.
+        workers (int, optional): Worker processes. Defaults to the CPU count.
+        shard_size (int): Number of results per checkpoint shard.
+
+    Returns:
+        str: Path of the merged output file.
+    """
+    from model.cerviscan_feature_extraction import get_cerviscan_feature_names
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    images = find_images(input_dir)
+    done = load_done(output_dir)
+    todo = [path for path in images if path not in done]
+    print(f"{len(images)} images found, {len(done)} already done, {len(todo)} to process")
+
+    stage_totals = {}
+    buffer = []
+    processed = failed = 0
+    start = time.perf_counter()
+
+    with open(os.path.join(output_dir, "errors.jsonl"), "a") as errors:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(process_image, input_dir, path) for path in todo]
+            for future in as_completed(futures):
+                result = future.result()
+                processed += 1
+
+                if "error" in result:
+                    failed += 1
+                    errors.write(json.dumps(result) + "\n")
+                    errors.flush()
+                    continue
+
+                for stage, seconds in result["timings"].items():
+                    stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+
+                buffer.append(result)
+                if len(buffer) >= shard_size:
+                    write_shard(output_dir, buffer)
+                    buffer = []
+
+            if buffer:
+                write_shard(output_dir, buffer)
+
+    merged_path = merge_shards(output_dir, get_cerviscan_feature_names())
+    report(stage_totals, processed - failed, failed, time.perf_counter() - start)
+    print(f"Results written to {merged_path}")
+
+    return merged_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m model.batch",
+        description="Extract CerviScan features and predictions for a directory of images.",
+    )
+    parser.add_argument("input_dir", help="directory with the images (searched recursively)")
+    parser.add_argument("output_dir", help="directory for checkpoints and results")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--shard-size", type=int, default=100, help="results per checkpoint shard")
+    args = parser.parse_args(argv)
+
+    run_batch(args.input_dir, args.output_dir, args.workers, args.shard_size)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,15 @@
 import cv2
+import numpy as np
 
-def get_segmented_image(original_image, mask_path):
-    mask_image = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
+def get_segmented_image(original_image, mask):
+    if isinstance(mask, np.ndarray):
+        mask_image = mask
+    else:
+        mask_image = cv2.imread(mask, cv2.IMREAD_GRAYSCALE)
     
     # Ensure the mask image has the same dimensions as the original image
-    mask_image = cv2.resize(mask_image, (original_image.shape[1], original_image.shape[0]))
+    if mask_image.shape[:2] != original_image.shape[:2]:
+        mask_image = cv2.resize(mask_image, (original_image.shape[1], original_image.shape[0]))
 
     # Convert the grayscale mask to a 3-channel image
     mask_image_3channel = cv2.cvtColor(mask_image, cv2.COLOR_GRAY2RGB)
@@ -13,3 +18,45 @@ def get_segmented_image(original_image, mask_path):
     dest_and = cv2.bitwise_and(original_image, mask_image_3channel)
 
     return dest_and
+
+
+def segment_image(original_image, mask, out=None):
+    """
+    Zero the background of an image in one pass, without a 3-channel mask.
+
+    For a 0/255 mask the result equals `get_segmented_image`.
+
+    Parameters:
+        original_image (numpy.ndarray): BGR image of shape (H, W, 3).
+        mask (numpy.ndarray): bool or uint8 mask of shape (H, W); nonzero
+            pixels are kept.
+        out (numpy.ndarray, optional): Output buffer of the image shape and
+            dtype. Pass `original_image` itself to segment in place.
+
+    Returns:
+        tuple: The segmented image, the bounding box of the mask as
+        (x, y, width, height) or None if the mask is empty, and the number
+        of mask pixels.
+    """
+    if mask.shape != original_image.shape[:2]:
+        raise ValueError(
+            f"Mask shape {mask.shape} does not match image shape {original_image.shape[:2]}"
+        )
+
+    # OpenCV masks are single-channel uint8; a bool mask is viewed as such
+    mask_u8 = mask.view(np.uint8) if mask.dtype == np.bool_ else mask
+
+    if out is None:
+        # A newly allocated destination starts zeroed
+        out = cv2.bitwise_and(original_image, original_image, mask=mask_u8)
+    elif out is original_image:
+        background = cv2.compare(mask_u8, 0, cv2.CMP_EQ)
+        cv2.subtract(out, out, dst=out, mask=background)
+    else:
+        out.fill(0)
+        cv2.bitwise_and(original_image, original_image, dst=out, mask=mask_u8)
+
+    pixel_count = cv2.countNonZero(mask_u8)
+    bounding_box = cv2.boundingRect(mask_u8) if pixel_count else None
+
+    return out, bounding_box, pixel_count
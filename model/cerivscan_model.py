@@ -1,38 +1,36 @@
-from rgb_to_gray import rgb_to_gray_converter
-from multiotsu_segmentation import multiotsu_masking
-from bitwise_operation import get_segmented_image
+import os
+import sys
 
-from cerviscan_feature_extraction import get_cerviscan_features
+from model.image_io import read_normalized_bgr
+from model.pipeline import run_pipeline
+from model.legacy_segmentation import get_legacy_format
+from model.classifier import predict
 
-import os
-import pickle
-import matplotlib.pyplot as plt 
+import cv2
 
 def cerviscanModel(image_path, image_output):
-    image = plt.imread(image_path)
-    
-    # Convert RBG Image to Grayscale Image
-    gray_image = rgb_to_gray_converter(image_path)
-    output_path = os.path.join(f'{image_output}', f"{os.path.basename(image_path)[:-4]}_gray.jpg")
-    plt.imsave(output_path, gray_image, cmap="gray")
-    
-    # Get Image Masking
-    mask_image = multiotsu_masking(gray_image)
-    output_path = os.path.join(f'{image_output}', f"{os.path.basename(image_path)[:-4]}_mask.jpg")
-    plt.imsave(output_path, mask_image, cmap="gray")
-    
-    # Segment Image Using Image Masking
-    segmented_image = get_segmented_image(image, mask_image)
-    
-    output_path = os.path.join(f'{image_output}', f"{os.path.basename(image_path)[:-4]}_segmented.jpg")
-    plt.imsave(output_path, segmented_image, cmap="gray")
-    
-    features = get_cerviscan_features(f'./{image_output}/{os.path.basename(image_path)[:-4]}_segmented.jpg')
-    
-    model = pickle.load(open('./xgb_best', 'rb'))
-    result = model.predict(features)
-    
+    # Decode once; intermediates are only written out for inspection
+    image, _ = read_normalized_bgr(image_path)
+
+    result = run_pipeline(image, legacy_format=get_legacy_format(image_path))
+
+    name = os.path.splitext(os.path.basename(image_path))[0]
+    os.makedirs(image_output, exist_ok=True)
+    cv2.imwrite(os.path.join(image_output, f"{name}_gray.jpg"), result["gray"])
+    cv2.imwrite(os.path.join(image_output, f"{name}_mask.jpg"), result["mask"])
+    cv2.imwrite(os.path.join(image_output, f"{name}_segmented.jpg"), result["segmented"])
+
+    features = result["features"]
+    result = predict(features)
+
     return features, result
-    
 
-cerviscanModel("../static/uploads/AAA1.jpg", "../try")
\ No newline at end of file
+
+# Single image: python -m model.cerivscan_model <image> <output_dir>
+# Directories: python -m model.batch <input_dir> <output_dir>
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m model.cerivscan_model <image> <output_dir>")
+        sys.exit(1)
+    features, result = cerviscanModel(sys.argv[1], sys.argv[2])
+    print(result)
@@ -1,39 +1,227 @@
 from model.lab_color_moment import get_lab_color_moment_features, get_lab_color_moment_feature_names
-from model.yuv_color_moment import get_yuv_color_moment_features, get_yuv_color_moment_feature_names
+from model.yuv_color_moment import get_yuv_color_moment_features_from_rgb, get_yuv_color_moment_feature_names
+from model.yuv_color_moment import YUV_FEATURES_VERSION
 
-from model.lbp_feature_extraction import get_lbp_features, get_lbp_feature_names
-from model.glrlm_feature_extraction import get_glrlm_features, get_glrlm_feature_names
-from model.tamura_feature_extraction import get_tamura_features, get_tamura_feature_names
+from model.lbp_feature_extraction import compute_lbp, get_lbp_features_from_lbp, get_lbp_feature_names
+from model.lbp_feature_extraction import LBP_FEATURES_VERSION
+from model.glrlm_feature_extraction import get_glrlm_features_from_gray, get_glrlm_feature_names
+from model.glrlm_feature_extraction import GLRLM_FEATURES_VERSION
+from model.GrayRumatrix import GLRLM_ANGLES
+from model.tamura_feature_extraction import get_tamura_features_from_gray, get_tamura_feature_names
+from model.tamura_feature_extraction import TAMURA_FEATURES_VERSION
 
-import pandas as pd
+from functools import partial
 
-def get_cerviscan_features(image_path):
-    features = []
+from model.image_io import read_bgr, read_rgb, read_gray, read_gray_pil
+from model.stage_graph import Stage, run_stages, select_stages, get_stage_executor
+from model.feature_cache import get_feature_cache, hash_image
+
+import numpy as np
+
+# Each extractor declares the derived image it needs; shared inputs are
+# computed once and independent extractors run concurrently.
+CERVISCAN_STAGES = [
+    Stage("rgb", read_rgb, ["bgr"]),
+    Stage("gray", read_gray, ["bgr"]),
+    Stage("gray_pil", read_gray_pil, ["bgr"]),
+    Stage("lbp", compute_lbp, ["gray"]),
+    Stage("yuv_features", get_yuv_color_moment_features_from_rgb, ["rgb"]),
+    Stage("lbp_features", get_lbp_features_from_lbp, ["lbp"]),
+    Stage("glrlm_features", get_glrlm_features_from_gray, ["gray_pil"]),
+    Stage("tamura_features", get_tamura_features_from_gray, ["gray"]),
+]
+
+# Stages attributed to each extractor when reporting per-extractor timings;
+# the shared gray conversion is not attributed to any of them
+CERVISCAN_EXTRACTOR_STAGES = {
+    "yuv": ["rgb", "yuv_features"],
+    "lbp": ["lbp", "lbp_features"],
+    "glrlm": ["gray_pil", "glrlm_features"],
+    "tamura": ["tamura_features"],
+}
+
+# Canonical order of the feature vector
+CERVISCAN_FEATURE_BLOCKS = [
+    ("yuv_features", get_yuv_color_moment_feature_names),
+    ("lbp_features", get_lbp_feature_names),
+    ("glrlm_features", get_glrlm_feature_names),
+    ("tamura_features", get_tamura_feature_names),
+]
+
+# Cache identity of each block (see model/feature_cache.py): extractor name,
+# declared version and the parameters the stages above run with
+CERVISCAN_BLOCK_EXTRACTORS = {
+    "yuv_features": ("yuv", YUV_FEATURES_VERSION, {"spaces": ["yuv"]}),
+    "lbp_features": ("lbp", LBP_FEATURES_VERSION, {"border": "legacy"}),
+    "glrlm_features": ("glrlm", GLRLM_FEATURES_VERSION, {"angles": GLRLM_ANGLES}),
+    "tamura_features": ("tamura", TAMURA_FEATURES_VERSION, {"kmax": 5}),
+}
+
+# Version of the stored feature vector layout (`get_cerviscan_feature_names`
+# order, float32); bump when a block is added, removed or reordered
+FEATURE_SCHEMA_VERSION = "1"
+
+# Value of features that were not computed (see `get_feature_plan`). XGBoost
+# reads NaN as missing; a feature no tree splits on gives the same prediction
+# whatever its value, and NaN marks stored vectors as incomplete.
+SKIPPED_FEATURE_VALUE = float("nan")
+
+def get_cerviscan_feature_names():
     features_name = []
-    
-    lab_features = get_yuv_color_moment_features(image_path)
-    lab_features_name = get_yuv_color_moment_feature_names()
-    
-    lbp_features = get_lbp_features(image_path)
-    lbp_features_name = get_lbp_feature_names()
-    
-    glrlm_features = get_glrlm_features(image_path)
-    glrlm_features_name = get_glrlm_feature_names()
-    
-    tamura_features = get_tamura_features(image_path)
-    tamura_features_name = get_tamura_feature_names()
-    
-    features.extend(lab_features)
-    features.extend(lbp_features)
-    features.extend(glrlm_features)
-    features.extend(tamura_features)
-    
-    features_name.extend(lab_features_name)
-    features_name.extend(lbp_features_name)
-    features_name.extend(glrlm_features_name)   
-    features_name.extend(tamura_features_name)
-    
-    df_features = pd.DataFrame([features], columns=features_name)
-    df_features = df_features.loc[:, (df_features != 1).any()]
-    
-    return df_features
\ No newline at end of file
+    for _, get_names in CERVISCAN_FEATURE_BLOCKS:
+        features_name.extend(get_names())
+    return features_name
+
+def get_feature_plan(features=None):
+    """
+    Work out which extractor work a set of features needs.
+
+    GLRLM is planned per angle and Tamura per feature; the other blocks are
+    computed whole as soon as one of their features is wanted.
+
+    Parameters:
+        features (iterable of str, optional): Names of the features that must
+            be computed. Defaults to all of them.
+
+    Returns:
+        dict: For every block to compute, the keyword arguments of its
+        feature stage (empty to compute the whole block). Blocks that are
+        not in it are skipped.
+    """
+    if features is None:
+        return {block: {} for block, _ in CERVISCAN_FEATURE_BLOCKS}
+
+    features = set(features)
+    plan = {}
+    for block, get_names in CERVISCAN_FEATURE_BLOCKS:
+        names = get_names()
+        wanted = [name for name in names if name in features]
+        if not wanted:
+            continue
+
+        plan[block] = {}
+        if block == "glrlm_features":
+            angles = [deg for deg in GLRLM_ANGLES if any(name.rsplit("_", 1)[1] == deg for name in wanted)]
+            if len(angles) < len(GLRLM_ANGLES):
+                plan[block] = {"angles": angles}
+        elif block == "tamura_features" and len(wanted) < len(names):
+            plan[block] = {"features": wanted}
+    return plan
+
+def get_cerviscan_feature_vector(image, executor=None, timings=None, cpu_timings=None, use_cache=False, features=None):
+    """
+    Extract the full CerviScan feature vector, without dropping any column.
+
+    Parameters:
+        image (str or numpy.ndarray): Path to the image, or a decoded BGR array.
+        executor (concurrent.futures.Executor, optional): Pool for the stage
+            graph. Defaults to `get_stage_executor()`; `SEQUENTIAL` runs
+            every stage in the calling thread.
+        timings (dict, optional): If given, the wall time in seconds of each
+            extractor ('yuv', 'lbp', 'glrlm', 'tamura') is stored in it.
+            Extractors whose block came from the cache are left out.
+        cpu_timings (dict, optional): Same for the CPU time of each extractor.
+        use_cache (bool): Read and store blocks in the shared feature cache
+            (see `model.feature_cache`), so only stale blocks are computed.
+            Off by default; meant for offline reruns such as `model.batch`.
+        features (iterable of str, optional): Only compute the work these
+            features need (see `get_feature_plan`); the values of skipped
+            features are `SKIPPED_FEATURE_VALUE`. Defaults to all features.
+
+    Returns:
+        list: Feature values in the order of `get_cerviscan_feature_names()`.
+    """
+    # Decode once; every extractor below works on the in-memory BGR array
+    image = read_bgr(image)
+
+    plan = get_feature_plan(features)
+    sources = {"bgr": image}
+    for block, get_names in CERVISCAN_FEATURE_BLOCKS:
+        if block not in plan:
+            sources[block] = [SKIPPED_FEATURE_VALUE] * len(get_names())
+
+    cache = get_feature_cache() if use_cache else None
+    keys, cached = {}, {}
+    if cache is not None and cache.enabled:
+        image_hash = hash_image(image)
+        for block, options in plan.items():
+            extractor, version, params = CERVISCAN_BLOCK_EXTRACTORS[block]
+            keys[block] = cache.make_key(image_hash, extractor, version, {**params, **options})
+            block_values = cache.get(keys[block])
+            if block_values is not None:
+                cached[block] = block_values
+    sources.update(cached)
+
+    # Only the stages behind planned blocks missing from the cache run
+    stages = [
+        Stage(stage.name, partial(stage.func, **plan[stage.output]), stage.inputs, stage.output)
+        if plan.get(stage.output) else stage
+        for stage in CERVISCAN_STAGES
+    ]
+    stages = select_stages(stages, [block for block, _ in CERVISCAN_FEATURE_BLOCKS], sources)
+
+    if executor is None:
+        executor = get_stage_executor()
+    stage_timings, stage_cpu_timings = {}, {}
+    values = run_stages(stages, sources, executor, stage_timings, stage_cpu_timings)
+
+    for block, key in keys.items():
+        if block not in cached:
+            cache.put(key, values[block])
+
+    for totals, per_stage in ((timings, stage_timings), (cpu_timings, stage_cpu_timings)):
+        if totals is not None:
+            for extractor, extractor_stages in CERVISCAN_EXTRACTOR_STAGES.items():
+                ran = [stage for stage in extractor_stages if stage in per_stage]
+                if ran:
+                    totals[extractor] = sum(per_stage[stage] for stage in ran)
+
+    features = []
+    for block, _ in CERVISCAN_FEATURE_BLOCKS:
+        features.extend(values[block])
+    return features
+
+def get_cerviscan_features(image, executor=None, use_cache=False):
+    return to_feature_frame(get_cerviscan_feature_vector(image, executor, use_cache=use_cache))
+
+def to_feature_frame(features):
+    """
+    Build a one-row DataFrame from a full feature vector, e.g. for exports.
+
+    The model takes `feature_schema.to_model_input` instead; pandas is only
+    imported here, off the request path.
+
+    Parameters:
+        features (list): Values in the order of `get_cerviscan_feature_names()`.
+
+    Returns:
+        pandas.DataFrame: One row with every feature as a column.
+    """
+    import pandas as pd
+
+    return pd.DataFrame([features], columns=get_cerviscan_feature_names())
+
+def encode_feature_vector(features):
+    """
+    Pack a full feature vector into a compact blob for storage.
+
+    Parameters:
+        features (list): Values in the order of `get_cerviscan_feature_names()`.
+
+    Returns:
+        bytes: The values as little-endian float32, 4 bytes per feature.
+    """
+    return np.asarray(features, dtype='<f4').tobytes()
+
+def decode_feature_vectors(blobs):
+    """
+    Unpack stored feature vectors into one matrix.
+
+    Parameters:
+        blobs (list of bytes): Outputs of `encode_feature_vector`.
+
+    Returns:
+        numpy.ndarray: float32 array of shape (len(blobs), number of features).
+    """
+    count = len(get_cerviscan_feature_names())
+    return np.frombuffer(b"".join(blobs), dtype='<f4').reshape(len(blobs), count)
@@ -0,0 +1,243 @@
+"""
+Process-wide holder for the CerviScan XGBoost classifier.
+
+The model is loaded once per process (gunicorn imports `app` once per
+worker), warmed up with a dummy prediction, and shared by every request.
+Only loading is locked: predictions run concurrently, which is safe for
+a `TreeModel` (read-only arrays) and for a loaded `XGBClassifier`.
+Set CERVISCAN_MODEL_PATH to load a different model file; files ending in
+`.json` or `.ubj` are loaded with XGBoost's native loader, which skips
+unpickling the Python wrapper and does not depend on the XGBoost version
+the pickle was written with. Files ending in `.npz` are array exports
+evaluated with NumPy (see `model.tree_model`); they are used by default
+when `xgb_best.npz` exists, so serving does not import xgboost at all.
+An export records the hash of the model it was exported from and is
+refused when that no longer matches `xgb_best`; by default the classifier
+then falls back to `xgb_best` with a warning, until the export is redone.
+
+Usage (export the pickled model to the native format):
+    python -m model.classifier export model/xgb_best.ubj
+"""
+
+import os
+import sys
+import pickle
+import warnings
+import threading
+
+import numpy as np
+
+from model.feature_schema import check_model_features
+from model.tree_model import TreeModel
+from model.tree_model import TREE_MODEL_PATH
+from model.tree_model import hash_model_file
+from model.tree_model import load_tree_model
+
+XGB_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "xgb_best")
+
+# Defaults to `get_default_model_path()`
+MODEL_PATH = os.environ.get("CERVISCAN_MODEL_PATH")
+
+NATIVE_FORMATS = (".json", ".ubj")
+
+_model = None
+_feature_names = None
+_model_version = None
+_used_features = None
+_lock = threading.Lock()
+
+
+def check_tree_model_source(tree_model, source_path=XGB_MODEL_PATH):
+    """
+    Check that a tree export was made from the current model file.
+
+    Parameters:
+        tree_model (TreeModel): The loaded export.
+        source_path (str): Model file it should have been exported from;
+            nothing is checked if it does not exist.
+
+    Raises:
+        ValueError: If the export records another model's hash.
+    """
+    if not os.path.exists(source_path):
+        return
+    source_version = hash_model_file(source_path)
+    if tree_model.source_version != source_version:
+        raise ValueError(
+            f"Tree export is of model {tree_model.source_version}, but {source_path} is model "
+            f"{source_version}; re-run `python -m model.tree_model export`"
+        )
+
+
+def get_default_model_path():
+    """
+    Get the model file to serve when CERVISCAN_MODEL_PATH is not set.
+
+    Returns:
+        str: `TREE_MODEL_PATH` if it exists and was exported from the current
+        `xgb_best`, otherwise `XGB_MODEL_PATH`.
+    """
+    if os.path.exists(TREE_MODEL_PATH):
+        try:
+            check_tree_model_source(load_tree_model(TREE_MODEL_PATH))
+            return TREE_MODEL_PATH
+        except ValueError as e:
+            warnings.warn(f"{e}; serving {XGB_MODEL_PATH} with XGBoost instead")
+    return XGB_MODEL_PATH
+
+
+def load_classifier(path=None):
+    """
+    Load the classifier from a pickle, a native XGBoost model file or a tree export.
+
+    Parameters:
+        path (str, optional): Path to the model file. Defaults to `MODEL_PATH`
+            or `get_default_model_path()`.
+
+    Returns:
+        xgboost.XGBClassifier or TreeModel: The loaded classifier.
+
+    Raises:
+        ValueError: If a tree export is not of the current `xgb_best`.
+    """
+    path = path or MODEL_PATH or get_default_model_path()
+
+    if path.endswith(".npz"):
+        tree_model = load_tree_model(path)
+        check_tree_model_source(tree_model)
+        return tree_model
+
+    if path.endswith(NATIVE_FORMATS):
+        from xgboost import XGBClassifier
+
+        model = XGBClassifier()
+        model.load_model(path)
+        return model
+
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _warm_up(model, feature_names):
+    """Run one dummy prediction so the first request does not pay for it."""
+    model.predict(np.zeros((1, len(feature_names)), dtype=np.float32))
+
+
+def get_classifier(path=None):
+    """
+    Get the shared classifier, loading and warming it up on first use.
+
+    Parameters:
+        path (str, optional): Path to the model file, only used on the first
+            call. Defaults as for `load_classifier`.
+
+    Returns:
+        xgboost.XGBClassifier or TreeModel: The shared classifier.
+    """
+    global _model, _feature_names, _model_version, _used_features
+
+    if _model is None:
+        with _lock:
+            if _model is None:
+                path = path or MODEL_PATH or get_default_model_path()
+                model = load_classifier(path)
+                if isinstance(model, TreeModel):
+                    feature_names = model.feature_names
+                    split_counts = model.split_counts
+                    # An export scores exactly like its source model, so it keeps
+                    # its version and the results cached for it
+                    model_version = model.source_version
+                else:
+                    feature_names = list(model.get_booster().feature_names)
+                    split_counts = model.get_booster().get_score(importance_type="weight")
+                    model_version = hash_model_file(path)
+                check_model_features(feature_names)
+                # Features some tree splits on; the others never change a prediction
+                _used_features = [name for name in feature_names if split_counts.get(name, 0) > 0]
+                _warm_up(model, feature_names)
+                _model_version = model_version
+                _feature_names = feature_names
+                _model = model
+    return _model
+
+
+def get_used_features():
+    """
+    Get the features the classifier actually splits on.
+
+    Returns:
+        list: Names of the features with a nonzero split count, in input order.
+    """
+    get_classifier()
+    return list(_used_features)
+
+
+def get_model_version():
+    """
+    Get the version of the shared classifier.
+
+    Returns:
+        str: Short SHA-256 of the XGBoost model file, so any retrained or
+        re-exported model gets a new version. A tree export has the version
+        of the file it was exported from.
+    """
+    get_classifier()
+    return _model_version
+
+
+def get_feature_names():
+    """
+    Get the feature names the classifier expects, in input order.
+
+    Returns:
+        list: Feature names in the order the booster was trained with.
+    """
+    get_classifier()
+    return list(_feature_names)
+
+
+def predict(features):
+    """
+    Predict with the shared classifier.
+
+    Parameters:
+        features (numpy.ndarray): float32 model input, one row per image,
+            as built by `feature_schema.to_model_input`.
+
+    Returns:
+        numpy.ndarray: Predicted labels, one per row.
+    """
+    return get_classifier().predict(features)
+
+
+def predict_proba(features):
+    """
+    Predict class probabilities with the shared classifier.
+
+    Parameters:
+        features (numpy.ndarray): Model input, as for `predict`.
+
+    Returns:
+        numpy.ndarray: Probabilities of shape (rows, classes).
+    """
+    return get_classifier().predict_proba(features)
+
+
+def export_native(output_path, path=XGB_MODEL_PATH):
+    """
+    Save the classifier in XGBoost's native JSON or UBJ format.
+
+    Parameters:
+        output_path (str): Destination file, ending in `.json` or `.ubj`.
+        path (str): Model file to convert.
+    """
+    if not output_path.endswith(NATIVE_FORMATS):
+        raise ValueError(f"Native model files must end in one of {NATIVE_FORMATS}")
+    load_classifier(path).save_model(output_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "export":
+        print("Usage: python -m model.classifier export <output.json|output.ubj>")
+        sys.exit(1)
+    export_native(sys.argv[2])
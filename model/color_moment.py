@@ -0,0 +1,123 @@
+import numpy as np
+import skimage
+
+# RGB to YUV conversion matrix, scaled by 1000 so the conversion is exact in
+# int32 (the same footprint as float32); moments are scaled back afterwards.
+YUV_MATRIX_1000 = np.array([
+    [299, 587, 114],
+    [-147, -289, 436],
+    [615, -515, 100]
+], dtype=np.int32)
+
+# Channel suffixes used in the feature names, per color space
+COLOR_SPACES = {
+    'rgb': ['r', 'g', 'b'],
+    'yuv': ['y', 'u', 'v'],
+    'lab': ['l', 'a', 'b'],
+}
+
+# Rows per chunk when accumulating central moments
+CHUNK_SIZE = 1 << 20
+
+
+def _to_rgb(rgb):
+    """RGB channels as an (N, 3) array and the factor to divide moments by."""
+    return rgb.reshape(-1, 3), 1.0
+
+
+def _to_yuv(rgb):
+    pixels = rgb.reshape(-1, 3).astype(np.int32)
+    return pixels @ YUV_MATRIX_1000.T, 1000.0
+
+
+def _to_lab(rgb):
+    # skimage's conversion (as before) on float32 input; OpenCV's Lab uses a
+    # slightly different white point and shifts the moments by ~1e-2
+    normalized = rgb.astype(np.float32) / np.float32(255)
+    return skimage.color.rgb2lab(normalized).reshape(-1, 3), 1.0
+
+
+_CONVERTERS = {
+    'rgb': _to_rgb,
+    'yuv': _to_yuv,
+    'lab': _to_lab,
+}
+
+
+def compute_color_moments(channels, scale=1.0):
+    """
+    Compute mean, standard deviation and skewness for every channel.
+
+    The mean is taken first; the centered second and third moments are then
+    accumulated in float64 over chunks of rows, so no full-size float64 copy
+    of the image is made. Skewness is the biased estimator used by
+    `scipy.stats.skew` and is NaN for constant channels, like scipy.
+
+    Parameters:
+        channels (numpy.ndarray): Array of shape (N, C).
+        scale (float): Values are divided by this factor before the moments
+            are reported (skewness is scale-invariant).
+
+    Returns:
+        tuple: (mean, std, skew), each a float64 array of length C.
+    """
+    n = channels.shape[0]
+    mean = channels.mean(axis=0, dtype=np.float64)
+
+    m2 = np.zeros(channels.shape[1])
+    m3 = np.zeros(channels.shape[1])
+    for start in range(0, n, CHUNK_SIZE):
+        centered = channels[start:start + CHUNK_SIZE] - mean
+        squared = centered * centered
+        m2 += squared.sum(axis=0)
+        m3 += (squared * centered).sum(axis=0)
+    m2 /= n
+    m3 /= n
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        constant = m2 <= (np.finfo(np.float64).resolution * mean) ** 2
+        skew = np.where(constant, np.nan, m3 / m2 ** 1.5)
+
+    return mean / scale, np.sqrt(m2) / scale, skew
+
+
+def get_color_moment_features(rgb, spaces=('yuv',)):
+    """
+    Extract color moment features for one or more color spaces in one pass.
+
+    Each conversion is a single matrix multiply (YUV, exact in int32) or a
+    single skimage conversion (LAB, float32); RGB moments use the pixels as-is.
+
+    Parameters:
+        rgb (numpy.ndarray): Decoded RGB image of shape (H, W, 3).
+        spaces (list of str): Color spaces, any of 'rgb', 'yuv' and 'lab'.
+
+    Returns:
+        list: For each space, the means, standard deviations and skewness
+        values of its three channels, ordered as `get_color_moment_feature_names`.
+    """
+    features = []
+    for space in spaces:
+        if space not in _CONVERTERS:
+            raise ValueError(f"Unknown color space: {space}")
+        channels, scale = _CONVERTERS[space](rgb)
+        mean, std, skew = compute_color_moments(channels, scale)
+        features.extend(mean.tolist() + std.tolist() + skew.tolist())
+    return features
+
+
+def get_color_moment_feature_names(spaces=('yuv',)):
+    """
+    Get the names of the color moment features.
+
+    Parameters:
+        spaces (list of str): Color spaces, any of 'rgb', 'yuv' and 'lab'.
+
+    Returns:
+        list: Feature names such as 'mean_y', 'std_u' and 'skew_v'.
+    """
+    names = []
+    for space in spaces:
+        for moment in ('mean', 'std', 'skew'):
+            names.extend(f"{moment}_{channel}" for channel in COLOR_SPACES[space])
+    return names
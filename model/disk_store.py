@@ -0,0 +1,150 @@
+"""
+Folder of small JSON files with least-recently-used eviction.
+
+Shared by the result cache (`model.result_cache`, limited by entries) and
+the feature cache (`model.feature_cache`, limited by bytes). Entries are
+stored as `<folder>/<key[:2]>/<key>.json` and written to a temporary file
+first, so readers never see a partial entry. Any number of processes can
+use the same folder. Hits refresh an entry's modification time; once the
+folder grows past a limit, the least recently used entries are deleted
+until it is back under `EVICT_TO` of it, so eviction does not run again
+on the next write.
+"""
+
+import os
+import json
+import threading
+
+# Share of a limit that eviction brings the folder down to
+EVICT_TO = 0.9
+
+
+class DiskStore:
+    def __init__(self, folder, max_entries=None, max_bytes=None):
+        """
+        On-disk JSON store evicted by entry count and/or size.
+
+        Parameters:
+            folder (str): Folder of the store.
+            max_entries (int, optional): Approximate limit on the number of entries.
+            max_bytes (int, optional): Approximate limit on the total size of the entries.
+        """
+        self.folder = folder
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = None
+        self._total_bytes = None
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.folder, key[:2], key + ".json")
+
+    def get(self, key):
+        """
+        Read an entry and mark it as recently used.
+
+        Parameters:
+            key (str): Hex key.
+
+        Returns:
+            The stored value, or None.
+        """
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return value
+
+    def put(self, key, value):
+        """
+        Write an entry, evicting old ones if the store is over a limit.
+
+        Parameters:
+            key (str): Hex key.
+            value: JSON-serializable value.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(value, f)
+        size = os.path.getsize(tmp_path)
+        existed = os.path.exists(path)
+        os.replace(tmp_path, path)
+
+        if existed:
+            return
+        with self._lock:
+            if self._entries is None:
+                entries = self._list_entries()
+                self._entries = len(entries)
+                self._total_bytes = sum(entry_size for _, entry_size, _ in entries)
+            else:
+                self._entries += 1
+                self._total_bytes += size
+            over = self._is_over(self._entries, self._total_bytes, 1)
+        if over:
+            self.evict()
+
+    def _is_over(self, entries, total_bytes, share):
+        return (
+            (self.max_entries is not None and entries > self.max_entries * share)
+            or (self.max_bytes is not None and total_bytes > self.max_bytes * share)
+        )
+
+    def _list_entries(self):
+        entries = []
+        if not os.path.isdir(self.folder):
+            return entries
+        for prefix in os.listdir(self.folder):
+            subfolder = os.path.join(self.folder, prefix)
+            if not os.path.isdir(subfolder):
+                continue
+            for name in os.listdir(subfolder):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(subfolder, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """
+        Delete the least recently used entries until the store is below `EVICT_TO` of its limits.
+
+        Other processes may evict concurrently; files that are already gone are skipped.
+        """
+        entries = sorted(self._list_entries())
+        count = len(entries)
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if not self._is_over(count, total, EVICT_TO):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            count -= 1
+            total -= size
+
+        with self._lock:
+            self._entries = count
+            self._total_bytes = total
+
+    def clear(self):
+        """Delete every entry."""
+        for _, _, path in self._list_entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._entries = 0
+            self._total_bytes = 0
@@ -0,0 +1,170 @@
+"""
+Local cache of computed feature blocks.
+
+Every extractor module declares a version string (e.g.
+`TAMURA_FEATURES_VERSION`), bumped whenever a change alters its values.
+A block is cached under the hash of the image content, the extractor
+name, its version and its parameters, so after changing one extractor a
+rerun of `model.batch` (or of `get_cerviscan_features(..., use_cache=True)`)
+recomputes only that extractor's block and reads every other block from
+the cache.
+
+The cache is for offline reruns only and is off unless a caller asks for
+it: the app's request path does not use it, since repeat uploads are
+already served by the result cache (`model.result_cache`).
+
+Blocks are small JSON files in `FEATURE_CACHE_FOLDER` (by default in the
+app's instance folder), shared by all processes (a
+`model.disk_store.DiskStore`); once the folder holds more than
+`FEATURE_CACHE_BYTES`, the least recently used files are deleted. Setting
+CERVISCAN_FEATURE_CACHE_BYTES to 0 disables the cache.
+
+Extractors outside `get_cerviscan_features` (GLCM, LAB, RGB) can be
+cached the same way with `get_cached_features`.
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+import numpy as np
+
+from model.disk_store import DiskStore
+
+# Flask's default instance folder of `app.py`, next to the `model` package
+INSTANCE_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance")
+
+FEATURE_CACHE_FOLDER = os.environ.get(
+    "CERVISCAN_FEATURE_CACHE_FOLDER", os.path.join(INSTANCE_FOLDER, "cache", "features")
+)
+FEATURE_CACHE_BYTES = int(os.environ.get("CERVISCAN_FEATURE_CACHE_BYTES", 256 * 2 ** 20))
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def hash_image(image):
+    """
+    Hash the content of a decoded image.
+
+    Parameters:
+        image (numpy.ndarray): Image array.
+
+    Returns:
+        str: Hex SHA-256 of its dtype, shape and pixels.
+    """
+    digest = hashlib.sha256(f"{image.dtype.str}{image.shape}".encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    def __init__(self, folder, max_bytes):
+        """
+        On-disk cache of feature blocks, evicted by size.
+
+        Parameters:
+            folder (str): Cache folder.
+            max_bytes (int): Approximate size limit of the folder; 0 disables the cache.
+        """
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._store = DiskStore(folder, max_bytes=max_bytes)
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(image_hash, extractor, version, params=None):
+        """
+        Build the key of a feature block.
+
+        Parameters:
+            image_hash (str): `hash_image` of the input image.
+            extractor (str): Extractor name, e.g. 'tamura'.
+            version (str): The extractor's declared version.
+            params (dict, optional): Parameters that change the values.
+
+        Returns:
+            str: Hex key.
+        """
+        identity = json.dumps([image_hash, extractor, version, params or {}], sort_keys=True)
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def get(self, key):
+        """
+        Read a block.
+
+        Parameters:
+            key (str): Key from `make_key`.
+
+        Returns:
+            list: The cached feature values, or None.
+        """
+        if not self.enabled:
+            return None
+        return self._store.get(key)
+
+    def put(self, key, values):
+        """
+        Store a block.
+
+        Parameters:
+            key (str): Key from `make_key`.
+            values (list): Feature values.
+        """
+        if self.enabled:
+            self._store.put(key, [float(value) for value in values])
+
+    def evict(self):
+        """Delete the least recently used blocks until the folder is below its size limit."""
+        self._store.evict()
+
+    def clear(self):
+        """Delete every cached block."""
+        self._store.clear()
+
+
+def get_feature_cache():
+    """
+    Get the process-wide feature cache configured from the environment.
+
+    Returns:
+        FeatureCache: The shared cache.
+    """
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = FeatureCache(FEATURE_CACHE_FOLDER, FEATURE_CACHE_BYTES)
+    return _cache
+
+
+def get_cached_features(image, extractor, version, compute, params=None, cache=None):
+    """
+    Compute one extractor's features, or read them from the cache.
+
+    Parameters:
+        image (numpy.ndarray): Decoded input image.
+        extractor (str): Extractor name, e.g. 'glcm'.
+        version (str): The extractor's declared version, e.g. `GLCM_FEATURES_VERSION`.
+        compute (callable): Called with `image` on a miss; returns the feature values.
+        params (dict, optional): Parameters that change the values.
+        cache (FeatureCache, optional): Defaults to `get_feature_cache()`.
+
+    Returns:
+        list: Feature values.
+    """
+    cache = get_feature_cache() if cache is None else cache
+    if not cache.enabled:
+        return compute(image)
+
+    key = cache.make_key(hash_image(image), extractor, version, params)
+    values = cache.get(key)
+    if values is None:
+        values = compute(image)
+        cache.put(key, values)
+    return values
@@ -0,0 +1,97 @@
+"""
+Fixed input schema of the classifier.
+
+The classifier takes a float32 matrix with one column per entry of
+`MODEL_INPUT_FEATURES`, in that order. The list is the booster's
+`feature_names` and is checked against them when the model is loaded
+(see `model.classifier`), so a model trained on other features fails at
+startup instead of scoring shifted inputs.
+
+This replaces building a one-row DataFrame and dropping every column
+whose value is 1: that made the column set depend on the image, so a
+feature that happened to be exactly 1.0 silently changed the model input.
+"""
+
+import os
+
+import numpy as np
+
+from model.cerviscan_feature_extraction import get_cerviscan_feature_names
+
+# Only compute the features the classifier splits on (see `pipeline.run_pipeline`).
+# Records scored this way store no feature vector, so `rescore-records` cannot
+# re-score them with a later model; set CERVISCAN_LAZY_FEATURES=1 to trade
+# that for the CPU time
+LAZY_FEATURES = bool(int(os.environ.get("CERVISCAN_LAZY_FEATURES", 0)))
+
+# Bump together with `MODEL_INPUT_FEATURES`, i.e. for a model trained on
+# another feature set
+MODEL_INPUT_SCHEMA_VERSION = "1"
+
+# Features of `xgb_best`, in booster order. LRLGLE_* are extracted but
+# the model was trained without them.
+MODEL_INPUT_FEATURES = [
+    # YUV color moments
+    "mean_y", "mean_u", "mean_v", "std_y", "std_u", "std_v", "skew_y", "skew_u", "skew_v",
+    # LBP statistics
+    "mean", "median", "std", "kurtosis", "skewness",
+    # GLRLM, per angle
+    "SRE_deg0", "LRE_deg0", "GLN_deg0", "RLN_deg0", "RP_deg0",
+    "LGLRE_deg0", "HGL_deg0", "SRLGLE_deg0", "SRHGLE_deg0", "LRHGLE_deg0",
+    "SRE_deg45", "LRE_deg45", "GLN_deg45", "RLN_deg45", "RP_deg45",
+    "LGLRE_deg45", "HGL_deg45", "SRLGLE_deg45", "SRHGLE_deg45", "LRHGLE_deg45",
+    "SRE_deg90", "LRE_deg90", "GLN_deg90", "RLN_deg90", "RP_deg90",
+    "LGLRE_deg90", "HGL_deg90", "SRLGLE_deg90", "SRHGLE_deg90", "LRHGLE_deg90",
+    "SRE_deg135", "LRE_deg135", "GLN_deg135", "RLN_deg135", "RP_deg135",
+    "LGLRE_deg135", "HGL_deg135", "SRLGLE_deg135", "SRHGLE_deg135", "LRHGLE_deg135",
+    # Tamura
+    "Coarseness", "Contrast", "Directionality", "Roughness",
+]
+
+# Position of every model input in the full feature vector
+_names = get_cerviscan_feature_names()
+MODEL_INPUT_INDEX = np.array([_names.index(name) for name in MODEL_INPUT_FEATURES], dtype=np.intp)
+del _names
+
+
+def check_model_features(feature_names):
+    """
+    Check that a model expects exactly the schema's features.
+
+    Parameters:
+        feature_names (list of str): The booster's `feature_names`.
+
+    Raises:
+        ValueError: If the names or their order differ from `MODEL_INPUT_FEATURES`.
+    """
+    if list(feature_names) != MODEL_INPUT_FEATURES:
+        missing = [name for name in MODEL_INPUT_FEATURES if name not in feature_names]
+        extra = [name for name in feature_names if name not in MODEL_INPUT_FEATURES]
+        raise ValueError(
+            f"Model features do not match input schema {MODEL_INPUT_SCHEMA_VERSION} "
+            f"(missing {missing}, unexpected {extra}, or in another order)"
+        )
+
+
+def to_model_input(features, out=None):
+    """
+    Select and order the model inputs from full feature vectors.
+
+    Parameters:
+        features (list or numpy.ndarray): One full feature vector (in the
+            order of `get_cerviscan_feature_names()`) or a matrix of them,
+            one per row.
+        out (numpy.ndarray, optional): Preallocated float32 array of shape
+            (rows, len(MODEL_INPUT_FEATURES)) to write into.
+
+    Returns:
+        numpy.ndarray: float32 array of shape (rows, len(MODEL_INPUT_FEATURES)).
+    """
+    features = np.asarray(features)
+    if features.ndim == 1:
+        features = features[np.newaxis]
+
+    if out is None:
+        out = np.empty((features.shape[0], len(MODEL_INPUT_FEATURES)), dtype=np.float32)
+    out[...] = features[:, MODEL_INPUT_INDEX]
+    return out
@@ -3,17 +3,18 @@ import numpy as np
 from skimage.feature import graycomatrix, graycoprops
 from sklearn.metrics.cluster import entropy
 
-import os
-from tqdm import tqdm
-import pandas as pd
-import glob
+from model.image_io import read_bgr
 
-def get_glcm_features(image_path):
+# Versi fitur GLCM; naikkan bila nilai fitur berubah
+GLCM_FEATURES_VERSION = "1"
+
+def get_glcm_features(image):
     """
     Ekstraksi fitur dari matriks co-occurrence tingkat abu-abu (GLCM) untuk sebuah citra.
 
     Parameters:
-        image_path (str): Jalur file ke citra yang akan dianalisis.
+        image (str atau numpy.ndarray): Jalur file ke citra yang akan dianalisis,
+            atau array BGR yang sudah didekode.
 
     Returns:
         list: Daftar nilai fitur yang diekstrak, meliputi:
@@ -23,8 +24,8 @@ def get_glcm_features(image_path):
               - homogeneity1 (float): Tingkat homogenitas dari GLCM.
               - res_entropy (float): Entropi dari citra asli.
     """
-    # Baca citra dari file
-    image = cv.imread(image_path)
+    # Baca citra dari file (atau gunakan array yang sudah didekode)
+    image = read_bgr(image)
 
     # Konversi citra ke grayscale
     gray_image = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
@@ -57,8 +58,8 @@ def get_glcm_features(image_path):
     homogeneity = graycoprops(glcm, prop='homogeneity')
     homogeneity1 = round(homogeneity.flatten()[0], 3)
     
-    # Hitung entropi dari citra asli
-    res_entropy = round(entropy(image), 3)
+    # Hitung entropi dari citra asli (diratakan, seperti pada NumPy 1.x)
+    res_entropy = round(entropy(image.ravel()), 3)
     
     # Kembalikan nilai fitur
     return [contrast1, correlation1, energy1, homogeneity1, res_entropy]
@@ -1,6 +1,9 @@
-import numpy as np
 import warnings
-from model.GrayRumatrix import getGrayRumatrix
+import numpy as np
+from model.GrayRumatrix import getGrayRumatrix, compute_glrlm_features, GLRLM_ANGLES, GLRLM_FEATURES
+
+# Bump when the run-length matrix or any GLRLM feature changes value
+GLRLM_FEATURES_VERSION = "2"
 
 warnings.filterwarnings("ignore")
 
@@ -28,9 +31,8 @@ def get_glrlm_feature_names():
     Returns:
         list: List of GLRLM feature names including directional angles.
     """
-    glrlm_features = ['SRE', 'LRE', 'GLN', 'RLN', 'RP', 'LGLRE', 'HGL', 'SRLGLE', 'SRHGLE', 'LRLGLE', 'LRHGLE']
-    glrlm_degs = [['deg0'], ['deg45'], ['deg90'], ['deg135']]
-    glrlm_features_name = get_glrlm_names(glrlm_features, glrlm_degs)
+    glrlm_degs = [[deg] for deg in GLRLM_ANGLES]
+    glrlm_features_name = get_glrlm_names(GLRLM_FEATURES, glrlm_degs)
     
     return glrlm_features_name
 
@@ -39,7 +41,7 @@ def get_glrlm_features(path, lbp='off'):
     Calculate GLRLM features for an image.
 
     Parameters:
-        path (str): Path to the input image.
+        path (str or numpy.ndarray): Path to the input image, or a decoded BGR array.
         lbp (str, optional): If 'on', apply Local Binary Pattern (LBP) transformation. Defaults to 'off'.
 
     Returns:
@@ -48,70 +50,41 @@ def get_glrlm_features(path, lbp='off'):
     test = getGrayRumatrix()
     test.read_img(path, lbp)
 
-    DEG = [['deg0'], ['deg45'], ['deg90'], ['deg135']]
-
-    glrlm_features_value = []
-
-    for deg in DEG:
-        test_data = test.getGrayLevelRumatrix(test.data, deg)
-        
-        # 1. Short Run Emphasis (SRE)
-        SRE = test.getShortRunEmphasis(test_data) 
-        SRE = float(np.squeeze(SRE))
-        
-        # 2. Long Run Emphasis (LRE)
-        LRE = test.getLongRunEmphasis(test_data)
-        LRE = float(np.squeeze(LRE))
-        
-        # 3. Gray Level Non-Uniformity (GLN)
-        GLN = test.getGrayLevelNonUniformity(test_data)
-        GLN = float(np.squeeze(GLN))
-        
-        # 4. Run Length Non-Uniformity (RLN)
-        RLN = test.getRunLengthNonUniformity(test_data)
-        RLN = float(np.squeeze(RLN))
-
-        # 5. Run Percentage (RP)
-        RP = test.getRunPercentage(test_data)
-        RP = float(np.squeeze(RP))
-        
-        # 6. Low Gray Level Run Emphasis (LGLRE)
-        LGLRE = test.getLowGrayLevelRunEmphasis(test_data)
-        LGLRE = float(np.squeeze(LGLRE))
-        
-        # 7. High Gray Level Run Emphasis (HGL)
-        HGL = test.getHighGrayLevelRunEmphais(test_data)
-        HGL = float(np.squeeze(HGL))
-        
-        # 8. Short Run Low Gray Level Emphasis (SRLGLE)
-        SRLGLE = test.getShortRunLowGrayLevelEmphasis(test_data)
-        SRLGLE = float(np.squeeze(SRLGLE))
-        
-        # 9. Short Run High Gray Level Emphasis (SRHGLE)
-        SRHGLE = test.getShortRunHighGrayLevelEmphasis(test_data)
-        SRHGLE = float(np.squeeze(SRHGLE))
-        
-        # 10. Long Run Low Gray Level Emphasis (LRLGLE)
-        LRLGLE = test.getLongRunLow(test_data)
-        LRLGLE = float(np.squeeze(LRLGLE))
-        
-        # 11. Long Run High Gray Level Emphasis (LRHGLE)
-        LRHGLE = test.getLongRunHighGrayLevelEmphais(test_data)
-        LRHGLE = float(np.squeeze(LRHGLE))
-
-        glrlm_features_value_per_deg = [SRE, LRE, GLN, RLN, RP, LGLRE, HGL, SRLGLE, SRHGLE, LRLGLE, LRHGLE]
-        
-        for value in glrlm_features_value_per_deg:
-            glrlm_features_value.append(value)
-
-    return glrlm_features_value 
+    return get_glrlm_features_from_gray(test.data)
+
+def get_glrlm_features_from_gray(gray, angles=None):
+    """
+    Calculate GLRLM features for an already decoded grayscale (or LBP) image.
+
+    Parameters:
+        gray (numpy.ndarray): 2D image, e.g. from `getGrayRumatrix.read_img`.
+        angles (list of str, optional): Angles to compute, any of
+            `GLRLM_ANGLES`; the features of the other angles are NaN.
+            Defaults to all four.
+
+    Returns:
+        list: Extracted GLRLM feature values.
+    """
+    angles = GLRLM_ANGLES if angles is None else [deg for deg in GLRLM_ANGLES if deg in angles]
+
+    # All requested directions come out of a single run-length pass.
+    glrlm = getGrayRumatrix().getGrayLevelRumatrix(gray, angles)
+
+    # One (angles x 11) array: SRE, LRE, GLN, RLN, RP, LGLRE, HGL,
+    # SRLGLE, SRHGLE, LRLGLE, LRHGLE for deg0, deg45, deg90, deg135.
+    glrlm_features_value = np.full((len(GLRLM_ANGLES), len(GLRLM_FEATURES)), np.nan)
+    if angles:
+        rows = [GLRLM_ANGLES.index(deg) for deg in angles]
+        glrlm_features_value[rows] = compute_glrlm_features(glrlm)
+
+    return [float(value) for value in glrlm_features_value.ravel()]
 
 def get_glrlm_on(path):
     """
     Calculate GLRLM features for an image with LBP transformation.
 
     Parameters:
-        path (str): Path to the input image.
+        path (str or numpy.ndarray): Path to the input image, or a decoded BGR array.
 
     Returns:
         list: Extracted GLRLM feature values.
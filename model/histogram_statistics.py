@@ -0,0 +1,69 @@
+import numpy as np
+
+
+def get_histogram(image, bins=256):
+    """
+    Count the pixel values of an 8-bit image with a single bincount.
+
+    Parameters:
+        image (numpy.ndarray): uint8 image of any shape.
+        bins (int): Number of bins. Default is 256.
+
+    Returns:
+        numpy.ndarray: Pixel count per value.
+    """
+    return np.bincount(np.asarray(image).ravel(), minlength=bins)
+
+
+def get_histogram_statistics(hist):
+    """
+    Compute pixel statistics of an image from its value histogram.
+
+    Every statistic is computed on the 256-element histogram instead of the
+    full image. The mean and median are exact; the central moments are
+    accumulated in float64 over the bins.
+
+    Parameters:
+        hist (numpy.ndarray): Pixel count per value, e.g. from `get_histogram`.
+
+    Returns:
+        dict: 'n', 'mean', 'median', 'variance', 'std', 'm3' and 'm4' (third
+        and fourth central moments), 'skewness' (m3 / std^3) and 'kurtosis'
+        (m4 / variance^2, not excess).
+    """
+    hist = np.asarray(hist, dtype=np.int64)
+    values = np.arange(hist.size, dtype=np.float64)
+    n = int(hist.sum())
+
+    # Integer sum, so this is exactly what np.mean gives on the pixels
+    mean = float(np.dot(hist, np.arange(hist.size, dtype=np.int64))) / n
+
+    # Median: average of the two middle values for an even count, like np.median
+    cumulative = np.cumsum(hist)
+    lower = int(np.searchsorted(cumulative, (n - 1) // 2, side='right'))
+    upper = int(np.searchsorted(cumulative, n // 2, side='right'))
+    median = (values[lower] + values[upper]) / 2
+
+    centered = values - mean
+    squared = centered * centered
+    weights = hist.astype(np.float64)
+    variance = float(np.dot(weights, squared)) / n
+    m3 = float(np.dot(weights, squared * centered)) / n
+    m4 = float(np.dot(weights, squared * squared)) / n
+    std = np.sqrt(variance)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        skewness = np.float64(m3) / std ** 3
+        kurtosis = np.float64(m4) / np.float64(variance) ** 2
+
+    return {
+        'n': n,
+        'mean': mean,
+        'median': median,
+        'variance': variance,
+        'std': std,
+        'm3': m3,
+        'm4': m4,
+        'skewness': skewness,
+        'kurtosis': kurtosis,
+    }
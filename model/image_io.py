@@ -0,0 +1,204 @@
+import io
+import os
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Cap on the long side of decoded uploads, in pixels (0 keeps full resolution)
+MAX_LONG_SIDE = int(os.environ.get("CERVISCAN_MAX_LONG_SIDE", 0))
+
+# Decoder-level reductions; JPEG is decoded directly at 1/2, 1/4 or 1/8 scale
+_REDUCED_COLOR_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+def decode_image(data):
+    """
+    Decode encoded image bytes (JPEG, PNG, ...) into a BGR array.
+
+    Parameters:
+        data (bytes): Raw encoded image bytes.
+
+    Returns:
+        numpy.ndarray: The decoded BGR image, or None if the bytes cannot be decoded.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+
+def can_decode_image(data):
+    """
+    Check cheaply that encoded bytes decode as an image.
+
+    JPEG is decoded at 1/8 scale, which still reads the whole file but
+    skips most of the work of a full decode.
+
+    Parameters:
+        data (bytes): Raw encoded image bytes.
+
+    Returns:
+        bool: Whether OpenCV can decode the bytes.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    return cv2.imdecode(buffer, cv2.IMREAD_REDUCED_GRAYSCALE_8) is not None
+
+
+def normalize_resolution(image, max_long_side=None):
+    """
+    Downscale an image so its long side is at most `max_long_side`.
+
+    Parameters:
+        image (numpy.ndarray): The image.
+        max_long_side (int, optional): Cap in pixels, 0 for no cap.
+            Defaults to `MAX_LONG_SIDE`.
+
+    Returns:
+        tuple: The (possibly) resized image and the scale factor applied
+        to its sides (1.0 if unchanged).
+    """
+    max_long_side = MAX_LONG_SIDE if max_long_side is None else max_long_side
+    long_side = max(image.shape[:2])
+    if not max_long_side or long_side <= max_long_side:
+        return image, 1.0
+
+    scale = max_long_side / long_side
+    height, width = image.shape[:2]
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA), scale
+
+
+def decode_normalized_image(data, max_long_side=None):
+    """
+    Decode encoded image bytes into a BGR array with a capped long side.
+
+    The image size is read from the header first. If the cap allows it,
+    OpenCV decodes at 1/2, 1/4 or 1/8 scale (`IMREAD_REDUCED_COLOR_*`),
+    which JPEG supports without ever decoding the full-resolution pixels;
+    the rest of the reduction is an area resize.
+
+    Parameters:
+        data (bytes): Raw encoded image bytes.
+        max_long_side (int, optional): Cap in pixels, 0 for no cap.
+            Defaults to `MAX_LONG_SIDE`.
+
+    Returns:
+        tuple: The decoded BGR image (None if the bytes cannot be decoded)
+        and the scale factor of its long side relative to the full-resolution
+        image.
+    """
+    max_long_side = MAX_LONG_SIDE if max_long_side is None else max_long_side
+    if not max_long_side:
+        return decode_image(data), 1.0
+
+    try:
+        with Image.open(io.BytesIO(data)) as header:
+            long_side = max(header.size)
+    except Exception:
+        return decode_image(data), 1.0
+
+    flag = cv2.IMREAD_COLOR
+    for factor, reduced_flag in _REDUCED_COLOR_FLAGS:
+        if long_side // factor >= max_long_side:
+            flag = reduced_flag
+            break
+
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+    if image is None:
+        return None, 1.0
+
+    image, _ = normalize_resolution(image, max_long_side)
+    return image, max(image.shape[:2]) / long_side
+
+
+def read_normalized_bgr(path, max_long_side=None):
+    """
+    Read an image file into a BGR array with a capped long side.
+
+    Parameters:
+        path (str): Path to the image file.
+        max_long_side (int, optional): See `decode_normalized_image`.
+
+    Returns:
+        tuple: The BGR image (None if it cannot be decoded) and the scale factor.
+    """
+    with open(path, "rb") as f:
+        return decode_normalized_image(f.read(), max_long_side)
+
+
+def read_bgr(image):
+    """
+    Get a BGR image from a path or an already decoded array.
+
+    Parameters:
+        image (str or numpy.ndarray): Path to the image file, or a BGR array.
+
+    Returns:
+        numpy.ndarray: The BGR image.
+    """
+    if isinstance(image, np.ndarray):
+        return image
+    return cv2.imread(image)
+
+
+def read_rgb(image):
+    """
+    Get an RGB image from a path or an already decoded BGR array.
+
+    Paths are opened with PIL, as the color moment extractors always did.
+
+    Parameters:
+        image (str or numpy.ndarray): Path to the image file, or a BGR array.
+
+    Returns:
+        numpy.ndarray: The RGB image.
+    """
+    if isinstance(image, np.ndarray):
+        if image.ndim == 2:
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    return np.array(Image.open(image))
+
+
+def read_gray(image):
+    """
+    Get a grayscale image using OpenCV's BGR to gray conversion.
+
+    Parameters:
+        image (str or numpy.ndarray): Path to the image file, a BGR array,
+            or a 2D array that is already grayscale.
+
+    Returns:
+        numpy.ndarray: The grayscale image.
+    """
+    if isinstance(image, np.ndarray):
+        if image.ndim == 2:
+            return image
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return cv2.cvtColor(cv2.imread(image), cv2.COLOR_BGR2GRAY)
+
+
+def read_gray_pil(image):
+    """
+    Get a grayscale image using PIL's 'L' conversion.
+
+    PIL and OpenCV round the luma weights differently, so the GLRLM
+    extractor, which has always used PIL, keeps using this conversion.
+
+    Parameters:
+        image (str or numpy.ndarray): Path to the image file, a BGR array,
+            or a 2D array that is already grayscale.
+
+    Returns:
+        numpy.ndarray: The grayscale image.
+    """
+    if isinstance(image, np.ndarray):
+        if image.ndim == 2:
+            return image
+        image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    else:
+        image = Image.open(image)
+    return np.array(image.convert('L'))
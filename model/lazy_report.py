@@ -0,0 +1,183 @@
+"""
+Report how much CPU lazy feature extraction saves per record.
+
+Usage:
+    python -m model.lazy_report <image_or_dir> [...] [--repeat 3] [--json report.json]
+
+With lazy extraction (CERVISCAN_LAZY_FEATURES=1) only the features the
+classifier splits on are computed, and records keep no feature vector; see
+`cerviscan_feature_extraction.get_feature_plan`. Every image is decoded
+and segmented the way the app does it, then its features are extracted
+both in full and lazily, in the calling thread and without the feature
+cache. The lowest thread CPU time of `--repeat` runs is kept for each.
+The report lists the extraction plan, the CPU seconds saved per record,
+and whether the predicted probabilities are identical.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+
+def get_plan_summary():
+    """
+    Describe what lazy extraction skips for the current model.
+
+    Returns:
+        dict: The 'used_features', the 'plan' per block and the 'skipped_blocks'.
+    """
+    from model.classifier import get_used_features
+    from model.cerviscan_feature_extraction import CERVISCAN_FEATURE_BLOCKS
+    from model.cerviscan_feature_extraction import get_feature_plan
+
+    used = get_used_features()
+    plan = get_feature_plan(used)
+    return {
+        "used_features": used,
+        "plan": plan,
+        "skipped_blocks": [block for block, _ in CERVISCAN_FEATURE_BLOCKS if block not in plan],
+    }
+
+
+def measure_image(data, repeat=3, legacy_format=".jpg"):
+    """
+    Time full and lazy feature extraction on one image.
+
+    Parameters:
+        data (bytes): Encoded image bytes.
+        repeat (int): Runs per mode; the lowest CPU time is kept.
+        legacy_format (str): From `get_legacy_format` of the image's path,
+            so the image is segmented the way the app segments that upload.
+
+    Returns:
+        dict: 'full_cpu_seconds', 'lazy_cpu_seconds', 'saved_cpu_seconds' and
+        whether the probabilities are 'identical'.
+    """
+    from model.image_io import decode_normalized_image
+    from model.pipeline import segment_upload
+    from model.classifier import get_used_features
+    from model.classifier import predict_proba
+    from model.feature_schema import to_model_input
+    from model.stage_graph import SEQUENTIAL
+    from model.cerviscan_feature_extraction import get_cerviscan_feature_vector
+
+    image, _ = decode_normalized_image(data)
+    if image is None:
+        raise ValueError("image could not be decoded")
+    segmented = segment_upload(image, legacy_format=legacy_format)["segmented"]
+
+    results = {}
+    for mode, features in (("full", None), ("lazy", get_used_features())):
+        cpu_seconds = []
+        for _ in range(repeat):
+            start = time.thread_time()
+            vector = get_cerviscan_feature_vector(segmented, SEQUENTIAL, use_cache=False, features=features)
+            cpu_seconds.append(time.thread_time() - start)
+        results[mode] = (min(cpu_seconds), predict_proba(to_model_input(vector)))
+
+    return {
+        "full_cpu_seconds": results["full"][0],
+        "lazy_cpu_seconds": results["lazy"][0],
+        "saved_cpu_seconds": results["full"][0] - results["lazy"][0],
+        "identical": bool(np.array_equal(results["full"][1], results["lazy"][1])),
+    }
+
+
+def run_report(inputs, repeat=3):
+    """
+    Measure every input image.
+
+    Parameters:
+        inputs (list of str): Image files and/or directories (searched recursively).
+        repeat (int): Runs per mode and image.
+
+    Returns:
+        dict: The plan summary, 'images' with the per-image results and the
+        'summary' means over all images.
+    """
+    from model.batch import find_images
+    from model.legacy_segmentation import get_legacy_format
+
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(os.path.join(item, path) for path in find_images(item))
+        else:
+            paths.append(item)
+
+    rows = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            rows.append({"path": path, **measure_image(data, repeat, get_legacy_format(path))})
+        except Exception as e:
+            print(f"{path}: skipped ({e})")
+
+    def mean(key):
+        return float(np.mean([row[key] for row in rows])) if rows else 0.0
+
+    return {
+        **get_plan_summary(),
+        "images": rows,
+        "summary": {
+            "images": len(rows),
+            "mean_full_cpu_seconds": mean("full_cpu_seconds"),
+            "mean_lazy_cpu_seconds": mean("lazy_cpu_seconds"),
+            "mean_saved_cpu_seconds": mean("saved_cpu_seconds"),
+            "all_identical": all(row["identical"] for row in rows),
+        },
+    }
+
+
+def print_report(report):
+    print(f"Model splits on {len(report['used_features'])} features: {', '.join(report['used_features'])}")
+    for block, options in report["plan"].items():
+        print(f"  {block:<16} {', '.join(f'{k}={v}' for k, v in options.items()) or 'all'}")
+    for block in report["skipped_blocks"]:
+        print(f"  {block:<16} skipped")
+
+    print(f"{'image':<40} {'full cpu s':>11} {'lazy cpu s':>11} {'saved':>8} {'same':>5}")
+    for row in report["images"]:
+        print(
+            f"{os.path.basename(row['path'])[:40]:<40} {row['full_cpu_seconds']:>11.3f} "
+            f"{row['lazy_cpu_seconds']:>11.3f} {row['saved_cpu_seconds']:>8.3f} "
+            f"{'yes' if row['identical'] else 'NO':>5}"
+        )
+
+    summary = report["summary"]
+    full = summary["mean_full_cpu_seconds"]
+    saved = summary["mean_saved_cpu_seconds"]
+    print(
+        f"Mean per record: {saved:.3f} CPU s saved of {full:.3f} "
+        f"({saved / full if full else 0:.0%}); predictions "
+        f"{'identical' if summary['all_identical'] else 'DIFFER'} on {summary['images']} images"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m model.lazy_report",
+        description="Report the CPU time lazy feature extraction saves per record.",
+    )
+    parser.add_argument("inputs", nargs="+", help="image files or directories")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per mode and image")
+    parser.add_argument("--json", help="also write the full report to this file")
+    args = parser.parse_args(argv)
+
+    report = run_report(args.inputs, args.repeat)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return 0 if report["summary"]["all_identical"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,12 @@
 import numpy as np
-import cv2
+
+from model.image_io import read_gray
+from model.histogram_statistics import get_histogram
+from model.histogram_statistics import get_histogram_statistics
+
+# Bump when the LBP image or its statistics change value; the border mode
+# is a parameter of its own
+LBP_FEATURES_VERSION = "1"
 
 def get_pixel(img, center, x, y):
     """
@@ -55,58 +62,130 @@ def lbp_calculated_pixel(img, x, y):
     return val
 
 
-def lbp_implementation(path):
+LBP_BORDER_MODES = ('legacy', 'zero')
+
+# Neighbour offsets (row, col) in bit order, matching `lbp_calculated_pixel`.
+LBP_NEIGHBOURS = [
+    (-1, -1),  # top-left
+    (-1, 0),   # top
+    (-1, 1),   # top-right
+    (0, 1),    # right
+    (1, 1),    # bottom-right
+    (1, 0),    # bottom
+    (1, -1),   # bottom-left
+    (0, -1),   # left
+]
+
+
+def compute_lbp(img_gray, out=None, border='legacy'):
+    """
+    Compute the LBP image of a grayscale array with whole-array operations.
+
+    Each of the eight neighbour comparisons is done on a shifted view of a
+    padded copy of the image instead of visiting pixels one by one.
+
+    Border handling:
+        'legacy': bit-for-bit parity with `lbp_calculated_pixel`. A neighbour
+            above the first row or left of the first column wraps around to
+            the last row/column (Python negative indexing), while a neighbour
+            below the last row or right of the last column contributes 0
+            (the IndexError branch of `get_pixel`).
+        'zero': every out-of-bounds neighbour contributes 0.
+
+    Parameters:
+        img_gray (numpy.ndarray): 2D grayscale image.
+        out (numpy.ndarray, optional): uint8 buffer of the same shape to write
+            the result into. A new array is allocated when omitted.
+        border (str): Border mode, one of `LBP_BORDER_MODES`. Default is 'legacy'.
+
+    Returns:
+        numpy.ndarray: The LBP image (uint8), `out` if it was given.
+    """
+    if border not in LBP_BORDER_MODES:
+        raise ValueError(f"Unknown LBP border mode: {border}")
+
+    img_gray = np.asarray(img_gray)
+    if img_gray.ndim != 2:
+        raise ValueError("compute_lbp expects a 2D grayscale image")
+    height, width = img_gray.shape
+
+    if out is None:
+        out = np.zeros((height, width), np.uint8)
+    elif out.shape != (height, width) or out.dtype != np.uint8:
+        raise ValueError("out must be a uint8 array with the same shape as the image")
+    else:
+        out[...] = 0
+
+    # -1 is below every pixel value, so padded neighbours never set a bit.
+    padded = np.full((height + 2, width + 2), -1, dtype=np.int16)
+    padded[1:-1, 1:-1] = img_gray
+    if border == 'legacy':
+        padded[0, 1:-1] = img_gray[-1, :]
+        padded[1:-1, 0] = img_gray[:, -1]
+        padded[0, 0] = img_gray[-1, -1]
+
+    center = padded[1:-1, 1:-1]
+    compare = np.empty((height, width), dtype=bool)
+    bits = np.empty((height, width), dtype=np.uint8)
+
+    for bit, (dx, dy) in enumerate(LBP_NEIGHBOURS):
+        neighbour = padded[1 + dx:1 + dx + height, 1 + dy:1 + dy + width]
+        np.greater_equal(neighbour, center, out=compare)
+        np.left_shift(compare.view(np.uint8), bit, out=bits)
+        np.bitwise_or(out, bits, out=out)
+
+    return out
+
+
+def lbp_implementation(image):
     """
     Generate the LBP image from the input image.
 
     Parameters:
-        path (str): Path to the input image.
+        image (str or numpy.ndarray): Path to the input image, a decoded BGR
+            array, or a 2D grayscale array.
 
     Returns:
         numpy.ndarray: The resulting LBP image.
     """
-    img_bgr = cv2.imread(path, 1)
-    height, width, _ = img_bgr.shape
-
     # Convert the image to grayscale
-    img_gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
-
-    # Initialize an empty image for LBP
-    img_lbp = np.zeros((height, width), np.uint8)
+    img_gray = read_gray(image)
 
-    # Compute LBP for each pixel
-    for i in range(height):
-        for j in range(width):
-            img_lbp[i, j] = lbp_calculated_pixel(img_gray, i, j)
+    return compute_lbp(img_gray)
 
-    return img_lbp
-
-def get_lbp_features(path):
+def get_lbp_features(image):
     """
     Extract LBP features from the input image.
 
     Parameters:
-        path (str): Path to the input image.
+        image (str or numpy.ndarray): Path to the input image, a decoded BGR
+            array, or a 2D grayscale array.
 
     Returns:
         list: A list containing mean, median, standard deviation, kurtosis, and skewness of the LBP image.
     """
-    lbp_image = lbp_implementation(path).flatten()
+    return get_lbp_features_from_lbp(lbp_implementation(image))
+
 
-    # Mean
-    mean = np.mean(lbp_image)
+def get_lbp_features_from_lbp(lbp_image):
+    """
+    Extract LBP features from an already computed LBP image.
 
-    # Median
-    median = np.median(lbp_image)
+    Parameters:
+        lbp_image (numpy.ndarray): LBP image, e.g. from `compute_lbp`.
+            The statistics are computed from its 256-bin histogram.
+
+    Returns:
+        list: A list containing mean, median, standard deviation, kurtosis, and skewness of the LBP image.
+    """
+    stats = get_histogram_statistics(get_histogram(lbp_image))
 
-    # Standard Deviation
-    std = np.std(lbp_image)
-    n = len(lbp_image)
+    mean = stats['mean']
+    median = stats['median']
+    std = stats['std']
 
     # Kurtosis
-    squared_differences = (lbp_image - mean) ** 4
-    sum_of_squared_differences = np.sum(squared_differences)
-    kurtosis = (4 * sum_of_squared_differences) / (n * std ** 4) - 3
+    kurtosis = (4 * stats['m4']) / std ** 4 - 3
 
     # Skewness
     skewness = (3 * (mean - median)) / std
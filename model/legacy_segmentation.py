@@ -0,0 +1,130 @@
+"""
+Segmentation exactly as the original app did it, file round trips included.
+
+The original app wrote the gray image with `cv2.imwrite`, read it back
+with skimage to compute the mask, saved the mask with `plt.imsave`, read
+it back with OpenCV to segment the upload and wrote the segmented image
+with `cv2.imwrite`, from which the features were extracted. With the
+app's `.jpg` file names every one of those files was lossy JPEG: the mask
+came back with ringing around its edges, which `bitwise_and` turned into
+partial pixel values, and the segmented image was compressed once more.
+
+`xgb_best` was trained on features of such images, and the clean
+in-memory segmentation shifts them far enough to change its scores
+(positive-class probability 0.745 -> 0.290 and 0.278 -> 0.251 on the two
+sample uploads). Until the model is retrained on clean-mask features,
+`LEGACY_SEGMENTATION` (on by default) makes the pipeline reproduce the
+round trips in memory; the segmented image is bit-identical to the file
+the original app extracted features from.
+
+That holds for both upload routes. Base64 uploads were first opened with
+PIL and saved as JPEG under the record's `.jpg` name, whatever their
+format; `resave_base64_upload` does the same before anything else sees
+the bytes. The one difference: images PIL cannot write as JPEG (e.g. RGBA
+PNGs) made the original app fail, and are converted to RGB here instead.
+"""
+
+import io
+import os
+
+import cv2
+import numpy as np
+import matplotlib.image
+
+from PIL import Image
+
+from model.multiotsu_segmentation import multiotsu_masking
+from model.bitwise_operation import get_segmented_image
+
+# Reproduce the original lossy segmentation; set CERVISCAN_LEGACY_SEGMENTATION=0
+# once the model is retrained on clean-mask features
+LEGACY_SEGMENTATION = bool(int(os.environ.get("CERVISCAN_LEGACY_SEGMENTATION", 1)))
+
+# The original app wrote its intermediates with the upload's extension;
+# PNG round trips are lossless, everything else is treated as JPEG (the
+# base64 route always used .jpg)
+LEGACY_FORMATS = (".jpg", ".png")
+
+
+def get_legacy_format(filename):
+    """
+    Get the format the original app round-tripped a record's images through.
+
+    Parameters:
+        filename (str): File name of the upload.
+
+    Returns:
+        str: '.png' or '.jpg'.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    return ext if ext in LEGACY_FORMATS else ".jpg"
+
+
+def resave_base64_upload(data):
+    """
+    Re-save a base64-route upload as JPEG, the way the original app stored it.
+
+    Parameters:
+        data (bytes): Decoded base64 payload.
+
+    Returns:
+        bytes: JPEG written by PIL with its default settings, or None if
+        PIL cannot read the image.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+    # The original crashed on modes JPEG cannot hold
+    if image.mode not in ("RGB", "L", "CMYK"):
+        image = image.convert("RGB")
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def _round_trip(image, ext, flag):
+    """Encode an image with `cv2.imwrite`'s defaults and decode it with `cv2.imread`'s."""
+    ok, buffer = cv2.imencode(ext, image)
+    if not ok:
+        raise ValueError(f"Image could not be encoded as {ext}")
+    return cv2.imdecode(buffer, flag)
+
+
+def legacy_masking(gray_image, ext=".jpg"):
+    """
+    Compute the mask the way the original app did.
+
+    Parameters:
+        gray_image (numpy.ndarray): Grayscale upload.
+        ext (str): Format of the intermediate files, from `get_legacy_format`.
+
+    Returns:
+        numpy.ndarray: The mask as the original app read it back from its
+        file; not strictly 0/255 for JPEG.
+    """
+    # skimage decoded the gray file with PIL, which gives the same pixels as OpenCV
+    mask_image = multiotsu_masking(_round_trip(gray_image, ext, cv2.IMREAD_UNCHANGED))
+
+    buffer = io.BytesIO()
+    matplotlib.image.imsave(buffer, mask_image, cmap="gray", format=ext[1:])
+    return cv2.imdecode(np.frombuffer(buffer.getvalue(), np.uint8), cv2.IMREAD_GRAYSCALE)
+
+
+def legacy_segment_image(original_image, mask_image, ext=".jpg"):
+    """
+    Segment an image the way the original app did.
+
+    Parameters:
+        original_image (numpy.ndarray): The upload as a BGR array.
+        mask_image (numpy.ndarray): Mask from `legacy_masking`.
+        ext (str): Format of the intermediate files, from `get_legacy_format`.
+
+    Returns:
+        numpy.ndarray: The segmented image as the original feature
+        extractors read it from its file.
+    """
+    return _round_trip(get_segmented_image(original_image, mask_image), ext, cv2.IMREAD_COLOR)
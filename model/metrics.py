@@ -0,0 +1,99 @@
+"""
+Prometheus metrics for record processing.
+
+Stage latencies are recorded in one histogram, `cerviscan_stage_seconds`,
+labelled by stage; records created and failed and result cache hits and
+misses are counters.
+
+Under gunicorn every worker is a separate process. Set
+PROMETHEUS_MULTIPROC_DIR to an empty directory shared by all workers
+(gunicorn.conf.py does this) and each process writes its samples to
+memory-mapped files there, which `render_metrics` merges on every scrape.
+Background job processes inherit the variable and report the same way.
+Without it, metrics only cover the process that serves the scrape.
+"""
+
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST
+from prometheus_client import REGISTRY
+from prometheus_client import CollectorRegistry
+from prometheus_client import Counter
+from prometheus_client import Histogram
+from prometheus_client import generate_latest
+from prometheus_client import multiprocess
+
+# Stage labels of the latency histogram, in pipeline order
+STAGES = [
+    "decode",
+    "gray",
+    "mask",
+    "segment",
+    "yuv",
+    "lbp",
+    "glrlm",
+    "tamura",
+    "predict",
+    "db_commit",
+]
+
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = Histogram(
+    "cerviscan_stage_seconds",
+    "Wall time of each record processing stage.",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+
+RECORDS_CREATED = Counter(
+    "cerviscan_records_created",
+    "Records that were processed and stored with a prediction.",
+)
+
+RECORD_FAILURES = Counter(
+    "cerviscan_record_failures",
+    "Records that could not be processed.",
+)
+
+RESULT_CACHE_HITS = Counter(
+    "cerviscan_result_cache_hits",
+    "Records whose features and prediction were reused from an identical upload.",
+)
+
+RESULT_CACHE_MISSES = Counter(
+    "cerviscan_result_cache_misses",
+    "Records looked up in the result cache and processed in full.",
+)
+
+# Label lookups resolved once, so observing is a plain method call
+_stage_histograms = {stage: STAGE_SECONDS.labels(stage) for stage in STAGES}
+
+
+def observe_timings(timings):
+    """
+    Record stage timings in the latency histogram.
+
+    Parameters:
+        timings (dict): Seconds by stage name, e.g. as filled by
+            `run_pipeline`. Names that are not in `STAGES` are ignored.
+    """
+    for stage, seconds in timings.items():
+        histogram = _stage_histograms.get(stage)
+        if histogram is not None:
+            histogram.observe(seconds)
+
+
+def render_metrics():
+    """
+    Render all metrics in the Prometheus text format.
+
+    Returns:
+        tuple: The encoded metrics and their content type.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
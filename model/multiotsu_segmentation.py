@@ -1,11 +1,199 @@
-import matplotlib.pyplot as plt
+import os
+import sys
+import time
+import functools
+
+import cv2
 import numpy as np
-from skimage import io, img_as_ubyte
+from skimage import io
 from skimage.filters import threshold_multiotsu
 
-def multiotsu_masking(image_path):
-    image = io.imread(image_path)
-    
+# Number of multi-Otsu classes; the mask keeps the brightest one
+MULTIOTSU_CLASSES = 5
+
+# Above this many pixels the thresholds are computed from a strided subsample
+# of the image (0 disables). The result is then an approximation of the
+# full-resolution thresholds.
+MASK_HISTOGRAM_MAX_PIXELS = int(os.environ.get("CERVISCAN_MASK_HISTOGRAM_MAX_PIXELS", 0))
+
+# Bin index weights of the first-order moment table; bin 0 is weighted by 1,
+# exactly like skimage's LUT
+_INDEX_WEIGHTS = np.arange(256, dtype=np.float32)
+_INDEX_WEIGHTS[0] = 1
+
+
+def _get_moment_tables(prob):
+    """
+    Build the between-class variance table of the multi-Otsu search.
+
+    Replicates skimage's float32 lookup table: entry (i, j) is
+    S_ij^2 / P_ij for the class of bins i..j, from the cumulative zeroth (P)
+    and first (S) order moments.
+
+    Parameters:
+        prob (numpy.ndarray): float32 bin probabilities.
+
+    Returns:
+        numpy.ndarray: float32 table of shape (nbins, nbins), zero below the diagonal.
+    """
+    nbins = prob.size
+    zeroth_moment = np.cumsum(prob, dtype=np.float32)
+    first_moment = np.cumsum(_INDEX_WEIGHTS[:nbins] * prob, dtype=np.float32)
+
+    # Moments of bins i..j: cumulative up to j minus cumulative up to i - 1
+    zeroth_before = np.concatenate(([0], zeroth_moment[:-1])).astype(np.float32)
+    first_before = np.concatenate(([0], first_moment[:-1])).astype(np.float32)
+    zeroth_ij = zeroth_moment[None, :] - zeroth_before[:, None]
+    first_ij = first_moment[None, :] - first_before[:, None]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var_btwcls = np.where(zeroth_ij > 0, (first_ij * first_ij) / zeroth_ij, 0)
+    var_btwcls = np.triu(var_btwcls).astype(np.float32)
+    var_btwcls[0, 0] = 0
+    return var_btwcls
+
+
+def _get_sigma(var_btwcls, indices):
+    # Between-class variance of one candidate, summed in float32 in the same
+    # order as skimage
+    nbins = var_btwcls.shape[0]
+    sigma = var_btwcls[0, indices[0]] + var_btwcls[indices[-1] + 1, nbins - 1]
+    for a, b in zip(indices[:-1], indices[1:]):
+        sigma += var_btwcls[a + 1, b]
+    return sigma
+
+
+@functools.lru_cache(maxsize=64)
+def _get_threshold_indices(counts_bytes, classes):
+    """
+    Find the multi-Otsu threshold indices of a trimmed histogram.
+
+    The optimum of the between-class variance is found with dynamic
+    programming over the variance table instead of skimage's exhaustive
+    search. Because skimage compares float32 sums, every candidate within
+    float32 rounding of the optimum is then re-evaluated exactly as skimage
+    does, and the first one in skimage's search order wins. The result is
+    identical to `threshold_multiotsu`.
+
+    Parameters:
+        counts_bytes (bytes): int64 counts per bin, trimmed to the image range.
+        classes (int): Number of classes.
+
+    Returns:
+        tuple: Threshold indices into the trimmed histogram.
+    """
+    counts = np.frombuffer(counts_bytes, dtype=np.int64)
+    prob = (counts / np.sum(counts)).astype(np.float32)
+    nbins = prob.size
+
+    nvalues = np.count_nonzero(prob)
+    if nvalues < classes:
+        raise ValueError(
+            f'After discretization into bins, the input image has '
+            f'only {nvalues} different values. It cannot be thresholded '
+            f'in {classes} classes.'
+        )
+    if nvalues == classes:
+        return tuple(int(i) for i in np.flatnonzero(prob)[:-1])
+
+    var_btwcls = _get_moment_tables(prob)
+    table = var_btwcls.astype(np.float64)
+
+    # best[r][a]: best sum over r classes covering bins a..nbins-1
+    upper = np.triu(np.ones((nbins, nbins), dtype=bool))
+    best = [None, table[:, nbins - 1].copy()]
+    for r in range(2, classes + 1):
+        candidates = np.full((nbins, nbins), -np.inf)
+        candidates[:, :nbins - 1] = table[:, :nbins - 1] + best[r - 1][None, 1:]
+        candidates[~upper] = -np.inf
+        candidates[:, nbins - r + 1:] = -np.inf
+        best.append(candidates.max(axis=1))
+
+    sigma_best = best[classes][0]
+    tolerance = 16 * np.finfo(np.float32).eps * abs(sigma_best)
+
+    found = {'sigma': np.float32(0), 'indices': None}
+
+    def search(start, prefix, value):
+        remaining = classes - len(prefix)
+        if remaining == 1:
+            sigma = _get_sigma(var_btwcls, prefix)
+            if sigma > found['sigma']:
+                found['sigma'] = sigma
+                found['indices'] = tuple(prefix)
+            return
+        ends = np.arange(start, nbins - remaining + 1)
+        bounds = value + table[start, ends] + best[remaining - 1][ends + 1]
+        for end in ends[bounds >= sigma_best - tolerance]:
+            # An empty bin as a class end scores exactly like the bin before
+            # it, which skimage visits first
+            if prob[end] == 0 and end - 1 >= start and not (start == 0 and end == 1):
+                continue
+            search(end + 1, prefix + [int(end)], value + table[start, end])
+
+    search(0, [], 0.0)
+    return found['indices']
+
+
+def get_mask_threshold(image, max_pixels=None):
+    """
+    Get the lowest gray value of the brightest multi-Otsu class.
+
+    Parameters:
+        image (numpy.ndarray): uint8 grayscale image.
+        max_pixels (int, optional): If the image has more pixels, the
+            histogram is taken from a strided subsample. Defaults to
+            `MASK_HISTOGRAM_MAX_PIXELS`.
+
+    Returns:
+        int: Pixels at or above this value belong to the mask.
+    """
+    max_pixels = MASK_HISTOGRAM_MAX_PIXELS if max_pixels is None else max_pixels
+    source = image
+    if max_pixels and image.size > max_pixels:
+        step = int(np.ceil(np.sqrt(image.size / max_pixels)))
+        source = image[::step, ::step]
+
+    counts = np.bincount(source.ravel(), minlength=256).astype(np.int64)
+    nonzero = np.flatnonzero(counts)
+    low, high = nonzero[0], nonzero[-1]
+
+    indices = _get_threshold_indices(counts[low:high + 1].tobytes(), MULTIOTSU_CLASSES)
+    return int(low + indices[-1])
+
+
+def multiotsu_masking(image, out=None, max_pixels=None):
+    """
+    Mask the brightest of five multi-Otsu classes of a grayscale image.
+
+    Only the top threshold is needed, so the mask is a single comparison
+    written into `out`. Gives the same mask as `multiotsu_masking_reference`.
+
+    Parameters:
+        image (numpy.ndarray or str): Grayscale image or path to it.
+        out (numpy.ndarray, optional): Preallocated uint8 buffer of the image shape.
+        max_pixels (int, optional): See `get_mask_threshold`.
+
+    Returns:
+        numpy.ndarray: uint8 mask with 255 for the top class and 0 elsewhere.
+    """
+    if not isinstance(image, np.ndarray):
+        image = io.imread(image)
+    if image.dtype != np.uint8 or image.ndim != 2:
+        return multiotsu_masking_reference(image)
+
+    threshold = get_mask_threshold(image, max_pixels)
+
+    if out is None:
+        out = np.empty(image.shape, dtype=np.uint8)
+    cv2.threshold(image, threshold - 1, 255, cv2.THRESH_BINARY, dst=out)
+    return out
+
+
+def multiotsu_masking_reference(image):
+    if not isinstance(image, np.ndarray):
+        image = io.imread(image)
+
     # Compute multi-Otsu thresholds
     threshold = threshold_multiotsu(image, classes=5)
 
@@ -17,4 +205,23 @@ def multiotsu_masking(image_path):
     output[output < np.unique(output)[-1]] = 0
     output[output >= np.unique(output)[-1]] = 255
 
-    return output
\ No newline at end of file
+    return output
+
+
+# Parity check: python -m model.multiotsu_segmentation <image> [<image> ...]
+if __name__ == "__main__":
+    from model.image_io import read_gray
+
+    for path in sys.argv[1:]:
+        gray = read_gray(path)
+
+        start = time.perf_counter()
+        expected = multiotsu_masking_reference(gray)
+        reference_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        mask = multiotsu_masking(gray)
+        masking_time = time.perf_counter() - start
+
+        assert np.array_equal(mask, expected), f"{path}: masks differ"
+        print(f"{path}: identical masks, reference {reference_time:.3f}s, histogram {masking_time:.4f}s")
@@ -0,0 +1,276 @@
+import os
+import time
+
+from contextlib import nullcontext
+
+import cv2
+
+from model.image_io import decode_normalized_image
+from model.rgb_to_gray import rgb_to_gray_converter
+from model.multiotsu_segmentation import multiotsu_masking
+from model.bitwise_operation import segment_image
+from model.legacy_segmentation import LEGACY_SEGMENTATION
+from model.legacy_segmentation import get_legacy_format
+from model.legacy_segmentation import legacy_masking
+from model.legacy_segmentation import legacy_segment_image
+from model.cerviscan_feature_extraction import get_cerviscan_feature_vector
+from model.cerviscan_feature_extraction import encode_feature_vector
+from model.feature_schema import LAZY_FEATURES
+from model.feature_schema import to_model_input
+from model.classifier import predict
+from model.classifier import get_model_version
+from model.classifier import get_used_features
+from model.metrics import RESULT_CACHE_HITS
+from model.metrics import RESULT_CACHE_MISSES
+from model.result_cache import get_result_cache
+from model.result_cache import get_pipeline_version
+from model.result_cache import hash_upload
+from model.stage_graph import SEQUENTIAL
+from model.profiling import ProfileCapture
+
+
+def segment_upload(original_image, timings=None, cpu_timings=None, legacy_format=".jpg"):
+    """
+    Convert a decoded upload to gray, mask it and segment it.
+
+    Parameters:
+        original_image (numpy.ndarray): The uploaded image as a BGR array.
+        timings (dict, optional): If given, the wall time in seconds of each
+            stage ('gray', 'mask', 'segment') is stored in it.
+        cpu_timings (dict, optional): Same for the CPU time of each stage.
+        legacy_format (str): With `LEGACY_SEGMENTATION`, the format the
+            original app round-tripped this upload's mask and segmented
+            image through (see `legacy_segmentation.get_legacy_format`).
+
+    Returns:
+        dict: The intermediate images ('gray', 'mask', 'segmented'), the
+        mask's bounding box ('mask_box', (x, y, width, height) or None) and
+        pixel count ('mask_pixels').
+    """
+    timings = {} if timings is None else timings
+    cpu_timings = {} if cpu_timings is None else cpu_timings
+
+    start, start_cpu = time.perf_counter(), time.thread_time()
+    gray_image = rgb_to_gray_converter(original_image)
+    timings["gray"] = time.perf_counter() - start
+    cpu_timings["gray"] = time.thread_time() - start_cpu
+
+    start, start_cpu = time.perf_counter(), time.thread_time()
+    if LEGACY_SEGMENTATION:
+        mask_image = legacy_masking(gray_image, legacy_format)
+    else:
+        mask_image = multiotsu_masking(gray_image)
+    timings["mask"] = time.perf_counter() - start
+    cpu_timings["mask"] = time.thread_time() - start_cpu
+
+    start, start_cpu = time.perf_counter(), time.thread_time()
+    if LEGACY_SEGMENTATION:
+        segmented_image = legacy_segment_image(original_image, mask_image, legacy_format)
+        mask_pixels = cv2.countNonZero(mask_image)
+        mask_box = cv2.boundingRect(mask_image) if mask_pixels else None
+    else:
+        segmented_image, mask_box, mask_pixels = segment_image(original_image, mask_image)
+    timings["segment"] = time.perf_counter() - start
+    cpu_timings["segment"] = time.thread_time() - start_cpu
+
+    return {
+        "gray": gray_image,
+        "mask": mask_image,
+        "segmented": segmented_image,
+        "mask_box": mask_box,
+        "mask_pixels": mask_pixels,
+    }
+
+
+def run_pipeline(
+    original_image, timings=None, cpu_timings=None, executor=None, feature_vector=None, lazy=None,
+    legacy_format=".jpg", use_cache=False,
+):
+    """
+    Run segmentation and feature extraction on a decoded image.
+
+    Parameters:
+        original_image (numpy.ndarray): The uploaded image as a BGR array.
+        timings (dict, optional): If given, the wall time in seconds of each
+            stage ('gray', 'mask', 'segment', 'features') and of each feature
+            extractor ('yuv', 'lbp', 'glrlm', 'tamura') is stored in it.
+        cpu_timings (dict, optional): Same for the CPU time of each stage and
+            extractor, except the 'features' total.
+        executor (optional): Passed on to `get_cerviscan_feature_vector`.
+        feature_vector (list, optional): Features already known for this
+            image, e.g. from the result cache, extracted with the same
+            `lazy` setting; extraction is skipped.
+        lazy (bool, optional): Only extract the features the classifier
+            splits on, leaving the others NaN. Defaults to `LAZY_FEATURES`.
+        legacy_format (str): Passed on to `segment_upload`.
+        use_cache (bool): Use the feature cache (see `model.feature_cache`);
+            for offline reruns, not the request path.
+
+    Returns:
+        dict: The `segment_upload` result plus the 'feature_vector', whether
+        it is 'complete' (not lazily extracted) and the 'features' model
+        input (float32, see `model.feature_schema`).
+    """
+    timings = {} if timings is None else timings
+    cpu_timings = {} if cpu_timings is None else cpu_timings
+
+    lazy = LAZY_FEATURES if lazy is None else lazy
+    result = segment_upload(original_image, timings, cpu_timings, legacy_format)
+
+    if feature_vector is None:
+        start = time.perf_counter()
+        feature_vector = get_cerviscan_feature_vector(
+            result["segmented"],
+            executor,
+            timings=timings,
+            cpu_timings=cpu_timings,
+            use_cache=use_cache,
+            features=get_used_features() if lazy else None,
+        )
+        timings["features"] = time.perf_counter() - start
+
+    result["feature_vector"] = feature_vector
+    result["complete"] = not lazy
+    result["features"] = to_model_input(feature_vector)
+    return result
+
+
+def analyze_image(
+    original_image, content_hash=None, timings=None, cpu_timings=None, executor=None, legacy_format=".jpg"
+):
+    """
+    Run the pipeline and predict, reusing the result of an identical upload.
+
+    On a result cache hit (see `model.result_cache`) only gray conversion,
+    masking and segmentation run, for the record's artifacts; the feature
+    vector and prediction come from the cache.
+
+    Parameters:
+        original_image (numpy.ndarray): The decoded upload as a BGR array.
+        content_hash (str, optional): `hash_upload` of the raw upload bytes;
+            without it the cache is not used.
+        timings (dict, optional): Filled as by `run_pipeline`, plus 'predict'.
+        cpu_timings (dict, optional): Filled as by `run_pipeline`.
+        executor (optional): Passed on to `run_pipeline`.
+        legacy_format (str): Passed on to `run_pipeline`.
+
+    Returns:
+        tuple: The `run_pipeline` result, the prediction (bool) and whether
+        it came from the cache (bool).
+    """
+    timings = {} if timings is None else timings
+
+    cache = get_result_cache()
+    key = None
+    if content_hash and cache.enabled:
+        key = cache.make_key(
+            content_hash, get_pipeline_version(legacy_format=legacy_format), get_model_version()
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            RESULT_CACHE_HITS.inc()
+            result = run_pipeline(
+                original_image, timings, cpu_timings, executor,
+                feature_vector=cached["feature_vector"], legacy_format=legacy_format,
+            )
+            return result, cached["prediction"], True
+        RESULT_CACHE_MISSES.inc()
+
+    result = run_pipeline(original_image, timings, cpu_timings, executor, legacy_format=legacy_format)
+
+    start = time.perf_counter()
+    prediction = bool(predict(result["features"])[0])
+    timings["predict"] = time.perf_counter() - start
+
+    if key is not None:
+        cache.put(key, {
+            "feature_vector": [float(value) for value in result["feature_vector"]],
+            "prediction": prediction,
+        })
+
+    return result, prediction, False
+
+
+def get_stored_features(result):
+    """
+    Get the feature blob to store on a record.
+
+    Parameters:
+        result (dict): Output of `run_pipeline`.
+
+    Returns:
+        bytes: The full feature vector (see `encode_feature_vector`), or None
+        if it was extracted lazily; incomplete vectors are never stored.
+    """
+    if not result["complete"]:
+        return None
+    return encode_feature_vector(result["feature_vector"])
+
+
+def save_artifacts(result, filename, folders):
+    """
+    Save the intermediate images of a pipeline run.
+
+    Parameters:
+        result (dict): Output of `run_pipeline`.
+        filename (str): File name shared by all artifacts of the record.
+        folders (dict): Target folder per artifact ('gray', 'mask', 'segmented').
+    """
+    for name in ("gray", "mask", "segmented"):
+        cv2.imwrite(os.path.join(folders[name], filename), result[name])
+
+
+def process_record(original_path, filename, folders, profile_folder=None):
+    """
+    Process a stored upload end to end; the entry point for background jobs.
+
+    Only needs picklable arguments and does not touch the database, so it
+    can run in a thread or in a separate worker process.
+
+    Parameters:
+        original_path (str): Path to the stored upload.
+        filename (str): File name shared by all artifacts of the record.
+        folders (dict): Target folder per artifact ('gray', 'mask', 'segmented').
+        profile_folder (str, optional): If given, the record is profiled and
+            the capture is written to this folder (see `model.profiling`).
+
+    Returns:
+        dict: The 'prediction' for the image, the 'scale' factor the upload
+        was downscaled by before processing, whether the result was
+        'cached', the feature vector as a float32 blob ('features', see
+        `get_stored_features`; None with lazy extraction), the 'model_version' and per-stage 'timings'.
+    """
+    timings, cpu_timings = {}, {}
+    capture = None
+    if profile_folder:
+        capture = ProfileCapture(
+            os.path.splitext(filename)[0], profile_folder, timings=timings, cpu_timings=cpu_timings
+        )
+
+    with capture or nullcontext():
+        with open(original_path, "rb") as f:
+            data = f.read()
+
+        start = time.perf_counter()
+        original_image, scale = decode_normalized_image(data)
+        timings["decode"] = time.perf_counter() - start
+        if original_image is None:
+            raise ValueError("Uploaded image could not be decoded")
+        if capture:
+            capture.image = original_image
+
+        result, prediction, cached = analyze_image(
+            original_image, hash_upload(data), timings, cpu_timings, SEQUENTIAL if capture else None,
+            get_legacy_format(filename),
+        )
+
+    save_artifacts(result, filename, folders)
+
+    return {
+        "prediction": prediction,
+        "scale": scale,
+        "cached": cached,
+        "features": get_stored_features(result),
+        "model_version": get_model_version(),
+        "timings": timings,
+    }
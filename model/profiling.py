@@ -0,0 +1,156 @@
+"""
+Opt-in profiling of single record requests.
+
+A capture runs the wrapped code under a profiler and writes, per request,
+to the profiles folder:
+
+- `<id>.prof` (cProfile stats, open with `python -m pstats` or snakeviz),
+  or `<id>.html` when pyinstrument, a sampling profiler, is installed,
+- `<id>.txt`, a readable summary of the hottest calls,
+- `<id>.json`, the total and per-stage wall/CPU times and the input
+  dimensions, which `list_profiles` reads.
+
+Stages should run in the calling thread while profiling (pass
+`stage_graph.SEQUENTIAL`), since both profilers only follow that thread.
+"""
+
+import io
+import os
+import hmac
+import json
+import time
+import pstats
+import random
+import cProfile
+
+from datetime import datetime
+from datetime import timezone
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:
+    SamplingProfiler = None
+
+
+def should_profile(token, admin_token, sample_rate):
+    """
+    Decide whether to profile a request.
+
+    Parameters:
+        token (str): Token sent with the request, or None.
+        admin_token (str): Configured admin token; None disables the header.
+        sample_rate (float): Fraction of requests to profile anyway.
+
+    Returns:
+        bool: True if the token matches or the request is sampled.
+    """
+    if admin_token and token and hmac.compare_digest(token, admin_token):
+        return True
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+class ProfileCapture:
+    def __init__(self, capture_id, folder, image=None, timings=None, cpu_timings=None):
+        """
+        Context manager that profiles its block and saves the capture.
+
+        Parameters:
+            capture_id (str): Name of the capture, e.g. the record id.
+            folder (str): Profiles folder.
+            image (numpy.ndarray, optional): Input image, for its dimensions.
+                May also be assigned inside the block once it is decoded.
+            timings (dict, optional): Per-stage wall times, filled in the block.
+            cpu_timings (dict, optional): Per-stage CPU times, filled in the block.
+        """
+        self.capture_id = capture_id
+        self.folder = folder
+        self.image = image
+        self.timings = {} if timings is None else timings
+        self.cpu_timings = {} if cpu_timings is None else cpu_timings
+        self.profiler = SamplingProfiler() if SamplingProfiler else cProfile.Profile()
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.start_cpu = time.thread_time()
+        if SamplingProfiler:
+            self.profiler.start()
+        else:
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if SamplingProfiler:
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+        wall = time.perf_counter() - self.start
+        cpu = time.thread_time() - self.start_cpu
+
+        os.makedirs(self.folder, exist_ok=True)
+        base = os.path.join(self.folder, self.capture_id)
+
+        if SamplingProfiler:
+            files = [f"{self.capture_id}.html", f"{self.capture_id}.txt"]
+            with open(base + ".html", "w") as f:
+                f.write(self.profiler.output_html())
+            summary = self.profiler.output_text()
+        else:
+            files = [f"{self.capture_id}.prof", f"{self.capture_id}.txt"]
+            self.profiler.dump_stats(base + ".prof")
+            stream = io.StringIO()
+            pstats.Stats(self.profiler, stream=stream).sort_stats("cumulative").print_stats(40)
+            summary = stream.getvalue()
+        with open(base + ".txt", "w") as f:
+            f.write(summary)
+
+        info = {
+            "id": self.capture_id,
+            "captured_at": datetime.now(tz=timezone.utc).isoformat(),
+            "profiler": "pyinstrument" if SamplingProfiler else "cProfile",
+            "failed": exc_type is not None,
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "stages": {
+                stage: {"wall_seconds": seconds, "cpu_seconds": self.cpu_timings.get(stage)}
+                for stage, seconds in self.timings.items()
+            },
+            "input": None,
+            "files": files,
+        }
+        if self.image is not None:
+            info["input"] = {
+                "height": int(self.image.shape[0]),
+                "width": int(self.image.shape[1]),
+                "channels": int(self.image.shape[2]) if self.image.ndim == 3 else 1,
+            }
+
+        tmp_path = base + ".json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(info, f, indent=2)
+        os.replace(tmp_path, base + ".json")
+
+        return False
+
+
+def list_profiles(folder, limit=20):
+    """
+    List captured profiles, slowest first.
+
+    Parameters:
+        folder (str): Profiles folder.
+        limit (int): Maximum number of captures to return.
+
+    Returns:
+        list: The capture summaries written by `ProfileCapture`.
+    """
+    if not os.path.isdir(folder):
+        return []
+
+    profiles = []
+    for name in os.listdir(folder):
+        if name.endswith(".json"):
+            with open(os.path.join(folder, name)) as f:
+                profiles.append(json.load(f))
+
+    profiles.sort(key=lambda profile: profile["wall_seconds"], reverse=True)
+    return profiles[:limit]
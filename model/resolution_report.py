@@ -0,0 +1,152 @@
+"""
+Compare model scores at capped resolutions against full resolution.
+
+Usage:
+    python -m model.resolution_report <image_or_dir> [...] [--sizes 512 1024 ...] [--json report.json]
+
+Every image is scored once at full resolution and once per target long
+side, decoded the same way the app does with CERVISCAN_MAX_LONG_SIDE set.
+For each size the report shows how far the positive-class score moves
+from the full-resolution score, how often the predicted label stays the
+same, and the mean decode plus pipeline time per image. Use it to pick a
+cap before turning it on in production.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+DEFAULT_SIZES = [512, 768, 1024, 1536, 2048]
+
+
+def score_image(data, max_long_side, legacy_format=".jpg"):
+    """
+    Decode and score one image at a capped resolution.
+
+    Parameters:
+        data (bytes): Encoded image bytes.
+        max_long_side (int): Cap on the long side, 0 for full resolution.
+        legacy_format (str): From `get_legacy_format` of the image's path,
+            so the image is segmented the way the app segments that upload.
+
+    Returns:
+        dict: Positive-class 'score', 'label', decode 'scale' and wall time 'seconds'.
+    """
+    from model.image_io import decode_normalized_image
+    from model.pipeline import run_pipeline
+    from model.classifier import predict_proba
+
+    start = time.perf_counter()
+    image, scale = decode_normalized_image(data, max_long_side)
+    if image is None:
+        raise ValueError("image could not be decoded")
+    result = run_pipeline(image, legacy_format=legacy_format)
+    score = float(predict_proba(result["features"])[0, 1])
+
+    return {
+        "score": score,
+        "label": int(score > 0.5),
+        "scale": scale,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def summarize(rows, sizes):
+    """
+    Aggregate per-image results into one summary per target size.
+
+    Parameters:
+        rows (list of dict): Per-image results with 'full' and one entry per size.
+        sizes (list of int): Target long sides.
+
+    Returns:
+        list: One dict per size (plus full resolution first) with the mean and
+        max absolute score difference, label agreement and mean seconds.
+    """
+    summary = []
+    for size in ["full"] + sizes:
+        key = str(size)
+        diffs = np.array([abs(row[key]["score"] - row["full"]["score"]) for row in rows])
+        agree = np.array([row[key]["label"] == row["full"]["label"] for row in rows])
+        seconds = np.array([row[key]["seconds"] for row in rows])
+        summary.append({
+            "size": size,
+            "mean_abs_diff": float(diffs.mean()) if rows else 0.0,
+            "max_abs_diff": float(diffs.max()) if rows else 0.0,
+            "label_agreement": float(agree.mean()) if rows else 0.0,
+            "mean_seconds": float(seconds.mean()) if rows else 0.0,
+        })
+    return summary
+
+
+def run_report(inputs, sizes=DEFAULT_SIZES):
+    """
+    Score every input image at full resolution and at each target size.
+
+    Parameters:
+        inputs (list of str): Image files and/or directories (searched recursively).
+        sizes (list of int): Target long sides in pixels.
+
+    Returns:
+        dict: 'images' with the per-image results and 'summary' per size.
+    """
+    from model.batch import find_images
+    from model.legacy_segmentation import get_legacy_format
+
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(os.path.join(item, path) for path in find_images(item))
+        else:
+            paths.append(item)
+
+    rows = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            row = {"path": path, "full": score_image(data, 0, get_legacy_format(path))}
+            for size in sizes:
+                row[str(size)] = score_image(data, size, get_legacy_format(path))
+        except Exception as e:
+            print(f"{path}: skipped ({e})")
+            continue
+        rows.append(row)
+
+    return {"images": rows, "summary": summarize(rows, sizes)}
+
+
+def print_summary(summary, count):
+    print(f"{count} images")
+    print(f"{'long side':>10} {'mean |d|':>10} {'max |d|':>10} {'agree':>8} {'s/image':>9}")
+    for entry in summary:
+        print(
+            f"{entry['size']:>10} {entry['mean_abs_diff']:>10.4f} {entry['max_abs_diff']:>10.4f} "
+            f"{entry['label_agreement']:>7.1%} {entry['mean_seconds']:>9.3f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m model.resolution_report",
+        description="Compare CerviScan scores at capped resolutions against full resolution.",
+    )
+    parser.add_argument("inputs", nargs="+", help="image files or directories")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="target long sides in pixels")
+    parser.add_argument("--json", help="also write the full report to this file")
+    args = parser.parse_args(argv)
+
+    report = run_report(args.inputs, args.sizes)
+    print_summary(report["summary"], len(report["images"]))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
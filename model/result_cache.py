@@ -0,0 +1,196 @@
+"""
+Content-addressed cache of pipeline results for repeated uploads.
+
+Clinicians often upload the same photo again, for a second patient record
+or after a failed submission. Results are keyed by the SHA-256 of the raw
+upload bytes, the pipeline version and the model version, so a change to
+either never serves stale results. A hit returns the full feature vector
+and the prediction; the caller still decodes and segments the image to
+write the new record's artifacts, which is cheap next to extraction.
+
+There are two levels:
+
+- an in-memory LRU per process, holding `RESULT_CACHE_MEMORY_ENTRIES`
+  entries,
+- an on-disk cache shared by all workers, one small JSON file per entry in
+  `RESULT_CACHE_FOLDER`, holding about `RESULT_CACHE_DISK_ENTRIES` entries
+  (a `model.disk_store.DiskStore`, evicting the least recently used files
+  when the folder grows past the limit).
+
+Setting both sizes to 0 disables the cache.
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+from model.disk_store import DiskStore
+from model.image_io import MAX_LONG_SIDE
+from model.cerviscan_feature_extraction import CERVISCAN_BLOCK_EXTRACTORS
+from model.feature_schema import LAZY_FEATURES
+from model.legacy_segmentation import LEGACY_SEGMENTATION
+
+RESULT_CACHE_FOLDER = os.environ.get("CERVISCAN_RESULT_CACHE_FOLDER", "./cache/results")
+RESULT_CACHE_MEMORY_ENTRIES = int(os.environ.get("CERVISCAN_RESULT_CACHE_MEMORY_ENTRIES", 256))
+RESULT_CACHE_DISK_ENTRIES = int(os.environ.get("CERVISCAN_RESULT_CACHE_DISK_ENTRIES", 10000))
+
+# Bump whenever a change to decoding or segmentation changes the feature
+# vector of an upload; changes to an extractor are covered by its own version
+# (see `get_extractor_version`)
+PIPELINE_VERSION = "1"
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def hash_upload(data):
+    """
+    Hash the raw bytes of an upload.
+
+    Parameters:
+        data (bytes): Upload as received.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def get_extractor_version():
+    """
+    Get one version for all feature extractors.
+
+    Returns:
+        str: Short hash of every block's (extractor, version, params) in
+        `CERVISCAN_BLOCK_EXTRACTORS`, so bumping e.g. `TAMURA_FEATURES_VERSION`
+        also invalidates cached results.
+    """
+    identity = json.dumps(sorted(CERVISCAN_BLOCK_EXTRACTORS.values()), sort_keys=True)
+    return hashlib.sha256(identity.encode()).hexdigest()[:12]
+
+
+def get_pipeline_version(max_long_side=None, legacy_format=".jpg"):
+    """
+    Get the version of everything between upload bytes and feature vector.
+
+    It covers the extractor versions, the resolution cap, lazy extraction
+    (which leaves features the model does not use unset) and the legacy
+    segmentation with the format it round-trips through.
+
+    Parameters:
+        max_long_side (int, optional): Resolution cap; defaults to `MAX_LONG_SIDE`.
+        legacy_format (str): See `pipeline.run_pipeline`.
+
+    Returns:
+        str: Pipeline version.
+    """
+    max_long_side = MAX_LONG_SIDE if max_long_side is None else max_long_side
+    return (
+        f"{PIPELINE_VERSION}/extractors{get_extractor_version()}/max{max_long_side}"
+        + ("/lazy" if LAZY_FEATURES else "")
+        + (f"/legacy{legacy_format}" if LEGACY_SEGMENTATION else "")
+    )
+
+
+class ResultCache:
+    def __init__(self, folder, memory_entries, disk_entries):
+        """
+        Two-level LRU cache of pipeline results.
+
+        Parameters:
+            folder (str): Folder of the on-disk cache.
+            memory_entries (int): Size of the in-memory LRU; 0 disables it.
+            disk_entries (int): Approximate size of the on-disk cache; 0 disables it.
+        """
+        self.folder = folder
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._memory = OrderedDict()
+        self._disk = DiskStore(folder, max_entries=disk_entries) if disk_entries > 0 else None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.memory_entries > 0 or self.disk_entries > 0
+
+    @staticmethod
+    def make_key(content_hash, pipeline_version, model_version):
+        return hashlib.sha256(f"{content_hash}|{pipeline_version}|{model_version}".encode()).hexdigest()
+
+    def get(self, key):
+        """
+        Look up a result.
+
+        Parameters:
+            key (str): Key from `make_key`.
+
+        Returns:
+            dict: The cached result, or None.
+        """
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                return result
+
+        if self._disk is None:
+            return None
+
+        result = self._disk.get(key)
+        if result is not None:
+            self._remember(key, result)
+        return result
+
+    def put(self, key, result):
+        """
+        Store a result.
+
+        Parameters:
+            key (str): Key from `make_key`.
+            result (dict): JSON-serializable result.
+        """
+        self._remember(key, result)
+        if self._disk is not None:
+            self._disk.put(key, result)
+
+    def _remember(self, key, result):
+        if self.memory_entries <= 0:
+            return
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def evict(self):
+        """Delete the least recently used files until the on-disk cache is below its limit."""
+        if self._disk is not None:
+            self._disk.evict()
+
+    def clear(self):
+        """Drop every entry from memory and disk."""
+        with self._lock:
+            self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+
+def get_result_cache():
+    """
+    Get the process-wide result cache configured from the environment.
+
+    Returns:
+        ResultCache: The shared cache.
+    """
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(
+                    RESULT_CACHE_FOLDER, RESULT_CACHE_MEMORY_ENTRIES, RESULT_CACHE_DISK_ENTRIES
+                )
+    return _cache
@@ -1,7 +1,9 @@
 import cv2
 
+from model.image_io import read_bgr
+
 def rgb_to_gray_converter(image):
-    image = cv2.imread(image)
+    image = read_bgr(image)
     gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     
-    return gray_image
\ No newline at end of file
+    return gray_image
@@ -0,0 +1,166 @@
+import os
+import time
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import wait
+
+# Pool used by `get_stage_executor`: "thread" or "process", and its size.
+# CERVISCAN_STAGE_WORKERS=0 runs every stage sequentially in the caller.
+STAGE_POOL = os.environ.get("CERVISCAN_STAGE_POOL", "thread")
+STAGE_WORKERS = int(os.environ.get("CERVISCAN_STAGE_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Pass as `executor` to run a graph in the calling thread regardless of
+# STAGE_WORKERS, e.g. so a profiler sees every stage
+SEQUENTIAL = "sequential"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class Stage:
+    def __init__(self, name, func, inputs, output=None):
+        """
+        A single step of a stage graph.
+
+        Parameters:
+            name (str): Name of the stage.
+            func (callable): Called with the values of `inputs`, in order.
+                Must be a module-level function when a process pool is used.
+            inputs (list of str): Names of the values the stage consumes.
+            output (str, optional): Name of the value the stage produces.
+                Defaults to `name`.
+        """
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.output = output or name
+
+    def __repr__(self):
+        return f"<Stage {self.name}: {', '.join(self.inputs)} -> {self.output}>"
+
+
+def get_stage_executor():
+    """
+    Get the process-wide executor for stage graphs, created on first use.
+
+    Returns:
+        concurrent.futures.Executor: The shared executor, or None when
+        CERVISCAN_STAGE_WORKERS is 0 and stages run sequentially.
+    """
+    global _executor
+
+    if STAGE_WORKERS <= 0:
+        return None
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                if STAGE_POOL == "process":
+                    _executor = ProcessPoolExecutor(max_workers=STAGE_WORKERS)
+                else:
+                    _executor = ThreadPoolExecutor(max_workers=STAGE_WORKERS)
+    return _executor
+
+
+def _timed_call(func, *args):
+    # Module-level so it can be sent to a process pool; the CPU time is that
+    # of the thread running the stage
+    start, start_cpu = time.perf_counter(), time.thread_time()
+    value = func(*args)
+    return value, time.perf_counter() - start, time.thread_time() - start_cpu
+
+
+def _ready(stages, values):
+    return [stage for stage in stages if all(name in values for name in stage.inputs)]
+
+
+def select_stages(stages, targets, sources=()):
+    """
+    Get the stages needed to produce some values.
+
+    Parameters:
+        stages (list of Stage): The full stage graph.
+        targets (list of str): Names of the values wanted.
+        sources (iterable of str): Names of the values already available;
+            stages producing them, and stages only they need, are dropped.
+
+    Returns:
+        list of Stage: The needed stages, in their original order.
+
+    Raises:
+        ValueError: If no stage produces a wanted value.
+    """
+    by_output = {stage.output: stage for stage in stages}
+    sources = set(sources)
+
+    needed = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name in sources or name in needed:
+            continue
+        if name not in by_output:
+            raise ValueError(f"No stage produces {name!r}")
+        needed.add(name)
+        pending.extend(by_output[name].inputs)
+
+    return [stage for stage in stages if stage.output in needed]
+
+
+def run_stages(stages, sources, executor=None, timings=None, cpu_timings=None):
+    """
+    Run a stage graph, starting every stage as soon as its inputs exist.
+
+    Stages that do not depend on each other run concurrently on `executor`;
+    without an executor they run one after another in dependency order.
+
+    Parameters:
+        stages (list of Stage): The stages to run.
+        sources (dict): Initial values by name, e.g. {'bgr': image}.
+        executor (concurrent.futures.Executor, optional): Pool to run stages on.
+        timings (dict, optional): If given, the wall time in seconds of each
+            stage is stored in it by stage name.
+        cpu_timings (dict, optional): Same for the CPU time of each stage.
+
+    Returns:
+        dict: All values by name, the sources plus every stage output.
+
+    Raises:
+        ValueError: If some stages can never get all of their inputs.
+    """
+    values = dict(sources)
+    pending = list(stages)
+    timings = {} if timings is None else timings
+    cpu_timings = {} if cpu_timings is None else cpu_timings
+
+    if executor is None or executor == SEQUENTIAL:
+        while pending:
+            ready = _ready(pending, values)
+            if not ready:
+                raise ValueError(f"Stages with unsatisfiable inputs: {pending}")
+            for stage in ready:
+                pending.remove(stage)
+                values[stage.output], timings[stage.name], cpu_timings[stage.name] = _timed_call(
+                    stage.func, *[values[name] for name in stage.inputs]
+                )
+        return values
+
+    running = {}
+    while pending or running:
+        for stage in _ready(pending, values):
+            pending.remove(stage)
+            future = executor.submit(_timed_call, stage.func, *[values[name] for name in stage.inputs])
+            running[future] = stage
+
+        if not running:
+            raise ValueError(f"Stages with unsatisfiable inputs: {pending}")
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            stage = running.pop(future)
+            values[stage.output], timings[stage.name], cpu_timings[stage.name] = future.result()
+
+    return values
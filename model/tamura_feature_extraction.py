@@ -1,12 +1,94 @@
 import cv2
 import numpy as np
 from model.lbp_feature_extraction import lbp_implementation
+from model.image_io import read_gray
+from model.histogram_statistics import get_histogram
+from model.histogram_statistics import get_histogram_statistics
+
+# Bump when any of the four Tamura features changes value (coarseness,
+# contrast, directionality or roughness)
+TAMURA_FEATURES_VERSION = "1"
 
 # Function to calculate Coarseness
 def coarseness(image, kmax):
     """
     Calculate the coarseness feature of an image based on the Tamura texture features.
 
+    All 2^k window sums are read from one summed-area table, the horizontal
+    and vertical differences are shifted-array subtractions, and the best
+    window size per pixel is tracked with a running argmax over k. Note that,
+    as in the original formulation, the vertical differences are derived from
+    the horizontal ones (`vertical[k] = horizon[k] * scale`). Results match
+    `coarseness_reference`.
+
+    Parameters:
+        image (numpy.ndarray): Input grayscale image.
+        kmax (int): Maximum size of the neighborhood window for averaging.
+
+    Returns:
+        float: The coarseness value of the image.
+    """
+    image = np.array(image)
+    w = image.shape[0]
+    h = image.shape[1]
+    kmax = kmax if (np.power(2, kmax) < w) else int(np.log(w) / np.log(2))
+    kmax = kmax if (np.power(2, kmax) < h) else int(np.log(h) / np.log(2))
+
+    # integral[i, j] holds the sum of image[:i, :j]
+    integral = np.zeros([w + 1, h + 1], dtype=np.int64)
+    np.cumsum(np.cumsum(image, axis=0, dtype=np.int64), axis=1, out=integral[1:, 1:])
+
+    h_max = v_max = h_index = v_index = None
+
+    for k in range(kmax):
+        window = np.power(2, k)
+        size = 2 * window
+
+        # Sum of the 2^(k+1) x 2^(k+1) box around every pixel
+        average_gray = np.zeros([w, h], dtype=np.int64)
+        if w - size > 0 and h - size > 0:
+            average_gray[window:w - window, window:h - window] = (
+                integral[size:w, size:h]
+                - integral[:w - size, size:h]
+                - integral[size:w, :h - size]
+                + integral[:w - size, :h - size]
+            )
+
+        horizon = np.zeros([w, h])
+        if w - size - 1 > 0 and h - size - 1 > 0:
+            horizon[window:w - window - 1, window:h - window - 1] = (
+                average_gray[size:w - 1, window:h - window - 1]
+                - average_gray[:w - size - 1, window:h - window - 1]
+            )
+        horizon *= 1.0 / np.power(2, 2 * (k + 1))
+        vertical = horizon * (1.0 / np.power(2, 2 * (k + 1)))
+
+        # Running argmax over k, keeping the first k on ties like np.argmax
+        if k == 0:
+            h_max, v_max = horizon, vertical
+            h_index = np.zeros([w, h], dtype=np.int64)
+            v_index = np.zeros([w, h], dtype=np.int64)
+        else:
+            better = horizon > h_max
+            h_max = np.where(better, horizon, h_max)
+            h_index[better] = k
+            better = vertical > v_max
+            v_max = np.where(better, vertical, v_max)
+            v_index[better] = k
+
+    index = np.where(h_max > v_max, h_index, v_index)
+    Sbest = np.power(2.0, index)
+
+    fcrs = np.mean(Sbest)
+    return fcrs
+
+# Reference (per-pixel) Coarseness, kept for parity checks
+def coarseness_reference(image, kmax):
+    """
+    Calculate the coarseness feature with the original per-pixel loops.
+
+    This is the reference implementation `coarseness` is checked against.
+
     Parameters:
         image (numpy.ndarray): Input grayscale image.
         kmax (int): Maximum size of the neighborhood window for averaging.
@@ -60,6 +142,12 @@ def contrast(image):
         float: The contrast value of the image.
     """
     image = np.array(image)
+    if image.dtype == np.uint8:
+        # 8-bit images: moments from the 256-bin histogram
+        stats = get_histogram_statistics(get_histogram(image))
+        alfa4 = stats['kurtosis']
+        return stats['std'] / np.power(alfa4, 0.25)
+
     image = np.reshape(image, (1, image.shape[0] * image.shape[1]))
     m4 = np.mean(np.power(image - np.mean(image), 4))
     v = np.var(image)
@@ -73,6 +161,66 @@ def directionality(image):
     """
     Calculate the directionality feature of an image based on the Tamura texture features.
 
+    The 3x3 gradients are computed with `cv2.filter2D` over the whole image,
+    theta with a vectorized arctan using the same zero-gradient rules, and
+    the 16-bin direction histogram with a single `np.bincount`. Results
+    match `directionality_reference`.
+
+    Parameters:
+        image (numpy.ndarray): Input grayscale image.
+
+    Returns:
+        float: The directionality value of the image.
+    """
+    image = np.array(image, dtype='float64')
+    h = image.shape[0]
+    w = image.shape[1]
+    convH = np.array([[-1, 0, 1], [-1, 0, 1], [-1, 0, 1]], dtype='float64')
+    convV = np.array([[1, 1, 1], [0, 0, 0], [-1, -1, -1]], dtype='float64')
+
+    # Calculate deltaH (filter2D correlates, so the kernels are used as-is)
+    deltaH = cv2.filter2D(image, cv2.CV_64F, convH, borderType=cv2.BORDER_CONSTANT)
+    deltaH[0, 1:w - 1] = image[0, 2:] - image[0, 1:w - 1]
+    deltaH[h - 1, 1:w - 1] = image[h - 1, 2:] - image[h - 1, 1:w - 1]
+    deltaH[:, 0] = image[:, 1] - image[:, 0]
+    deltaH[:, w - 1] = image[:, w - 1] - image[:, w - 2]
+
+    # Calculate deltaV
+    deltaV = cv2.filter2D(image, cv2.CV_64F, convV, borderType=cv2.BORDER_CONSTANT)
+    deltaV[0, :] = image[1, :] - image[0, :]
+    deltaV[h - 1, :] = image[h - 1, :] - image[h - 2, :]
+    deltaV[1:h - 1, 0] = image[2:, 0] - image[1:h - 1, 0]
+    deltaV[1:h - 1, w - 1] = image[2:, w - 1] - image[1:h - 1, w - 1]
+
+    deltaG = (np.absolute(deltaH) + np.absolute(deltaV)) / 2.0
+
+    # Calculate theta: 0 where both gradients are 0, pi where only deltaH is 0
+    theta = np.zeros([h, w])
+    nonzero = deltaH != 0
+    theta[nonzero] = np.arctan(deltaV[nonzero] / deltaH[nonzero]) + np.pi / 2.0
+    theta[~nonzero & (deltaV != 0)] = np.pi
+
+    n = 16
+    t = 12
+    # Bin ni covers [(2ni - 1) pi / 2n, (2ni + 1) pi / 2n)
+    edges = np.array([(2 * ni - 1) * np.pi / (2 * n) for ni in range(n + 1)])
+    theta = theta[deltaG >= t]
+    bins = np.searchsorted(edges, theta, side='right') - 1
+    hd = np.bincount(bins[(bins >= 0) & (bins < n)], minlength=n).astype(np.float64)
+    hd = hd / np.mean(hd)
+    hd_max_index = np.argmax(hd)
+    fdir = 0
+    for ni in range(n):
+        fdir += np.power((ni - hd_max_index), 2) * hd[ni]
+    return fdir
+
+# Reference (per-pixel) Directionality, kept for parity checks
+def directionality_reference(image):
+    """
+    Calculate the directionality feature with the original per-pixel loops.
+
+    This is the reference implementation `directionality` is checked against.
+
     Parameters:
         image (numpy.ndarray): Input grayscale image.
 
@@ -160,23 +308,44 @@ def get_tamura_features(image, lbp='off'):
     Extract Tamura texture features from an image.
 
     Parameters:
-        image (str): Path to the input image file.
+        image (str or numpy.ndarray): Path to the input image file, or a decoded BGR array.
         lbp (str): Option to apply LBP ('on' or 'off'). Default is 'off'.
 
     Returns:
         list: A list of Tamura texture features [Coarseness, Contrast, Directionality, Roughness].
     """
     if lbp == 'off':
-        img = cv2.imread(image)
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        img = read_gray(image)
     else:
         img = lbp_implementation(image)
 
+    return get_tamura_features_from_gray(img)
+
+# Function to extract Tamura features from a decoded image
+def get_tamura_features_from_gray(img, features=None):
+    """
+    Extract Tamura texture features from an already decoded grayscale (or LBP) image.
+
+    Parameters:
+        img (numpy.ndarray): 2D image.
+        features (list of str, optional): Names from `get_tamura_feature_names()`
+            to compute; features that are neither wanted nor needed for a
+            wanted one are NaN. Defaults to all four.
+
+    Returns:
+        list: A list of Tamura texture features [Coarseness, Contrast, Directionality, Roughness].
+    """
+    wanted = set(get_tamura_feature_names() if features is None else features)
+
+    # Roughness is the sum of coarseness and contrast
+    fcrs = coarseness(img, 5) if wanted & {'Coarseness', 'Roughness'} else np.nan
+    fcon = contrast(img) if wanted & {'Contrast', 'Roughness'} else np.nan
+
     tamura_features = [
-        coarseness(img, 5), 
-        contrast(img), 
-        directionality(img), 
-        roughness(coarseness(img, 5), contrast(img))
+        fcrs,
+        fcon,
+        directionality(img) if 'Directionality' in wanted else np.nan,
+        roughness(fcrs, fcon) if 'Roughness' in wanted else np.nan
     ]
     return tamura_features
 
@@ -186,7 +355,7 @@ def get_tamura_on(image):
     Extract Tamura texture features from an image with LBP applied.
 
     Parameters:
-        image (str): Path to the input image file.
+        image (str or numpy.ndarray): Path to the input image file, or a decoded BGR array.
 
     Returns:
         list: A list of Tamura texture features [Coarseness, Contrast, Directionality, Roughness].
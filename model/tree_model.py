@@ -0,0 +1,385 @@
+"""
+Array-based copy of the XGBoost classifier, evaluated with NumPy only.
+
+Predicting a single record through the XGBoost sklearn wrapper pays for
+building a DMatrix and spinning up its thread pool, and importing xgboost
+makes every worker boot slower. The trees of `xgb_best` are small, so
+they are exported once into flat arrays, one entry per node across all
+trees:
+
+- `feature`: input column the node splits on,
+- `threshold`: float32 split value; a row goes left when `x < threshold`,
+- `left`, `right`: global index of the children,
+- `default_left`: whether a missing (NaN) value goes left,
+- `value`: leaf value, 0 for split nodes,
+
+plus `roots` (first node of every tree), `depth` (of the deepest tree),
+the float32 `base_margin` and the `feature_names`. Leaves are their own
+children, so every row walks exactly `depth` steps down all trees at once.
+Leaf values are summed in tree order in float32 and passed through the
+logistic function, the way XGBoost's CPU predictor does, so probabilities
+match it exactly.
+
+The classifier loads an export (a file ending in `.npz`) without
+importing xgboost; see `model.classifier`.
+
+Usage:
+    python -m model.tree_model export [model/xgb_best.npz]
+    python -m model.tree_model check [model/xgb_best.npz] [--random 10000] [--seed 0]
+
+`export` needs xgboost. `check` compares the export with XGBoost on the
+golden feature vectors from `parity/golden.json` and on random vectors,
+some with missing values; its exit code is 1 on any difference.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+
+import numpy as np
+
+# Bump when the layout of the exported arrays changes
+TREE_MODEL_FORMAT_VERSION = 1
+
+TREE_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "xgb_best.npz")
+
+SUPPORTED_OBJECTIVES = ("binary:logistic",)
+
+
+def hash_model_file(path):
+    """
+    Hash a model file.
+
+    Parameters:
+        path (str): Path to the model file.
+
+    Returns:
+        str: Short SHA-256 of the file.
+    """
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+class TreeModel:
+    def __init__(self, arrays):
+        """
+        Tree ensemble evaluated with NumPy.
+
+        Parameters:
+            arrays (dict): The exported arrays, as written by `export_tree_model`.
+        """
+        format_version = int(arrays["format_version"])
+        if format_version != TREE_MODEL_FORMAT_VERSION:
+            raise ValueError(
+                f"Tree model format {format_version} is not supported; "
+                f"re-export it (format {TREE_MODEL_FORMAT_VERSION})"
+            )
+        objective = str(arrays["objective"])
+        if objective not in SUPPORTED_OBJECTIVES:
+            raise ValueError(f"Unsupported objective {objective!r}")
+
+        self.feature = np.asarray(arrays["feature"], np.intp)
+        self.threshold = np.asarray(arrays["threshold"], np.float32)
+        self.left = np.asarray(arrays["left"], np.intp)
+        self.right = np.asarray(arrays["right"], np.intp)
+        self.default_left = np.asarray(arrays["default_left"], bool)
+        self.value = np.asarray(arrays["value"], np.float32)
+        self.roots = np.asarray(arrays["roots"], np.intp)
+        self.depth = int(arrays["depth"])
+        self.base_margin = np.float32(arrays["base_margin"])
+        self.feature_names = [str(name) for name in arrays["feature_names"]]
+        self.objective = objective
+        self.source_version = str(arrays["source_version"])
+
+    @property
+    def split_counts(self):
+        """Number of split nodes per feature name, like XGBoost's 'weight' importance."""
+        splits = self.feature[self.left != np.arange(len(self.left))]
+        counts = np.bincount(splits, minlength=len(self.feature_names))
+        return {name: int(count) for name, count in zip(self.feature_names, counts) if count}
+
+    def predict_margin(self, features):
+        """
+        Sum the leaf values of every tree.
+
+        Parameters:
+            features (numpy.ndarray): One row or a matrix of model inputs.
+
+        Returns:
+            numpy.ndarray: float32 raw scores, one per row.
+        """
+        features = np.asarray(features, dtype=np.float32)
+        if features.ndim == 1:
+            features = features[np.newaxis]
+        if features.shape[1] != len(self.feature_names):
+            raise ValueError(f"Expected {len(self.feature_names)} features, got {features.shape[1]}")
+
+        rows = np.arange(features.shape[0])[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (features.shape[0], len(self.roots)))
+        for _ in range(self.depth):
+            values = features[rows, self.feature[nodes]]
+            go_left = np.where(np.isnan(values), self.default_left[nodes], values < self.threshold[nodes])
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        # Accumulate in tree order and float32 like XGBoost, not pairwise
+        leaves = self.value[nodes]
+        margin = np.full(features.shape[0], self.base_margin, dtype=np.float32)
+        for tree in range(leaves.shape[1]):
+            margin += leaves[:, tree]
+        return margin
+
+    def predict_proba(self, features):
+        """
+        Predict class probabilities.
+
+        Parameters:
+            features (numpy.ndarray): One row or a matrix of model inputs.
+
+        Returns:
+            numpy.ndarray: float32 probabilities of shape (rows, 2).
+        """
+        margin = self.predict_margin(features)
+        # exp in float64 and rounded is the correctly rounded expf XGBoost uses
+        positive = np.float32(1) / (np.float32(1) + np.exp(-margin.astype(np.float64)).astype(np.float32))
+        return np.column_stack([np.float32(1) - positive, positive])
+
+    def predict(self, features):
+        """
+        Predict labels.
+
+        Parameters:
+            features (numpy.ndarray): One row or a matrix of model inputs.
+
+        Returns:
+            numpy.ndarray: int64 labels, 1 where the positive probability is above 0.5.
+        """
+        return (self.predict_proba(features)[:, 1] > 0.5).astype(np.int64)
+
+
+def load_tree_model(path=TREE_MODEL_PATH):
+    """
+    Load an exported tree model.
+
+    Parameters:
+        path (str): Path to the `.npz` export.
+
+    Returns:
+        TreeModel: The model.
+    """
+    with np.load(path, allow_pickle=False) as arrays:
+        return TreeModel(dict(arrays))
+
+
+def get_tree_arrays(booster):
+    """
+    Flatten the trees of an XGBoost booster into arrays.
+
+    Parameters:
+        booster (xgboost.Booster): Trained booster.
+
+    Returns:
+        dict: The arrays described in the module docstring, without the
+        'format_version' and 'source_version'.
+    """
+    learner = json.loads(booster.save_raw(raw_format="json"))["learner"]
+    objective = learner["objective"]["name"]
+    if objective not in SUPPORTED_OBJECTIVES:
+        raise ValueError(f"Unsupported objective {objective!r}")
+
+    model = learner["gradient_booster"]["model"]
+    trees = model["trees"]
+    # The sklearn wrapper only predicts with the trees up to the best iteration
+    best_iteration = booster.attributes().get("best_iteration")
+    if best_iteration is not None:
+        trees = trees[: model["iteration_indptr"][int(best_iteration) + 1]]
+
+    feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+    depth = 0
+    for tree in trees:
+        if any(tree["split_type"]):
+            raise ValueError("Categorical splits are not supported")
+
+        offset = len(feature)
+        roots.append(offset)
+        nodes = len(tree["left_children"])
+        node_depth = [0] * nodes
+        for node in range(nodes):
+            condition = tree["split_conditions"][node]
+            if tree["left_children"][node] == -1:
+                feature.append(0)
+                threshold.append(0.0)
+                left.append(offset + node)
+                right.append(offset + node)
+                default_left.append(False)
+                value.append(condition)
+            else:
+                feature.append(tree["split_indices"][node])
+                threshold.append(condition)
+                left.append(offset + tree["left_children"][node])
+                right.append(offset + tree["right_children"][node])
+                default_left.append(bool(tree["default_left"][node]))
+                value.append(0.0)
+                for child in (tree["left_children"][node], tree["right_children"][node]):
+                    node_depth[child] = node_depth[node] + 1
+        depth = max(depth, max(node_depth))
+
+    # The JSON stores base_score as a probability; XGBoost turns it into a
+    # margin in float32
+    base_score = np.float32(learner["learner_model_param"]["base_score"])
+    base_margin = np.float32(-np.log(np.float32(1) / base_score - np.float32(1)))
+
+    return {
+        "feature": np.array(feature, np.int32),
+        "threshold": np.array(threshold, np.float32),
+        "left": np.array(left, np.int32),
+        "right": np.array(right, np.int32),
+        "default_left": np.array(default_left, bool),
+        "value": np.array(value, np.float32),
+        "roots": np.array(roots, np.int32),
+        "depth": np.array(depth, np.int32),
+        "base_margin": base_margin,
+        "feature_names": np.array(booster.feature_names, str),
+        "objective": np.array(objective),
+    }
+
+
+def export_tree_model(output_path=TREE_MODEL_PATH, path=None):
+    """
+    Export the classifier's trees for `TreeModel`.
+
+    Parameters:
+        output_path (str): Destination `.npz` file.
+        path (str, optional): Pickled or native XGBoost model to convert;
+            defaults to `xgb_best`.
+
+    Returns:
+        TreeModel: The exported model.
+    """
+    from model.classifier import XGB_MODEL_PATH
+    from model.classifier import load_classifier
+
+    path = path or XGB_MODEL_PATH
+    arrays = get_tree_arrays(load_classifier(path).get_booster())
+    arrays["format_version"] = np.array(TREE_MODEL_FORMAT_VERSION)
+    arrays["source_version"] = np.array(hash_model_file(path))
+
+    with open(output_path, "wb") as f:
+        np.savez(f, **arrays)
+    return TreeModel(arrays)
+
+
+def get_check_inputs(random_rows=10000, seed=0):
+    """
+    Build model inputs for the equivalence check.
+
+    Parameters:
+        random_rows (int): Number of random vectors.
+        seed (int): Seed of the random vectors.
+
+    Returns:
+        dict: Input set name to float32 matrix: the 'golden' vectors of the
+        corpus images and uploads,
+        'random' vectors spread around them and 'missing', the same random
+        vectors with a fifth of the values set to NaN.
+    """
+    from parity.check import load_golden
+    from model.feature_schema import to_model_input
+
+    vectors = load_golden()
+    golden = to_model_input(np.array(list(vectors["images"].values()) + list(vectors["uploads"].values())))
+
+    # Scale each feature around the golden values so rows land on both
+    # sides of the thresholds
+    rng = np.random.default_rng(seed)
+    center = golden.mean(axis=0)
+    spread = np.maximum(golden.std(axis=0) * 3, np.abs(center) * 0.5) + 1e-3
+    random = (center + rng.uniform(-1, 1, (random_rows, golden.shape[1])) * spread).astype(np.float32)
+
+    missing = random.copy()
+    missing[rng.random(missing.shape) < 0.2] = np.nan
+    return {"golden": golden, "random": random, "missing": missing}
+
+
+def check_tree_model(path=TREE_MODEL_PATH, random_rows=10000, seed=0):
+    """
+    Compare an exported tree model with XGBoost.
+
+    Parameters:
+        path (str): Path to the `.npz` export.
+        random_rows (int): Number of random vectors.
+        seed (int): Seed of the random vectors.
+
+    Returns:
+        dict: 'passed', whether the export is of the current 'xgb_best'
+        ('current'), and per input set the number of 'rows', the largest
+        absolute probability difference 'max_abs' and the number of
+        'label_mismatches'.
+    """
+    from model.classifier import XGB_MODEL_PATH
+    from model.classifier import load_classifier
+
+    tree_model = load_tree_model(path)
+    classifier = load_classifier(XGB_MODEL_PATH)
+
+    sets = {}
+    for name, inputs in get_check_inputs(random_rows, seed).items():
+        expected = classifier.predict_proba(inputs)
+        actual = tree_model.predict_proba(inputs)
+        single = np.concatenate([tree_model.predict_proba(row) for row in inputs[:100]])
+        sets[name] = {
+            "rows": len(inputs),
+            "max_abs": float(np.abs(actual - expected).max()),
+            "label_mismatches": int((tree_model.predict(inputs) != classifier.predict(inputs)).sum()),
+            "single_row_identical": bool(np.array_equal(single, actual[:100])),
+        }
+
+    current = tree_model.source_version == hash_model_file(XGB_MODEL_PATH)
+    return {
+        "passed": current and all(
+            s["max_abs"] == 0 and not s["label_mismatches"] and s["single_row_identical"] for s in sets.values()
+        ),
+        "current": current,
+        "sets": sets,
+    }
+
+
+def print_check_report(report):
+    print(f"{'inputs':<10} {'rows':>7} {'max abs diff':>13} {'label diffs':>12} {'1-row same':>11}")
+    for name, s in report["sets"].items():
+        print(
+            f"{name:<10} {s['rows']:>7} {s['max_abs']:>13.3g} {s['label_mismatches']:>12} "
+            f"{'yes' if s['single_row_identical'] else 'NO':>11}"
+        )
+    if not report["current"]:
+        print("Export is of another model than xgb_best; re-run `python -m model.tree_model export`")
+    print("Tree model matches XGBoost" if report["passed"] else "Tree model DIFFERS from XGBoost")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m model.tree_model",
+        description="Export the classifier to NumPy arrays or check an export against XGBoost.",
+    )
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("path", nargs="?", default=TREE_MODEL_PATH, help="the .npz export")
+    parser.add_argument("--random", type=int, default=10000, help="random vectors to check")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random vectors")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        tree_model = export_tree_model(args.path)
+        print(
+            f"Exported {len(tree_model.roots)} trees ({len(tree_model.feature)} nodes, "
+            f"depth {tree_model.depth}) to {args.path}"
+        )
+        return 0
+
+    report = check_tree_model(args.path, args.random, args.seed)
+    print_check_report(report)
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
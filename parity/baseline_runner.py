@@ -0,0 +1,97 @@
+"""
+Run the original feature extraction of a baseline checkout.
+
+Usage (by `parity.generate`, in a subprocess):
+    python parity/baseline_runner.py <baseline_dir> <cases.json>
+
+`baseline_dir` holds the `model/` package of the baseline revision, as
+exported by `parity.generate.export_baseline`. `cases.json` lists cases
+as {"name": ..., "path": ..., "kind": "features" | "upload"}:
+
+- "features": the file is a segmented image and goes straight into the
+  original `get_cerviscan_features`,
+- "upload": the file is a raw upload and goes through the original app's
+  `create_record` flow first: gray image written with `cv2.imwrite`, mask
+  computed from that file and saved with `plt.imsave`, segmented image
+  written with `cv2.imwrite`, features extracted from that file. The
+  intermediate files keep the upload's extension, as in the app.
+
+Prints a JSON object mapping case name to the full feature vector in the
+order of the original feature-name functions. The original drops every
+column whose value is exactly 1; those features are filled in as 1.0.
+
+This file must not import anything from the current tree, so it is run
+as a script with the baseline first on the path.
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+
+def get_feature_names():
+    from model.yuv_color_moment import get_yuv_color_moment_feature_names
+    from model.lbp_feature_extraction import get_lbp_feature_names
+    from model.glrlm_feature_extraction import get_glrlm_feature_names
+    from model.tamura_feature_extraction import get_tamura_feature_names
+
+    return (
+        get_yuv_color_moment_feature_names()
+        + get_lbp_feature_names()
+        + get_glrlm_feature_names()
+        + get_tamura_feature_names()
+    )
+
+
+def segment_upload(original_path, folder):
+    """Reproduce the original app's segmentation; returns the segmented file's path."""
+    import cv2
+    import matplotlib.pyplot as plt
+
+    from model.rgb_to_gray import rgb_to_gray_converter
+    from model.multiotsu_segmentation import multiotsu_masking
+    from model.bitwise_operation import get_segmented_image
+
+    filename = "record" + os.path.splitext(original_path)[1]
+    paths = {name: os.path.join(folder, name, filename) for name in ("upload", "gray", "mask", "segmented")}
+    for path in paths.values():
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    shutil.copyfile(original_path, paths["upload"])
+
+    gray_image = rgb_to_gray_converter(paths["upload"])
+    cv2.imwrite(paths["gray"], gray_image)
+
+    mask_image = multiotsu_masking(paths["gray"])
+    plt.imsave(paths["mask"], mask_image, cmap="gray")
+
+    original_image = cv2.imread(paths["upload"])
+    segmented_image = get_segmented_image(original_image, paths["mask"])
+    cv2.imwrite(paths["segmented"], segmented_image)
+
+    return paths["segmented"]
+
+
+def main(baseline_dir, cases_path):
+    sys.path.insert(0, os.path.abspath(baseline_dir))
+    from model.cerviscan_feature_extraction import get_cerviscan_features
+
+    with open(cases_path) as f:
+        cases = json.load(f)
+
+    feature_names = get_feature_names()
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for case in cases:
+            path = case["path"]
+            if case["kind"] == "upload":
+                path = segment_upload(path, os.path.join(folder, case["name"]))
+            features = get_cerviscan_features(path).iloc[0].to_dict()
+            results[case["name"]] = [float(features.get(name, 1.0)) for name in feature_names]
+
+    json.dump({"feature_names": feature_names, "cases": results}, sys.stdout)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], sys.argv[2])
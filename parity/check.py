@@ -0,0 +1,288 @@
+"""
+Compare a feature-extraction engine against the golden-feature corpus.
+
+Usage:
+    python -m parity.check [--engine current|sequential|module:function]
+                           [--rtol 1e-9] [--atol 1e-9] [--float32] [--all] [--json]
+
+The engine is run on every segmented image in `parity/corpus/`, and on
+every raw upload in `parity/corpus/uploads/` after it has been decoded
+and segmented the way the app does it (`pipeline.segment_upload`). Each
+of its features is compared with the golden vector from
+`parity/golden.json`, which the original code produced (see
+`parity.generate`). The upload cases therefore also catch changes to
+decoding and segmentation. A feature drifts on a case when
+`|value - golden| > atol + rtol * |golden|`; NaN only matches NaN.
+Tolerances are per feature: `TOLERANCES` holds the defaults and any
+feature can be overridden with `--tolerance NAME RTOL ATOL`.
+
+The report lists every drifted feature with its largest absolute and
+relative difference and the cases it drifted on. The exit code is 1 if
+any feature drifted.
+
+An engine is a function that takes a BGR image (numpy.ndarray) and
+returns the 62 CerviScan features, either as a sequence in the order of
+`get_cerviscan_feature_names` or as a mapping (or one-row DataFrame)
+from feature name to value.
+"""
+
+import os
+import sys
+import json
+import argparse
+import importlib
+
+import cv2
+import numpy as np
+
+from parity.generate import CORPUS_DIR
+from parity.generate import UPLOAD_CORPUS_DIR
+from parity.generate import GOLDEN_PATH
+
+# Default (rtol, atol) for every feature
+DEFAULT_TOLERANCE = (1e-9, 1e-9)
+
+# Per-feature overrides of `DEFAULT_TOLERANCE`
+TOLERANCES = {
+    # Third moments of nearly symmetric channels sit close to zero, so the
+    # relative error of a different summation order is large
+    "skew_y": (1e-7, 1e-9),
+    "skew_u": (1e-7, 1e-9),
+    "skew_v": (1e-7, 1e-9),
+}
+
+
+def get_engines():
+    """
+    Get the built-in engines.
+
+    Returns:
+        dict: Engine name to function.
+    """
+    from model.stage_graph import SEQUENTIAL
+    from model.cerviscan_feature_extraction import get_cerviscan_feature_vector
+
+    # The feature cache is bypassed; parity is about what the extractors compute
+    return {
+        "current": lambda image: get_cerviscan_feature_vector(image, use_cache=False),
+        "sequential": lambda image: get_cerviscan_feature_vector(image, executor=SEQUENTIAL, use_cache=False),
+    }
+
+
+def load_engine(spec):
+    """
+    Resolve an engine name or `module:function` path.
+
+    Parameters:
+        spec (str): A built-in engine name or `module:function`.
+
+    Returns:
+        callable: The engine.
+    """
+    engines = get_engines()
+    if spec in engines:
+        return engines[spec]
+    if ":" not in spec:
+        raise ValueError(f"Unknown engine {spec!r}; use one of {sorted(engines)} or module:function")
+
+    module_name, function_name = spec.split(":", 1)
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def load_golden(path=GOLDEN_PATH):
+    """
+    Load the golden feature vectors.
+
+    Parameters:
+        path (str): Path of `golden.json`.
+
+    Returns:
+        dict: The golden data written by `parity.generate`.
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def to_feature_values(features, feature_names):
+    """
+    Put an engine's output in golden order.
+
+    Parameters:
+        features: Sequence, mapping or one-row DataFrame of features.
+        feature_names (list of str): Golden feature order.
+
+    Returns:
+        numpy.ndarray: float64 values; features an engine did not return are NaN.
+    """
+    if hasattr(features, "iloc"):
+        features = features.iloc[0].to_dict()
+
+    if isinstance(features, dict):
+        return np.array([features.get(name, np.nan) for name in feature_names], np.float64)
+
+    values = np.asarray(features, np.float64).ravel()
+    if values.size != len(feature_names):
+        raise ValueError(f"Engine returned {values.size} features, expected {len(feature_names)}")
+    return values
+
+
+def get_tolerance(name, overrides=None, default=DEFAULT_TOLERANCE):
+    """
+    Get the tolerance of a feature.
+
+    Parameters:
+        name (str): Feature name.
+        overrides (dict, optional): Feature name to (rtol, atol), taking precedence.
+        default (tuple): (rtol, atol) of features without an entry.
+
+    Returns:
+        tuple: (rtol, atol).
+    """
+    if overrides and name in overrides:
+        return overrides[name]
+    return TOLERANCES.get(name, default)
+
+
+def get_cases(golden):
+    """
+    Load the inputs of every golden case.
+
+    Parameters:
+        golden (dict): Golden data.
+
+    Returns:
+        list: (case name, segmented BGR image, golden vector) tuples.
+    """
+    from model.image_io import decode_normalized_image
+    from model.legacy_segmentation import get_legacy_format
+    from model.pipeline import segment_upload
+
+    cases = []
+    for filename, expected in golden["images"].items():
+        image = cv2.imread(os.path.join(CORPUS_DIR, filename))
+        if image is None:
+            raise FileNotFoundError(f"Corpus image {filename} is missing from {CORPUS_DIR}")
+        cases.append((filename, image, expected))
+
+    for filename, expected in golden["uploads"].items():
+        with open(os.path.join(UPLOAD_CORPUS_DIR, filename), "rb") as f:
+            image, _ = decode_normalized_image(f.read())
+        if image is None:
+            raise ValueError(f"Corpus upload {filename} could not be decoded")
+        segmented = segment_upload(image, legacy_format=get_legacy_format(filename))["segmented"]
+        cases.append((f"uploads/{filename}", segmented, expected))
+    return cases
+
+
+def check_parity(engine, overrides=None, default=DEFAULT_TOLERANCE, float32=False, golden=None):
+    """
+    Run an engine on the corpus and compare it with the golden vectors.
+
+    Parameters:
+        engine (callable): Feature-extraction engine.
+        overrides (dict, optional): Feature name to (rtol, atol).
+        default (tuple): (rtol, atol) of features without an entry.
+        float32 (bool): Compare after casting both sides to float32, the
+            precision the classifier sees.
+        golden (dict, optional): Golden data; loaded from disk by default.
+
+    Returns:
+        dict: 'passed', the number of 'cases' and, per feature in golden
+        order, its 'rtol', 'atol', 'max_abs' and 'max_rel' difference and
+        the 'drifted' cases.
+    """
+    if golden is None:
+        golden = load_golden()
+    feature_names = golden["feature_names"]
+
+    features = [
+        {"name": name, "rtol": rtol, "atol": atol, "max_abs": 0.0, "max_rel": 0.0, "drifted": []}
+        for name, (rtol, atol) in ((name, get_tolerance(name, overrides, default)) for name in feature_names)
+    ]
+
+    cases = get_cases(golden)
+    for filename, image, expected in cases:
+        expected = np.array(expected, np.float64)
+        actual = to_feature_values(engine(image), feature_names)
+        if float32:
+            expected = expected.astype(np.float32).astype(np.float64)
+            actual = actual.astype(np.float32).astype(np.float64)
+
+        for feature, want, got in zip(features, expected, actual):
+            if np.isnan(want) or np.isnan(got):
+                if np.isnan(want) != np.isnan(got):
+                    feature["max_abs"] = feature["max_rel"] = float("inf")
+                    feature["drifted"].append(filename)
+                continue
+
+            difference = abs(got - want)
+            relative = difference / abs(want) if want else (float("inf") if difference else 0.0)
+            feature["max_abs"] = max(feature["max_abs"], float(difference))
+            feature["max_rel"] = max(feature["max_rel"], float(relative))
+            if difference > feature["atol"] + feature["rtol"] * abs(want):
+                feature["drifted"].append(filename)
+
+    return {
+        "passed": not any(feature["drifted"] for feature in features),
+        "cases": len(cases),
+        "features": features,
+    }
+
+
+def print_report(report, show_all=False):
+    """
+    Print a parity report.
+
+    Parameters:
+        report (dict): Output of `check_parity`.
+        show_all (bool): Also list features within tolerance.
+    """
+    drifted = [feature for feature in report["features"] if feature["drifted"]]
+    shown = report["features"] if show_all else sorted(drifted, key=lambda f: f["max_rel"], reverse=True)
+
+    if shown:
+        print(f"{'feature':<28} {'max abs':>12} {'max rel':>12} {'rtol':>8} {'atol':>8}  drifted on")
+    for feature in shown:
+        print(
+            f"{feature['name']:<28} {feature['max_abs']:>12.3g} {feature['max_rel']:>12.3g} "
+            f"{feature['rtol']:>8.0e} {feature['atol']:>8.0e}  "
+            f"{len(feature['drifted'])}/{report['cases']} {' '.join(feature['drifted'])}"
+        )
+
+    print(
+        f"{len(drifted)} of {len(report['features'])} features drifted "
+        f"on {report['cases']} cases" if drifted else
+        f"All {len(report['features'])} features within tolerance on {report['cases']} cases"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m parity.check",
+        description="Compare a feature-extraction engine against the golden-feature corpus.",
+    )
+    parser.add_argument("--engine", default="current", help="built-in engine name or module:function")
+    parser.add_argument("--rtol", type=float, default=DEFAULT_TOLERANCE[0], help="default relative tolerance")
+    parser.add_argument("--atol", type=float, default=DEFAULT_TOLERANCE[1], help="default absolute tolerance")
+    parser.add_argument(
+        "--tolerance", nargs=3, action="append", default=[], metavar=("NAME", "RTOL", "ATOL"),
+        help="tolerance of one feature (repeatable)",
+    )
+    parser.add_argument("--float32", action="store_true", help="compare at the classifier's float32 precision")
+    parser.add_argument("--all", action="store_true", help="list every feature, not only drifted ones")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    overrides = {name: (float(rtol), float(atol)) for name, rtol, atol in args.tolerance}
+    report = check_parity(load_engine(args.engine), overrides, (args.rtol, args.atol), args.float32)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args.all)
+
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
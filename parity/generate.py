@@ -0,0 +1,239 @@
+"""
+Build the golden-feature parity corpus.
+
+Usage:
+    python -m parity.generate [--force] [--revision BASELINE_REVISION]
+
+The golden vectors come from the original feature extraction the
+classifier was trained with, not from the code under test: the `model/`
+package of `BASELINE_REVISION` is exported from git and run in a
+subprocess (see `parity/baseline_runner.py`). There are two kinds of
+cases:
+
+- `parity/corpus/*.png`: segmented images, downscaled to a long side of
+  `LONG_SIDE` pixels and stored as PNG so they decode bit-exactly. They
+  pin the feature extractors on their own.
+- `parity/corpus/uploads/*`: raw uploads (the sample uploads in
+  `static/uploads` and synthetic images from `benchmarks.synthetic`, as
+  JPEG and PNG). They pin the whole path from upload bytes to features,
+  decoding and segmentation included; the golden vectors follow the
+  original app's file round trips.
+
+Only regenerate the golden vectors (with --force) when the features are
+meant to change, e.g. for a retrained model; --revision then names the
+commit whose extraction becomes the new reference.
+"""
+
+import os
+import sys
+import json
+import tarfile
+import argparse
+import tempfile
+import subprocess
+
+from datetime import datetime
+from datetime import timezone
+
+import cv2
+
+PARITY_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(PARITY_DIR)
+CORPUS_DIR = os.path.join(PARITY_DIR, "corpus")
+UPLOAD_CORPUS_DIR = os.path.join(CORPUS_DIR, "uploads")
+GOLDEN_PATH = os.path.join(PARITY_DIR, "golden.json")
+
+UPLOADS_DIR = os.path.join(ROOT_DIR, "static", "uploads")
+
+# The original code, which `xgb_best` was trained with
+BASELINE_REVISION = "cc581d829f67c663129fb97eebeef6fa3e0d4751"
+
+# Long side of the segmented corpus images, in pixels
+LONG_SIDE = 192
+
+# Synthetic sources: (name, seed)
+SYNTHETIC_SEEDS = [("synthetic-0", 0), ("synthetic-1", 1), ("synthetic-2", 2)]
+
+# Synthetic uploads: (file name, seed, megapixels)
+SYNTHETIC_UPLOADS = [("synthetic-3.jpg", 3, 0.3), ("synthetic-4.png", 4, 0.1)]
+
+GOLDEN_VERSION = 2
+
+
+def get_sources():
+    """
+    Get the source images of the segmented corpus.
+
+    Returns:
+        list: (name, BGR array) pairs at full resolution.
+    """
+    from benchmarks.synthetic import make_cervix_image
+
+    sources = []
+    for filename in sorted(os.listdir(UPLOADS_DIR)):
+        image = cv2.imread(os.path.join(UPLOADS_DIR, filename))
+        if image is not None:
+            sources.append((f"upload-{os.path.splitext(filename)[0][:8]}", image))
+    for name, seed in SYNTHETIC_SEEDS:
+        sources.append((name, make_cervix_image(0.5, seed)))
+    return sources
+
+
+def build_corpus():
+    """
+    Write the segmented corpus images.
+
+    Returns:
+        list: File names of the corpus images, relative to `CORPUS_DIR`.
+    """
+    from model.image_io import normalize_resolution
+    from model.pipeline import segment_upload
+
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+
+    names = []
+    for name, image in get_sources():
+        small, _ = normalize_resolution(image, LONG_SIDE)
+        filename = f"{name}.png"
+        cv2.imwrite(os.path.join(CORPUS_DIR, filename), segment_upload(small)["segmented"])
+        names.append(filename)
+    return names
+
+
+def build_upload_corpus():
+    """
+    Write the raw upload cases.
+
+    Returns:
+        list: File names of the uploads, relative to `UPLOAD_CORPUS_DIR`.
+    """
+    from benchmarks.synthetic import make_cervix_image
+
+    os.makedirs(UPLOAD_CORPUS_DIR, exist_ok=True)
+
+    names = []
+    for filename in sorted(os.listdir(UPLOADS_DIR)):
+        with open(os.path.join(UPLOADS_DIR, filename), "rb") as f:
+            data = f.read()
+        name = f"upload-{os.path.splitext(filename)[0][:8]}{os.path.splitext(filename)[1].lower()}"
+        with open(os.path.join(UPLOAD_CORPUS_DIR, name), "wb") as f:
+            f.write(data)
+        names.append(name)
+    for filename, seed, megapixels in SYNTHETIC_UPLOADS:
+        cv2.imwrite(os.path.join(UPLOAD_CORPUS_DIR, filename), make_cervix_image(megapixels, seed))
+        names.append(filename)
+    return names
+
+
+def export_baseline(revision, folder):
+    """
+    Export the `model/` package of a revision.
+
+    Parameters:
+        revision (str): Git revision.
+        folder (str): Destination; `model/` is created in it.
+    """
+    archive = subprocess.run(
+        ["git", "-C", ROOT_DIR, "archive", "--format=tar", revision, "model"],
+        capture_output=True,
+        check=True,
+    ).stdout
+    with tempfile.TemporaryFile() as f:
+        f.write(archive)
+        f.seek(0)
+        with tarfile.open(fileobj=f) as tar:
+            tar.extractall(folder, filter="data")
+
+
+def run_baseline(cases, revision=BASELINE_REVISION):
+    """
+    Extract features with the original code of a revision.
+
+    Parameters:
+        cases (list of dict): Cases as described in `parity/baseline_runner.py`.
+        revision (str): Git revision of the baseline.
+
+    Returns:
+        dict: 'feature_names' and the feature vector per case name in 'cases'.
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        export_baseline(revision, folder)
+        cases_path = os.path.join(folder, "cases.json")
+        with open(cases_path, "w") as f:
+            json.dump(cases, f)
+
+        output = subprocess.run(
+            [sys.executable, os.path.join(PARITY_DIR, "baseline_runner.py"), folder, cases_path],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=folder,
+            env={**os.environ, "MPLBACKEND": "Agg"},
+        ).stdout
+    return json.loads(output)
+
+
+def generate(force=False, revision=BASELINE_REVISION):
+    """
+    Build the corpus and write the golden feature vectors.
+
+    Parameters:
+        force (bool): Overwrite an existing `golden.json`.
+        revision (str): Git revision whose feature extraction is the reference.
+
+    Returns:
+        dict: The golden data as written.
+    """
+    from model.cerviscan_feature_extraction import get_cerviscan_feature_names
+
+    if os.path.exists(GOLDEN_PATH) and not force:
+        raise FileExistsError(f"{GOLDEN_PATH} exists; pass --force to overwrite it")
+
+    images = build_corpus()
+    uploads = build_upload_corpus()
+    cases = [
+        {"name": f"images/{name}", "path": os.path.join(CORPUS_DIR, name), "kind": "features"}
+        for name in images
+    ] + [
+        {"name": f"uploads/{name}", "path": os.path.join(UPLOAD_CORPUS_DIR, name), "kind": "upload"}
+        for name in uploads
+    ]
+    baseline = run_baseline(cases, revision)
+    if baseline["feature_names"] != get_cerviscan_feature_names():
+        raise ValueError("The baseline's feature names differ from get_cerviscan_feature_names()")
+
+    golden = {
+        "version": GOLDEN_VERSION,
+        "created_at": datetime.now(tz=timezone.utc).isoformat(),
+        "generator": f"get_cerviscan_features of {revision} (parity/baseline_runner.py)",
+        "baseline_revision": revision,
+        "feature_names": baseline["feature_names"],
+        "images": {name: baseline["cases"][f"images/{name}"] for name in images},
+        "uploads": {name: baseline["cases"][f"uploads/{name}"] for name in uploads},
+    }
+
+    with open(GOLDEN_PATH, "w") as f:
+        json.dump(golden, f, indent=2)
+    return golden
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m parity.generate",
+        description="Build the golden-feature parity corpus.",
+    )
+    parser.add_argument("--force", action="store_true", help="overwrite the existing golden vectors")
+    parser.add_argument(
+        "--revision", default=BASELINE_REVISION, help="git revision whose feature extraction is the reference"
+    )
+    args = parser.parse_args(argv)
+
+    golden = generate(args.force, args.revision)
+    print(
+        f"{len(golden['images'])} images and {len(golden['uploads'])} uploads, "
+        f"{len(golden['feature_names'])} features written to {GOLDEN_PATH}"
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
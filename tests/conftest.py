@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The packages are run from the repository root (`python -m model.batch`, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
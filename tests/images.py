@@ -0,0 +1,24 @@
+import os
+
+import cv2
+import numpy as np
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "parity", "corpus")
+
+
+def get_corpus_grays():
+    """Gray versions of the segmented parity corpus images, as (name, array) pairs."""
+    names = sorted(name for name in os.listdir(CORPUS_DIR) if name.endswith(".png"))
+    return [(name, cv2.imread(os.path.join(CORPUS_DIR, name), cv2.IMREAD_GRAYSCALE)) for name in names]
+
+
+def get_random_grays(seed, count, max_side=40):
+    """Small uint8 images of random shape, noise level and value range."""
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        shape = tuple(rng.integers(2, max_side, 2))
+        low = rng.integers(0, 250)
+        high = rng.integers(low + 1, 257)
+        images.append(rng.integers(low, high, shape).astype(np.uint8))
+    return images
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from model.GrayRumatrix import GLRLM_ANGLES
+from model.GrayRumatrix import compute_glrlm
+from model.GrayRumatrix import compute_glrlm_features
+from model.GrayRumatrix import compute_glrlm_reference
+from model.GrayRumatrix import getGrayRumatrix
+from model.lbp_feature_extraction import compute_lbp
+
+from images import get_corpus_grays, get_random_grays
+
+# Per-feature methods in the column order of `compute_glrlm_features`
+FEATURE_METHODS = [
+    "getShortRunEmphasis", "getLongRunEmphasis", "getGrayLevelNonUniformity",
+    "getRunLengthNonUniformity", "getRunPercentage", "getLowGrayLevelRunEmphasis",
+    "getHighGrayLevelRunEmphais", "getShortRunLowGrayLevelEmphasis",
+    "getShortRunHighGrayLevelEmphasis", "getLongRunLow", "getLongRunHighGrayLevelEmphais",
+]
+
+
+def glrlm_features_reference(glrlm):
+    matrix = getGrayRumatrix()
+    columns = [np.ravel(getattr(matrix, name)(glrlm)) for name in FEATURE_METHODS]
+    return np.stack(columns, axis=1)
+
+
+def get_images():
+    images = [image for _, image in get_corpus_grays()[::2]]
+    images += [compute_lbp(images[0])]
+    images += get_random_grays(6, 25)
+    images += [np.full((4, 6), 3, np.uint8), np.array([[0, 1, 1, 0]], np.uint8), np.arange(12, dtype=np.uint8).reshape(4, 3)]
+    return images
+
+
+@pytest.mark.parametrize("image", get_images())
+def test_compute_glrlm_matches_reference(image):
+    np.testing.assert_array_equal(compute_glrlm(image), compute_glrlm_reference(image))
+
+
+def test_compute_glrlm_angle_subsets():
+    image = get_random_grays(7, 1)[0]
+    for angles in (["deg45"], ["deg0", "deg135"], ["deg90", "deg45"]):
+        np.testing.assert_array_equal(compute_glrlm(image, angles), compute_glrlm_reference(image, angles))
+
+
+@pytest.mark.parametrize("image", get_images())
+def test_glrlm_features_match_methods(image):
+    glrlm = compute_glrlm(image, GLRLM_ANGLES)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        expected = glrlm_features_reference(glrlm)
+    np.testing.assert_array_equal(compute_glrlm_features(glrlm), expected)
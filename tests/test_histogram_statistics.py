@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from model.histogram_statistics import get_histogram
+from model.histogram_statistics import get_histogram_statistics
+from model.tamura_feature_extraction import contrast
+
+from images import get_corpus_grays, get_random_grays
+
+
+def check_statistics(image):
+    stats = get_histogram_statistics(get_histogram(image))
+    values = image.ravel().astype(np.float64)
+    centered = values - np.mean(values)
+
+    assert stats["n"] == values.size
+    assert stats["mean"] == np.mean(image)
+    assert stats["median"] == np.median(image)
+    np.testing.assert_allclose(stats["variance"], np.var(values), rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(stats["std"], np.std(values), rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(stats["m3"], np.mean(centered ** 3), rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(stats["m4"], np.mean(centered ** 4), rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("name, image", get_corpus_grays())
+def test_statistics_match_pixels_on_corpus(name, image):
+    check_statistics(image)
+
+
+@pytest.mark.parametrize("image", get_random_grays(3, 40))
+def test_statistics_match_pixels_on_random(image):
+    check_statistics(image)
+
+
+def test_statistics_of_constant_and_odd_images():
+    for image in (np.full((3, 5), 42, np.uint8), np.array([[0, 255, 7]], np.uint8), np.array([[3]], np.uint8)):
+        check_statistics(image)
+
+
+@pytest.mark.parametrize("name, image", get_corpus_grays())
+def test_contrast_matches_per_pixel_path(name, image):
+    # Non-uint8 input takes the original per-pixel computation
+    np.testing.assert_allclose(contrast(image), contrast(image.astype(np.int64)), rtol=1e-12)
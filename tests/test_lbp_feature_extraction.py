@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from model.lbp_feature_extraction import compute_lbp
+from model.lbp_feature_extraction import get_lbp_features_from_lbp
+from model.lbp_feature_extraction import lbp_calculated_pixel
+
+from images import get_corpus_grays, get_random_grays
+
+
+def lbp_reference(image):
+    out = np.zeros(image.shape, np.uint8)
+    for x in range(image.shape[0]):
+        for y in range(image.shape[1]):
+            out[x, y] = lbp_calculated_pixel(image, x, y)
+    return out
+
+
+def lbp_features_reference(lbp_image):
+    # The per-pixel statistics of the original get_lbp_features
+    values = lbp_image.flatten()
+    mean = np.mean(values)
+    median = np.median(values)
+    std = np.std(values)
+    kurtosis = (4 * np.sum((values - mean) ** 4)) / (len(values) * std ** 4) - 3
+    skewness = (3 * (mean - median)) / std
+    return [mean, median, std, kurtosis, skewness]
+
+
+@pytest.mark.parametrize("name, image", get_corpus_grays()[::2])
+def test_compute_lbp_matches_reference_on_corpus(name, image):
+    np.testing.assert_array_equal(compute_lbp(image), lbp_reference(image))
+
+
+@pytest.mark.parametrize("image", get_random_grays(1, 30))
+def test_compute_lbp_matches_reference_on_random(image):
+    np.testing.assert_array_equal(compute_lbp(image), lbp_reference(image))
+
+
+def test_compute_lbp_edge_cases():
+    for image in (np.zeros((5, 7), np.uint8), np.full((1, 1), 9, np.uint8), np.arange(12, dtype=np.uint8).reshape(1, 12)):
+        np.testing.assert_array_equal(compute_lbp(image), lbp_reference(image))
+
+
+def test_compute_lbp_writes_into_out():
+    image = get_random_grays(2, 1)[0]
+    out = np.full(image.shape, 7, np.uint8)
+    assert compute_lbp(image, out=out) is out
+    np.testing.assert_array_equal(out, lbp_reference(image))
+
+
+@pytest.mark.parametrize("name, image", get_corpus_grays())
+def test_lbp_statistics_match_reference(name, image):
+    lbp_image = compute_lbp(image)
+    actual = get_lbp_features_from_lbp(lbp_image)
+    expected = lbp_features_reference(lbp_image)
+    # Mean and median are exact; the moments differ in the last bits at most
+    assert actual[:2] == expected[:2]
+    np.testing.assert_allclose(actual, expected, rtol=1e-12)
+    np.testing.assert_array_equal(np.float32(actual), np.float32(expected))
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from model.multiotsu_segmentation import multiotsu_masking
+from model.multiotsu_segmentation import multiotsu_masking_reference
+
+from images import get_corpus_grays
+
+# skimage's exhaustive search takes seconds once an image spans most of the
+# 256 values, so random images mostly stay in narrower ranges
+
+
+def get_random_images(seed, count):
+    rng = np.random.default_rng(seed)
+    images = []
+    for index in range(count):
+        shape = tuple(rng.integers(8, 48, 2))
+        kind = index % 4
+        if kind == 0:
+            low = rng.integers(0, 200)
+            image = rng.integers(low, low + rng.integers(5, 56), shape)
+        elif kind == 1:
+            image = np.clip(rng.normal(rng.uniform(20, 230), rng.uniform(1, 8), shape), 0, 255)
+        elif kind == 2:
+            levels = rng.choice(256, rng.integers(5, 12), replace=False)
+            image = rng.choice(levels, shape)
+        else:
+            width = rng.integers(5, 40)
+            image = np.resize(np.arange(width), shape) + rng.integers(0, 200)
+        images.append(np.clip(image, 0, 255).astype(np.uint8))
+    return images
+
+
+def check_masks(image):
+    try:
+        expected = multiotsu_masking_reference(image)
+    except ValueError:
+        with pytest.raises(ValueError):
+            multiotsu_masking(image)
+        return
+    np.testing.assert_array_equal(multiotsu_masking(image), expected)
+
+
+@pytest.mark.parametrize("name, image", get_corpus_grays()[::2])
+def test_masks_match_reference_on_corpus(name, image):
+    check_masks(image)
+
+
+@pytest.mark.parametrize("image", get_random_images(0, 60))
+def test_masks_match_reference_on_random(image):
+    check_masks(image)
+
+
+@pytest.mark.parametrize(
+    "image",
+    [
+        # Flat histograms: every split ties with its neighbours
+        np.resize(np.arange(40, 80, dtype=np.uint8), (20, 40)),
+        np.resize(np.arange(100, 110, dtype=np.uint8), (10, 10)),
+        np.resize(np.arange(256, dtype=np.uint8), (16, 32)),
+        # Exactly five levels, and one level too few
+        np.resize(np.array([3, 50, 90, 140, 250], np.uint8), (9, 9)),
+        np.resize(np.array([3, 50, 90, 140], np.uint8), (9, 9)),
+        # Two levels and a constant image cannot be split into five classes
+        np.resize(np.array([10, 200], np.uint8), (8, 8)),
+        np.full((6, 6), 77, np.uint8),
+        # Narrow ranges with empty bins in between
+        np.resize(np.array([120, 122, 124, 126, 128, 130], np.uint8), (12, 12)),
+        np.resize(np.array([0, 0, 0, 1, 2, 3, 4, 255], np.uint8), (8, 8)),
+    ],
+)
+def test_masks_match_reference_on_edge_cases(image):
+    check_masks(image)
+
+
+def test_mask_writes_into_out():
+    image = get_random_images(1, 1)[0]
+    out = np.full(image.shape, 3, np.uint8)
+    assert multiotsu_masking(image, out=out) is out
+    np.testing.assert_array_equal(out, multiotsu_masking_reference(image))
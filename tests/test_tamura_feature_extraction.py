@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from model.lbp_feature_extraction import compute_lbp
+from model.tamura_feature_extraction import coarseness
+from model.tamura_feature_extraction import coarseness_reference
+from model.tamura_feature_extraction import directionality
+from model.tamura_feature_extraction import directionality_reference
+
+from images import get_corpus_grays, get_random_grays
+
+
+def center_crop(image, height=64, width=80):
+    top, left = (image.shape[0] - height) // 2, (image.shape[1] - width) // 2
+    return image[top:top + height, left:left + width]
+
+
+# The per-pixel references take seconds on full corpus images
+CORPUS = [(name, center_crop(image)) for name, image in get_corpus_grays()[::2]]
+
+
+@pytest.mark.parametrize("name, image", CORPUS)
+def test_coarseness_matches_reference_on_corpus(name, image):
+    assert coarseness(image, 5) == coarseness_reference(image, 5)
+    lbp_image = compute_lbp(image)
+    assert coarseness(lbp_image, 5) == coarseness_reference(lbp_image, 5)
+
+
+@pytest.mark.parametrize("image", get_random_grays(4, 20))
+def test_coarseness_matches_reference_on_random(image):
+    for kmax in (1, 3, 5):
+        assert coarseness(image, kmax) == coarseness_reference(image, kmax)
+
+
+@pytest.mark.parametrize("name, image", CORPUS)
+def test_directionality_matches_reference_on_corpus(name, image):
+    np.testing.assert_array_equal(directionality(image), directionality_reference(image))
+    lbp_image = compute_lbp(image)
+    np.testing.assert_array_equal(directionality(lbp_image), directionality_reference(lbp_image))
+
+
+@pytest.mark.parametrize("image", [image for image in get_random_grays(5, 20) if min(image.shape) >= 3])
+def test_directionality_matches_reference_on_random(image):
+    np.testing.assert_array_equal(directionality(image), directionality_reference(image))
+
+
+def test_directionality_of_flat_image_matches_reference():
+    # No gradient passes the threshold, so both are NaN
+    image = np.full((8, 9), 100, np.uint8)
+    np.testing.assert_array_equal(directionality(image), directionality_reference(image))
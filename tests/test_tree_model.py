@@ -0,0 +1,63 @@
+import os
+import warnings
+
+import numpy as np
+import pytest
+
+from model import classifier
+from model.tree_model import TREE_MODEL_PATH
+from model.tree_model import get_check_inputs
+from model.tree_model import hash_model_file
+from model.tree_model import load_tree_model
+
+xgboost = pytest.importorskip("xgboost")
+
+pytestmark = pytest.mark.skipif(not os.path.exists(TREE_MODEL_PATH), reason="no tree export")
+
+
+@pytest.fixture(scope="module")
+def models():
+    return load_tree_model(TREE_MODEL_PATH), classifier.load_classifier(classifier.XGB_MODEL_PATH)
+
+
+def test_export_is_of_current_model():
+    assert load_tree_model(TREE_MODEL_PATH).source_version == hash_model_file(classifier.XGB_MODEL_PATH)
+
+
+@pytest.mark.parametrize("name", ["golden", "random", "missing"])
+def test_matches_xgboost(models, name):
+    tree_model, xgb_model = models
+    inputs = get_check_inputs(random_rows=2000)[name]
+
+    actual = tree_model.predict_proba(inputs)
+    np.testing.assert_array_equal(actual, xgb_model.predict_proba(inputs))
+    np.testing.assert_array_equal(tree_model.predict(inputs), xgb_model.predict(inputs))
+
+    single = np.concatenate([tree_model.predict_proba(row) for row in inputs[:50]])
+    np.testing.assert_array_equal(single, actual[:50])
+
+
+def stale_export(tmp_path):
+    with np.load(TREE_MODEL_PATH, allow_pickle=False) as arrays:
+        arrays = dict(arrays)
+    arrays["source_version"] = np.array("0" * 16)
+    path = str(tmp_path / "stale.npz")
+    np.savez(path, **arrays)
+    return path
+
+
+def test_stale_export_is_refused(tmp_path):
+    with pytest.raises(ValueError, match="re-run"):
+        classifier.load_classifier(stale_export(tmp_path))
+
+
+def test_stale_export_falls_back_to_xgboost(tmp_path, monkeypatch):
+    monkeypatch.setattr(classifier, "TREE_MODEL_PATH", stale_export(tmp_path))
+    with pytest.warns(UserWarning, match="instead"):
+        assert classifier.get_default_model_path() == classifier.XGB_MODEL_PATH
+
+
+def test_current_export_is_default():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert classifier.get_default_model_path() == TREE_MODEL_PATH